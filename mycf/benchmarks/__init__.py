@@ -0,0 +1,2 @@
+# 性能基准脚本。在 scrapy.cfg 所在目录运行，例如：
+#   python -m benchmarks.bench_dedupe --rows 1000000
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷热分层基准：库里 --rows 条岗位、发布时间均匀分布在最近 --months 个月，报告：
+
+  - 去重管道启动时的判重集合：旧做法（读出全部 job_url 字符串）vs url_hashes（64 位整数）的加载耗时和内存
+  - archive.py 只保留最近 --keep_days 天：归档耗时、主库大小前后对比、归档分区合计大小
+  - 归档后：判重集合仍包含全部岗位；read_jobs 只查主库 vs 带上归档分区（--include_archive）的查询耗时
+
+  python -m benchmarks.bench_archive --rows 1000000 --months 12 --keep_days 90
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from mycf import archive, db
+from mycf.read_jobs import open_archive, query_jobs
+
+CATEGORIES = [f"Category {i}" for i in range(40)]
+KEYWORDS = [f"keyword {i}" for i in range(200)]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark hot/cold archival and URL-hash dedupe.")
+    p.add_argument("--rows", type=int, default=1_000_000, help="库大小（默认 1,000,000）")
+    p.add_argument("--months", type=int, default=12, help="岗位发布时间分布在最近几个月（默认 12）")
+    p.add_argument("--keep_days", type=int, default=90, help="主库保留天数（默认 90）")
+    return p.parse_args()
+
+
+def seed(conn, rows, months, now):
+    rnd = random.Random(3)
+    span = months * 30 * 86400
+    batch = []
+    for i in range(rows):
+        url = f"https://www.mycareersfuture.gov.sg/job/data-analyst-acme-{i:08d}-{rnd.getrandbits(64):016x}"
+        batch.append((url, rnd.choice(KEYWORDS), f"Data Analyst {i % 997}", f"Company {rnd.randrange(50_000)}",
+                      "Central", now - rnd.randrange(span), rnd.choice(CATEGORIES)))
+        if len(batch) >= 10_000:
+            _insert(conn, batch)
+    _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    conn.executemany(
+        "INSERT OR IGNORE INTO jobs (job_url, search_query, title, company, location, posted_ts, category) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", batch,
+    )
+    db.add_url_hashes(conn, (row[0] for row in batch))
+    conn.commit()
+    batch.clear()
+
+
+def measure(fn):
+    """(结果, 秒, 峰值 MB)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def size_mb(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p)) / 1e6
+
+
+def median_ms(fn, runs=5):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    args = parse_args()
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite")
+        archive_dir = os.path.join(tmp, "archive")
+        conn = db.connect(path)
+        t0 = time.perf_counter()
+        seed(conn, args.rows, args.months, now)
+        print(f"seeded {args.rows:,} rows over {args.months} months in {time.perf_counter() - t0:.1f}s")
+
+        # ---------- 判重集合 ----------
+        urls, t_urls, m_urls = measure(lambda: {row[0] for row in conn.execute("SELECT job_url FROM jobs")})
+        hashes, t_hashes, m_hashes = measure(lambda: db.url_hashes(conn))
+        print(f"seen-set  job_url strings : {t_urls:6.2f}s {m_urls:8.1f} MB  ({len(urls):,})")
+        print(f"seen-set  url_hashes      : {t_hashes:6.2f}s {m_hashes:8.1f} MB  ({len(hashes):,})")
+        del urls, hashes
+
+        # ---------- 归档 ----------
+        before = size_mb(path)
+        t0 = time.perf_counter()
+        moved = archive.run(conn, archive_dir, args.keep_days, now=now)
+        elapsed = time.perf_counter() - t0
+        parts = archive.partitions(archive_dir)
+        part_mb = sum(os.path.getsize(gz) for _, gz in parts) / 1e6
+        hot = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        print(f"archive   {sum(moved.values()):,} rows into {len(parts)} partitions in {elapsed:.1f}s; "
+              f"hot db {before:.1f} MB -> {size_mb(path):.1f} MB ({hot:,} rows), partitions {part_mb:.1f} MB")
+
+        _, t_hashes, m_hashes = measure(lambda: db.url_hashes(conn))
+        print(f"seen-set  after archive   : {t_hashes:6.2f}s {m_hashes:8.1f} MB  (still covers all rows)")
+
+        # ---------- 查询 ----------
+        conn.close()
+        conn = db.connect(path)
+        t0 = time.perf_counter()
+        part_conns = open_archive(path, archive_dir)
+        print(f"extract   {len(part_conns)} partitions to cache in {time.perf_counter() - t0:.1f}s (first query only)")
+        filters = ("Category 7", "keyword 42", "%")
+
+        def hot_only():
+            return query_jobs(conn, *filters, 50)
+
+        def with_archive():
+            rows = query_jobs(conn, *filters, 10_000)
+            for _, part in part_conns:
+                rows += query_jobs(part, *filters, 10_000)
+            return rows
+
+        print(f"query     hot only        : {median_ms(hot_only):8.1f} ms")
+        print(f"query     + all partitions: {median_ms(with_archive):8.1f} ms  ({len(with_archive()):,} rows)")
+        for _, part in part_conns:
+            part.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DOM 兜底基准：本地静态搜索页（卡片标记与 mycf/browser.py 的选择器一致，每张卡片带公司 logo，
+页面引用网页字体和统计脚本，“下一页”由页内脚本换卡片），对比两种浏览器用法的每卡片耗时和浏览器内存：
+
+  navigate：旧做法 —— 默认上下文、什么都不拦，每一页都重新导航（?page=N）
+  pooled  ：现做法 —— 固定上下文池轮流用、拦掉图片/字体/统计请求、页内点“下一页”
+
+  python -m benchmarks.bench_browser --keywords 8 --max_pages 5 --asset_latency 0.05
+
+需要 playwright 和 chromium（python -m playwright install chromium）。统计脚本的域名通过
+--host-resolver-rules 指到本地服务，不会真的联网。
+"""
+
+import argparse
+import asyncio
+import html
+import itertools
+import os
+import threading
+import time
+import urllib.parse as ul
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from parsel import Selector
+
+from benchmarks.stub_api import make_jobs
+from mycf import browser
+
+ANALYTICS_HOST = "www.google-analytics.com"
+PNG_1PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Browser (DOM fallback) benchmark against a local static search page.")
+    p.add_argument("--keywords", type=int, default=8, help="关键词个数（默认 8）")
+    p.add_argument("--max_pages", type=int, default=5, help="每个关键词翻几页（默认 5）")
+    p.add_argument("--per_page", type=int, default=20)
+    p.add_argument("--contexts", type=int, default=2, help="pooled 模式的上下文数（默认 2）")
+    p.add_argument("--concurrency", type=int, default=4, help="同时处理的关键词数（两种模式相同，默认 4）")
+    p.add_argument("--asset_latency", type=float, default=0.05, help="图片/字体/统计脚本的响应延迟秒数（默认 0.05）")
+    p.add_argument("--mode", choices=("both", "navigate", "pooled"), default="both")
+    return p.parse_args()
+
+
+# ---------- 本地静态搜索页 ----------
+def _card_html(job):
+    return (
+        '<div data-testid="job-card">'
+        f'<img src="/logo/{job["uuid"][:8]}.png" width="48" height="48">'
+        f'<h3 data-testid="job-card__job-title">{html.escape(job["title"])}</h3>'
+        f'<p data-testid="job-card__company-hire-info">{html.escape(job["company"]["name"])}</p>'
+        f'<p data-testid="job-card__location">{html.escape(job["location"])}</p>'
+        f'<time datetime="{job["postingDate"]}" data-testid="job-card__posted-date">{job["postingDate"]}</time>'
+        f'<a href="{job["jobDetailsUrl"]}">view</a>'
+        "</div>"
+    )
+
+
+def render_search_page(query, page, per_page, max_pages):
+    """服务端先渲染第 page 页；页内脚本持有全部页，点“下一页”时原地换卡片（模拟单页应用）。"""
+    total = per_page * max_pages
+    pages = [
+        "".join(_card_html(j) for j in make_jobs(query, p * per_page, per_page, total))
+        for p in range(max_pages)
+    ]
+    script_pages = "[" + ",".join(repr(p) for p in pages) + "]"
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>{html.escape(query)}</title>
+<style>@font-face {{ font-family: Bench; src: url(/font.woff2); }} body {{ font-family: Bench, sans-serif; }}</style>
+<script async src="http://{ANALYTICS_HOST}/analytics.js"></script>
+</head><body><main id="__next">
+<div id="cards">{pages[page]}</div>
+<button data-testid="pagination-next" {"disabled" if page >= max_pages - 1 else ""}>Next</button>
+</main>
+<script>
+const pages = {script_pages};
+let current = {page};
+const next = document.querySelector("[data-testid='pagination-next']");
+next.addEventListener("click", () => {{
+  if (current >= pages.length - 1) return;
+  current += 1;
+  setTimeout(() => {{
+    document.getElementById("cards").innerHTML = pages[current];
+    next.disabled = current >= pages.length - 1;
+  }}, 20);
+}});
+</script></body></html>"""
+
+
+def serve_fixture(args):
+    counts = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path == "/search":
+                qs = ul.parse_qs(query)
+                body = render_search_page(
+                    qs.get("search", ["quant"])[0], int(qs.get("page", ["0"])[0]), args.per_page, args.max_pages
+                ).encode("utf-8")
+                kind, ctype = "document", "text/html; charset=utf-8"
+            else:
+                time.sleep(args.asset_latency)
+                if path.startswith("/logo/"):
+                    body, kind, ctype = PNG_1PX, "image", "image/png"
+                elif path == "/font.woff2":
+                    body, kind, ctype = b"\0" * 20_000, "font", "font/woff2"
+                else:
+                    body, kind, ctype = b"/* analytics */", "analytics", "application/javascript"
+            counts[kind] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+# ---------- 浏览器内存 ----------
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+
+
+def browser_rss_mib():
+    """本进程所有子孙进程（chromium 各进程）的 RSS 之和；非 Linux 返回 None。"""
+    if not os.path.exists("/proc/self"):
+        return None
+    total, stack = 0, _children(os.getpid())
+    while stack:
+        pid = stack.pop()
+        stack.extend(_children(pid))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total / 1024
+
+
+async def sample_rss(peak, stop):
+    while not stop.is_set():
+        rss = browser_rss_mib()
+        if rss is not None:
+            peak[0] = max(peak[0], rss)
+        await asyncio.sleep(0.1)
+
+
+# ---------- 两种用法 ----------
+def _count_cards(content):
+    return len(Selector(text=content).css(browser.CARD_SELECTOR))
+
+
+async def crawl_navigate(browser_obj, base, query, args):
+    context = browser_obj.contexts[0]
+    cards = 0
+    for p in range(args.max_pages):
+        page = await context.new_page()
+        try:
+            await page.goto(f"{base}?{ul.urlencode({'search': query, 'page': p})}")
+            await page.wait_for_load_state("load")
+            cards += _count_cards(await page.content())
+        finally:
+            await page.close()
+    return cards
+
+
+async def crawl_pooled(contexts, counter, base, query, args):
+    context = contexts[next(counter) % len(contexts)]
+    page = await context.new_page()
+    cards = 0
+    try:
+        await page.goto(f"{base}?{ul.urlencode({'search': query, 'page': 0})}")
+        await page.wait_for_load_state("domcontentloaded")
+        for p in range(args.max_pages):
+            cards += _count_cards(await page.content())
+            if p + 1 >= args.max_pages or not await browser.goto_next(page):
+                break
+    finally:
+        await page.close()
+    return cards
+
+
+async def _abort_route(route):
+    if browser.should_abort_request(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def run_mode(mode, base, port, counts, args):
+    from playwright.async_api import async_playwright
+
+    counts.clear()
+    queries = [f"keyword {i}" for i in range(args.keywords)]
+    sem = asyncio.Semaphore(args.concurrency)
+    peak, stop = [0.0], asyncio.Event()
+    async with async_playwright() as pw:
+        browser_obj = await pw.chromium.launch(args=[f"--host-resolver-rules=MAP {ANALYTICS_HOST} 127.0.0.1:{port}"])
+        if mode == "navigate":
+            await browser_obj.new_context()
+            contexts = None
+        else:
+            contexts = []
+            for kwargs in browser.contexts(args.contexts).values():
+                context = await browser_obj.new_context(**kwargs)
+                await context.route("**", _abort_route)
+                contexts.append(context)
+            counter = itertools.count()
+
+        async def one(query):
+            async with sem:
+                if mode == "navigate":
+                    return await crawl_navigate(browser_obj, base, query, args)
+                return await crawl_pooled(contexts, counter, base, query, args)
+
+        sampler = asyncio.ensure_future(sample_rss(peak, stop))
+        t0 = time.perf_counter()
+        cards = sum(await asyncio.gather(*(one(q) for q in queries)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await sampler
+        await browser_obj.close()
+
+    print(f"[{mode:8s}] cards: {cards}, wall {elapsed:.2f}s, {elapsed / max(cards, 1) * 1000:.2f} ms/card, "
+          f"peak browser RSS {peak[0]:.0f} MiB")
+    print("           served: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+
+def main():
+    args = parse_args()
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        raise SystemExit("playwright 未安装：pip install playwright && python -m playwright install chromium")
+    server, counts = serve_fixture(args)
+    port = server.server_address[1]
+    base = f"http://127.0.0.1:{port}/search"
+    modes = ("navigate", "pooled") if args.mode == "both" else (args.mode,)
+    print(f"{args.keywords} keywords x {args.max_pages} pages x {args.per_page} cards, "
+          f"concurrency {args.concurrency}, asset latency {args.asset_latency * 1000:.0f} ms")
+    for mode in modes:
+        asyncio.run(run_mode(mode, base, port, counts, args))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
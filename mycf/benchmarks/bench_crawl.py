@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端基准：在子进程里启动本地 API 桩服务，用项目配置跑 mycf_jobs 爬虫，报告
+请求数/条、条/秒、各管道的处理耗时和峰值 RSS。
+
+  python -m benchmarks.bench_crawl --keywords 20 --total 300 --latency 0.05 --max_pages 10
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+from collections import defaultdict
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+
+from benchmarks.stub_api import StubConfig, add_stub_args, serve
+from mycf.spiders.mycf_jobs import MyCareersFutureSpider
+
+# 管道名 -> [调用次数, 总耗时, 最大耗时]
+PIPELINE_TIMINGS = defaultdict(lambda: [0, 0.0, 0.0])
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="End-to-end crawl benchmark against a local API stub.")
+    add_stub_args(p)
+    p.add_argument("--keywords", type=int, default=10, help="合成关键词个数（默认 10）")
+    p.add_argument("--keywords_file", default=None, help="改用真实关键词文件")
+    p.add_argument("--within_days", type=int, default=7)
+    p.add_argument("--max_pages", type=int, default=10)
+    p.add_argument("--concurrency", type=int, default=16, help="CONCURRENT_REQUESTS（默认 16，不限速）")
+    p.add_argument("--disk_latency", type=float, default=0.0,
+                   help="模拟慢盘：去重库每次提交 / 导出每批写入额外耗时多少秒（默认 0）")
+    p.add_argument("--sync_writes", action="store_true",
+                   help="在 reactor 线程同步写（MYCF_BACKGROUND_WRITES=False），与后台写线程对照")
+    p.add_argument("--details", action="store_true", help="同时补全岗位详情（-a details=1）")
+    p.add_argument("--polite", action="store_true",
+                   help="保留项目里的限速配置（起始并发/间隔 + 自适应并发控制器）")
+    p.add_argument("-s", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                   help="额外的 Scrapy 设置，可重复")
+    return p.parse_args()
+
+
+def _run_stub(stub_kwargs, queue):
+    server, url = serve(StubConfig(**stub_kwargs))
+    queue.put(url)
+    server.serve_forever()
+
+
+def timed(cls, disk_latency=0.0):
+    """给管道类套一层计时（只计 process_item 的同步部分）；disk_latency > 0 时给每次批量写入加延迟。"""
+    class Timed(cls):
+        if disk_latency and hasattr(cls, "_insert"):
+            def _insert(self, rows, *args):
+                time.sleep(disk_latency)
+                return super()._insert(rows, *args)
+
+        if disk_latency and hasattr(cls, "_write_batch"):
+            def _write_batch(self, key, rows):
+                time.sleep(disk_latency)
+                return super()._write_batch(key, rows)
+
+        def process_item(self, item, spider):
+            t0 = time.perf_counter()
+            try:
+                return super().process_item(item, spider)
+            finally:
+                dt = time.perf_counter() - t0
+                rec = PIPELINE_TIMINGS[cls.__name__]
+                rec[0] += 1
+                rec[1] += dt
+                rec[2] = max(rec[2], dt)
+
+    Timed.__name__ = Timed.__qualname__ = cls.__name__
+    return Timed
+
+
+def main():
+    args = parse_args()
+    stub_kwargs = dict(total=args.total, latency=args.latency, shape=args.shape, rate_429=args.rate_429,
+                       retry_after=args.retry_after, days=args.days, full=args.full, max_rps=args.max_rps)
+    queue = mp.Queue()
+    stub = mp.Process(target=_run_stub, args=(stub_kwargs, queue), daemon=True)
+    stub.start()
+    api_base = queue.get(timeout=10)
+
+    tmp = tempfile.TemporaryDirectory()
+    keywords_file = args.keywords_file
+    if not keywords_file:
+        keywords_file = os.path.join(tmp.name, "keywords.txt")
+        with open(keywords_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"keyword {i}" for i in range(args.keywords)))
+
+    settings = get_project_settings()
+    pipelines = {timed(load_object(path), args.disk_latency): prio for path, prio in settings.getdict("ITEM_PIPELINES").items()}
+    overrides = {
+        "MYCF_API_BASE": api_base,
+        "MYCF_SQLITE_PATH": os.path.join(tmp.name, "mycf_jobs.sqlite"),
+        "MYCF_OUTPUT_DIR": os.path.join(tmp.name, "output"),
+        "MYCF_ROUTE_CACHE": os.path.join(tmp.name, "mycf_route.json"),
+        "MYCF_METRICS_JSON": os.path.join(tmp.name, "metrics", "mycf_metrics.json"),
+        "MYCF_METRICS_PROM": os.path.join(tmp.name, "metrics", "mycf_metrics.prom"),
+        "ITEM_PIPELINES": pipelines,
+        "LOG_LEVEL": "WARNING",
+        "TELNETCONSOLE_ENABLED": False,
+        "MYCF_BACKGROUND_WRITES": not args.sync_writes,
+        "MYCF_DETAIL_API_BASE": api_base.replace("/v2/search", "/v2/jobs"),
+    }
+    if not args.polite:
+        overrides.update({
+            "CONCURRENT_REQUESTS": args.concurrency,
+            "DOWNLOAD_DELAY": 0,
+            "AUTOTHROTTLE_ENABLED": False,
+            "MYCF_THROTTLE_ENABLED": False,
+            "DOWNLOAD_SLOTS": {"mycf-details": {"concurrency": max(1, args.concurrency // 4), "delay": 0}},
+        })
+    for item in args.overrides:
+        name, _, value = item.partition("=")
+        overrides[name] = value
+    settings.setdict(overrides, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(MyCareersFutureSpider)
+    process.crawl(crawler, keywords_file=keywords_file, within_days=args.within_days,
+                  max_pages=args.max_pages, incremental=0, details=int(args.details))
+    t0 = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - t0
+    stub.terminate()
+
+    stats = crawler.stats.get_stats()
+    requests = stats.get("downloader/request_count", 0)
+    items = stats.get("item_scraped_count", 0)
+    print(f"shape={args.shape} total/kw={args.total} latency={args.latency}s rate_429={args.rate_429} "
+          f"disk_latency={args.disk_latency}s writes={'sync' if args.sync_writes else 'background'}")
+    print(f"requests          : {requests}  (429: {stats.get('downloader/response_status_count/429', 0)})")
+    print(f"items             : {items}  (dropped: {stats.get('item_dropped_count', 0)})")
+    print(f"requests per item : {requests / items:.3f}" if items else "requests per item : n/a")
+    print(f"items/sec         : {items / elapsed:,.1f}  (wall {elapsed:.2f}s, {requests / elapsed:.1f} req/s)")
+    for name, (n, total, worst) in PIPELINE_TIMINGS.items():
+        print(f"pipeline {name:<22}: {n} calls, mean {total / n * 1e6:,.1f} us, max {worst * 1e3:,.2f} ms")
+    throttle = {k[len("mycf/throttle/"):]: v for k, v in stats.items() if k.startswith("mycf/throttle/")}
+    if throttle:
+        print("throttle          :")
+        for k in sorted(throttle):
+            print(f"  {k:<40}: {throttle[k]}")
+    if args.details:
+        print(f"details           : requested {stats.get('mycf/details/requested', 0)}, "
+              f"unchanged {stats.get('mycf/details/unchanged', 0)}, stored {stats.get('mycf/details/stored', 0)}")
+    waits = {k: v for k, v in stats.items() if k.endswith("/writer_waits")}
+    if waits:
+        print(f"writer waits      : {waits}")
+    print(f"peak RSS          : {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.1f} MiB")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索响应解码基准：旧路径（response.json() + 逐键尝试） vs mycf.decoding.ResponseDecoder
+（msgspec 类型化 / orjson / 标准库）。默认用桩服务生成的完整响应；--replay_dir 可改用录制的真实流量。
+
+  python -m benchmarks.bench_decode --pages 2000
+  python -m benchmarks.bench_decode --replay_dir replay
+"""
+
+import argparse
+import base64
+import glob
+import gzip
+import json
+import os
+import time
+
+from benchmarks.stub_api import SHAPES, make_jobs, wrap
+from mycf import decoding
+from mycf.decoding import ResponseDecoder
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark search-response decoding.")
+    p.add_argument("--pages", type=int, default=2000, help="解码的页数（默认 2000）")
+    p.add_argument("--per_page", type=int, default=20)
+    p.add_argument("--replay_dir", default=None, help="读取 MycfDownloaderMiddleware 录制的段文件")
+    return p.parse_args()
+
+
+def legacy_extract(body):
+    """旧实现：完整解码成 dict，再按容器键 / 字段别名逐个尝试。"""
+    data = json.loads(body)
+    results = []
+    if isinstance(data, dict):
+        if isinstance(data.get("results"), list):
+            results = data["results"]
+        elif isinstance(data.get("data"), list):
+            results = data["data"]
+        elif isinstance(data.get("payload"), list):
+            results = data["payload"]
+        elif isinstance(data.get("result"), dict) and isinstance(data["result"].get("results"), list):
+            results = data["result"]["results"]
+        elif any(k in data for k in ("jobs", "items")):
+            results = data.get("jobs") or data.get("items") or []
+    out = []
+    for j in results:
+        company = j.get("company")
+        if isinstance(company, dict):
+            company = company.get("name") or company.get("companyName")
+        out.append((
+            j.get("jobDetailsUrl") or j.get("seoUrl") or j.get("urlPath") or j.get("jobUrl"),
+            j.get("title") or j.get("jobTitle"), company,
+            j.get("location") or j.get("postal") or j.get("jobLocation"),
+            j.get("minSalary"), j.get("maxSalary"), j.get("salaryCurrency"),
+            j.get("postingDate") or j.get("postedDate") or j.get("createDate") or j.get("lastUpdatedDate"),
+            j.get("employmentType"), j.get("seniority"), j.get("category") or j.get("jobCategory"),
+        ))
+    return out
+
+
+def recorded_bodies(replay_dir):
+    bodies = []
+    for path in sorted(glob.glob(os.path.join(replay_dir, "segment-*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["status"] == 200:
+                    bodies.append(base64.b64decode(record["body"]))
+    return bodies
+
+
+def synthetic_bodies(pages, per_page, shape):
+    return [
+        json.dumps(wrap(shape, make_jobs("data scientist", p * per_page, per_page, pages * per_page, full=True),
+                        pages * per_page)).encode("utf-8")
+        for p in range(pages)
+    ]
+
+
+def run(name, fn, bodies):
+    fn(bodies[0])  # 预热（探测结构）
+    items = 0
+    t0 = time.perf_counter()
+    for body in bodies:
+        items += len(fn(body))
+    elapsed = time.perf_counter() - t0
+    mb = sum(len(b) for b in bodies) / 1e6
+    print(f"{name:<32}: {items / elapsed:>10,.0f} items/s  {mb / elapsed:>8.1f} MB/s")
+    return elapsed
+
+
+def bench(bodies):
+    base = run("before  json + dict.get", legacy_extract, bodies)
+    variants = []
+    if decoding.msgspec is not None:
+        variants.append(("after   msgspec (typed)", ResponseDecoder(typed=True)))
+    variants.append((f"after   {ResponseDecoder(typed=False).backend} (generic)", ResponseDecoder(typed=False)))
+    for name, decoder in variants:
+        elapsed = run(name, lambda body, d=decoder: d.decode(("POST", 0), body)[0], bodies)
+        print(f"{'':<32}  speedup x{base / elapsed:.2f}")
+
+
+def main():
+    args = parse_args()
+    if args.replay_dir:
+        bodies = recorded_bodies(args.replay_dir)
+        print(f"{len(bodies)} recorded responses from {args.replay_dir}")
+        bench(bodies)
+        return
+    for shape in SHAPES:
+        print(f"--- shape={shape}")
+        bench(synthetic_bodies(args.pages, args.per_page, shape))
+
+
+if __name__ == "__main__":
+    main()
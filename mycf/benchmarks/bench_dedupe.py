@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DedupePipeline 吞吐基准：逐条 INSERT+commit（旧实现） vs 内存集合 + 批量 executemany（WAL）。
+
+  python -m benchmarks.bench_dedupe --rows 1000000 --items 20000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from scrapy.exceptions import DropItem
+
+from mycf import db
+from mycf.pipelines import DedupePipeline
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark DedupePipeline before/after batching.")
+    p.add_argument("--rows", type=int, default=1_000_000, help="预置到 jobs 表的行数（默认 1,000,000）")
+    p.add_argument("--items", type=int, default=20_000, help="每轮送入管道的条数（默认 20,000）")
+    p.add_argument("--dup_ratio", type=float, default=0.2, help="其中重复 job_url 的比例（默认 0.2）")
+    p.add_argument("--batch_size", type=int, default=500, help="批量模式每批条数（默认 500）")
+    p.add_argument("--db", default=None, help="数据库路径（默认临时目录）")
+    return p.parse_args()
+
+
+class LegacyDedupe:
+    """旧实现：每条 INSERT + commit，靠 IntegrityError 判重。"""
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=DELETE")  # 旧实现的默认日志模式
+
+    def process_item(self, item):
+        try:
+            self.conn.execute(
+                """INSERT INTO jobs
+                   (job_url, search_query, title, company, location, posted, employment_type, seniority, category)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (item["job_url"], item["search_query"], item["title"], item["company"], item["location"],
+                 item["posted"], item["employment_type"], item["seniority"], item["category"]),
+            )
+            self.conn.commit()
+            return item
+        except sqlite3.IntegrityError:
+            raise DropItem("Duplicate job_url")
+
+    def close(self):
+        self.conn.close()
+
+
+def make_item(url):
+    return {
+        "job_url": url, "search_query": "data scientist", "title": "Data Scientist",
+        "company": "ACME PTE. LTD.", "location": "Central", "posted": "2025-10-12T00:00:00Z",
+        "employment_type": "Full Time", "seniority": "Executive", "category": "Information Technology",
+    }
+
+
+def seed(db_path, rows):
+    pipe = DedupePipeline(db_path=db_path, flush_interval=0)
+    pipe.open_spider(None)
+    urls = [f"https://www.mycareersfuture.gov.sg/job/seed-{i}" for i in range(rows)]
+    pipe.conn.executemany(
+        "INSERT OR IGNORE INTO jobs (job_url, search_query, title) VALUES (?, ?, ?)",
+        ((url, "seed", "Seed") for url in urls),
+    )
+    db.add_url_hashes(pipe.conn, urls)
+    pipe.conn.commit()
+    pipe.conn.close()
+
+
+def workload(prefix, n, dup_ratio):
+    """按比例混入库中已有的 URL。"""
+    step = max(1, int(1 / dup_ratio)) if dup_ratio > 0 else 0
+    for i in range(n):
+        if step and i % step == 0:
+            yield make_item(f"https://www.mycareersfuture.gov.sg/job/seed-{i}")
+        else:
+            yield make_item(f"https://www.mycareersfuture.gov.sg/job/{prefix}-{i}")
+
+
+def run(process, items):
+    passed = dropped = 0
+    t0 = time.perf_counter()
+    for item in items:
+        try:
+            process(item)
+            passed += 1
+        except DropItem:
+            dropped += 1
+    return passed, dropped, time.perf_counter() - t0
+
+
+def main():
+    args = parse_args()
+    tmp = None
+    db_path = args.db
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "bench.sqlite")
+
+    t0 = time.perf_counter()
+    seed(db_path, args.rows)
+    print(f"seeded {args.rows:,} rows in {time.perf_counter() - t0:.1f}s -> {db_path}")
+
+    legacy = LegacyDedupe(db_path)
+    items = list(workload("legacy", args.items, args.dup_ratio))
+    passed, dropped, elapsed = run(legacy.process_item, items)
+    legacy.close()
+    print(f"before  per-item commit : {args.items / elapsed:>10,.0f} items/s  (passed={passed}, dropped={dropped})")
+
+    pipe = DedupePipeline(db_path=db_path, batch_size=args.batch_size, flush_interval=0)
+    t0 = time.perf_counter()
+    pipe.open_spider(None)
+    load_time = time.perf_counter() - t0
+    items = list(workload("batched", args.items, args.dup_ratio))
+    passed, dropped, elapsed = run(lambda item: pipe.process_item(item, None), items)
+    t0 = time.perf_counter()
+    pipe.close_spider(None)
+    elapsed += time.perf_counter() - t0
+    print(f"after   batched + WAL   : {args.items / elapsed:>10,.0f} items/s  (passed={passed}, dropped={dropped}, "
+          f"seen-set load {load_time:.2f}s)")
+
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+岗位条目表示基准：旧的 dict 背后的 scrapy.Item vs 现在带 __slots__ + 字符串驻留的 JobSummaryItem。
+
+  - 内存：--items 条岗位同时留在内存里（相当于管道队列很深时），每条占多少字节（tracemalloc）；
+    字段值来自 json.loads，和真实解码一样每条都是新字符串
+  - 每条开销：构造；NearDuplicatePipeline + DedupePipeline 式的读写（3 次 get + 2 次赋值 + 13 次 get）；
+    分文件导出取一行（{字段: item.get(字段)}）；ItemAdapter(item).asdict()（Scrapy 自带 feed 导出的路径）
+
+  python -m benchmarks.bench_items --items 200000
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+import scrapy
+from itemadapter import ItemAdapter
+
+from mycf.items import JobSummaryItem
+from mycf.pipelines import SplitExportPipeline
+
+DEDUPE_FIELDS = ("job_url", "search_query", "title", "company", "location", "posted", "posted_ts",
+                 "employment_type", "seniority", "category", "simhash", "cluster_id", "salary")
+
+
+class LegacyJobSummaryItem(scrapy.Item):
+    """改动前的写法：每条岗位一个 scrapy.Item（内部是 dict）。"""
+    search_query = scrapy.Field()
+    page_index = scrapy.Field()
+    title = scrapy.Field()
+    company = scrapy.Field()
+    location = scrapy.Field()
+    salary = scrapy.Field()
+    posted = scrapy.Field()
+    posted_ts = scrapy.Field()
+    employment_type = scrapy.Field()
+    seniority = scrapy.Field()
+    category = scrapy.Field()
+    job_url = scrapy.Field()
+    source_url = scrapy.Field()
+    simhash = scrapy.Field()
+    cluster_id = scrapy.Field()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark compact slotted items vs scrapy.Item.")
+    p.add_argument("--items", type=int, default=200_000, help="条目数（默认 200,000）")
+    p.add_argument("--keywords", type=int, default=50, help="关键词数（默认 50）")
+    return p.parse_args()
+
+
+def make_payload(n, keywords):
+    """json 文本：一条岗位一个对象，重复值的分布大致照搬真实数据。"""
+    rnd = random.Random(5)
+    rows = []
+    for i in range(n):
+        low = rnd.randrange(2000, 15000, 500)
+        rows.append({
+            "search_query": f"keyword {i * keywords // n}",
+            "page_index": i // 20 % 5,
+            "title": f"{rnd.choice(['Senior ', '', 'Lead '])}Data {rnd.choice(['Analyst', 'Engineer', 'Scientist'])} {i % 997}",
+            "company": f"Company {int(rnd.paretovariate(1.2)) % 3000} PTE. LTD.",
+            "location": rnd.choice(["Central", "East", "West", "North", "North-East", "Islandwide"]),
+            "salary": f"{low}-{low + rnd.randrange(500, 5000, 500)} SGD",
+            "posted": f"2025-10-{rnd.randrange(1, 31):02d}T{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:"
+                      f"{rnd.randrange(60):02d}.{rnd.randrange(1000):03d}Z",
+            "posted_ts": 1760000000 + rnd.randrange(30 * 86400),
+            "employment_type": rnd.choice(["Full Time", "Permanent", "Contract", "Part Time", "Temporary"]),
+            "seniority": rnd.choice(["Executive", "Senior Executive", "Manager", "Professional", "Junior Executive"]),
+            "category": f"Category {rnd.randrange(40)}",
+            "job_url": f"https://www.mycareersfuture.gov.sg/job/data-analyst-{i:08d}-{rnd.getrandbits(64):016x}",
+            "source_url": f"https://api.mycareersfuture.gov.sg/v2/search?search=keyword+{i * keywords // n}"
+                          f"&page={i // 20 % 5}",
+        })
+    return json.dumps(rows)
+
+
+def build(cls, payload):
+    return [cls(**row) for row in json.loads(payload)]
+
+
+def memory_per_item(cls, payload, n):
+    """构造完、json 解出的中间 dict 释放后，条目连同它引用的字段值平均每条占多少字节。"""
+    gc.collect()
+    tracemalloc.start()
+    items = build(cls, payload)
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return current / n
+
+
+def per_item_ns(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - t0) / len(items) * 1e9
+
+
+def pipeline_access(item):
+    item.get("title"), item.get("company"), item.get("location")
+    item["simhash"] = 123456789
+    item["cluster_id"] = 123456789
+    return tuple(item.get(f) for f in DEDUPE_FIELDS)
+
+
+def export_row(item, fields=SplitExportPipeline.FIELDS):
+    return {f: item.get(f) for f in fields}
+
+
+def main():
+    args = parse_args()
+    payload = make_payload(args.items, args.keywords)
+    print(f"{'':22s} {'bytes/item':>11s} {'build ns':>9s} {'pipeline ns':>12s} {'export ns':>10s} {'adapter ns':>11s}")
+    for label, cls in (("scrapy.Item (before)", LegacyJobSummaryItem), ("slotted (after)", JobSummaryItem)):
+        per_item = memory_per_item(cls, payload, args.items)
+        rows = json.loads(payload)
+        t0 = time.perf_counter()
+        items = [cls(**row) for row in rows]
+        build_ns = (time.perf_counter() - t0) / args.items * 1e9
+        access = per_item_ns(pipeline_access, items)
+        export = per_item_ns(export_row, items)
+        adapter = per_item_ns(lambda item: ItemAdapter(item).asdict(), items)
+        print(f"{label:22s} {per_item:11,.0f} {build_ns:9,.0f} {access:12,.0f} {export:10,.0f} {adapter:11,.0f}")
+        del items, rows
+
+
+if __name__ == "__main__":
+    main()
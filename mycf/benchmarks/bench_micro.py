@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微基准：_posted_within_days、parse_api_json（各响应结构）、SplitExportPipeline / ColumnarExportPipeline。
+
+  python -m benchmarks.bench_micro --n 20000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from scrapy.crawler import Crawler
+from scrapy.http import JsonRequest, TextResponse
+from scrapy.utils.project import get_project_settings
+
+from benchmarks.stub_api import SHAPES, make_jobs, wrap
+from mycf.items import JobSummaryItem
+from mycf.columnar import has_parquet
+from mycf.pipelines import ColumnarExportPipeline, SplitExportPipeline
+from mycf.spiders.mycf_jobs import MyCareersFutureSpider
+
+POSTED_SAMPLES = [
+    "2025-10-12T08:30:00.000Z",
+    "2025-10-12",
+    "2025-09-01T00:00:00+08:00",
+    "3 days ago",
+    "yesterday",
+    "5 hours ago",
+    "Posted recently",
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Micro-benchmarks for hot paths.")
+    p.add_argument("--n", type=int, default=20_000, help="每项的迭代次数（默认 20,000）")
+    p.add_argument("--per_page", type=int, default=20, help="parse_api_json 每页条数（默认 20）")
+    return p.parse_args()
+
+
+def report(name, n, elapsed, unit="ops"):
+    print(f"{name:<38}: {n / elapsed:>12,.0f} {unit}/s  {elapsed / n * 1e6:>9.2f} us/{unit[:-1]}")
+
+
+def make_spider():
+    settings = get_project_settings()
+    settings.set("MYCF_ROUTE_CACHE", None)
+    crawler = Crawler(MyCareersFutureSpider, settings)
+    spider = MyCareersFutureSpider.from_crawler(crawler, incremental=0, within_days=7, max_pages=1)
+    spider.route = ("POST", 0)
+    return spider
+
+
+def bench_posted_within_days(spider, n):
+    samples = POSTED_SAMPLES * (n // len(POSTED_SAMPLES) + 1)
+    samples = samples[:n]
+    t0 = time.perf_counter()
+    for s in samples:
+        spider._posted_within_days(s)
+    report("_posted_within_days", n, time.perf_counter() - t0)
+
+
+def bench_parse_api_json(spider, n, per_page):
+    request = JsonRequest(spider.api_base, data={"page": 0}, meta={"mycf_route": ("POST", 0), "mycf_probe": False})
+    jobs = make_jobs("data scientist", 0, per_page, per_page, days=3)
+    pages = max(1, n // per_page)
+    for shape in SHAPES:
+        body = json.dumps(wrap(shape, jobs, per_page)).encode("utf-8")
+        response = TextResponse(spider.api_base, body=body, encoding="utf-8", request=request)
+        t0 = time.perf_counter()
+        items = 0
+        for _ in range(pages):
+            for out in spider.parse_api_json(response, query="data scientist", page_index=0, source_url=spider.api_base):
+                items += 1
+        report(f"parse_api_json [{shape}]", items, time.perf_counter() - t0, unit="items")
+
+
+def bench_split_export(n, cls=SplitExportPipeline, label="SplitExportPipeline"):
+    with tempfile.TemporaryDirectory() as tmp:
+        pipe = cls(base_dir=os.path.join(tmp, "output"), split_mode="keyword", flush_interval=0)
+        pipe.open_spider(None)
+        items = [
+            JobSummaryItem(
+                search_query=f"keyword {i % 50}", page_index=0, title="Data Scientist", company="ACME",
+                location="Central", salary="5000-8000 SGD", posted="2025-10-12T08:30:00.000Z",
+                posted_ts=1760257800, employment_type="Full Time", seniority="Executive", category="Information Technology",
+                job_url=f"https://www.mycareersfuture.gov.sg/job/{i}", source_url="https://www.mycareersfuture.gov.sg/search",
+            )
+            for i in range(n)
+        ]
+        t0 = time.perf_counter()
+        for item in items:
+            pipe.process_item(item, None)
+        pipe.close_spider(None)
+        report(f"{label} (50 keywords)", n, time.perf_counter() - t0, unit="items")
+
+
+def main():
+    args = parse_args()
+    spider = make_spider()
+    bench_posted_within_days(spider, args.n)
+    bench_parse_api_json(spider, args.n, args.per_page)
+    bench_split_export(args.n)
+    bench_split_export(args.n, ColumnarExportPipeline, f"ColumnarExport [{'parquet' if has_parquet() else 'csv'}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复查找基准：库里存量逐步涨到 --sizes 的各档，每档送入一批探测岗位（一半是库中岗位的“重发”——
+标题加 (Urgent) / Hiring Now / 复数 / 缩写、公司名换大小写和后缀，一半是新岗位），报告：
+
+  - SimHash + 分段桶查找（NearDuplicatePipeline 的做法）每条耗时，应当基本不随存量增长
+  - 逐条和全部已存指纹比汉明距离（朴素做法）每条耗时，随存量线性增长（只在较小的档位跑）
+  - 重发岗位的召回率、新岗位被误判为重复的比例
+
+  python -m benchmarks.bench_neardup --sizes 10000,100000,1000000 --probes 2000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from mycf import db, neardup
+
+SENIORITY = ["", "Senior ", "Junior ", "Lead ", "Principal ", "Assistant ", "Associate ", "Head of "]
+DOMAIN = [
+    "Software", "Data", "Quant", "Risk", "Compliance", "Marketing", "Sales", "Finance", "Operations", "Product",
+    "Security", "Cloud", "Network", "Audit", "Tax", "Treasury", "Payroll", "Logistics", "Procurement", "HR",
+    "Legal", "Research", "Clinical", "Mechanical", "Electrical", "Civil", "Retail", "Customer Service",
+    "Business Development", "Design",
+]
+ROLE = ["Engineer", "Analyst", "Manager", "Executive", "Specialist", "Consultant", "Developer", "Officer",
+        "Scientist", "Architect", "Coordinator", "Administrator", "Associate", "Director", "Technician"]
+LOCATIONS = ["Central", "East", "West", "North", "North-East", "Islandwide"]
+SUFFIXES = ["Pte. Ltd.", "PTE LTD", "Private Limited", "Pte Ltd", "(S) Pte. Ltd."]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark SimHash near-duplicate lookup vs stored postings.")
+    p.add_argument("--sizes", default="10000,100000,1000000", help="存量档位，逗号分隔（默认 10k,100k,1M）")
+    p.add_argument("--probes", type=int, default=2000, help="每档送入的探测岗位数（默认 2000）")
+    p.add_argument("--brute_max", type=int, default=100_000, help="朴素全量比较只在存量不超过此值时跑（默认 100k）")
+    p.add_argument("--distance", type=int, default=3)
+    p.add_argument("--db", default=None, help="数据库路径（默认临时目录）")
+    return p.parse_args()
+
+
+def make_job(rnd):
+    title = f"{rnd.choice(SENIORITY)}{rnd.choice(DOMAIN)} {rnd.choice(ROLE)}"
+    company = f"Company {rnd.randrange(50_000)} {rnd.choice(SUFFIXES)}"
+    return title, company, rnd.choice(LOCATIONS)
+
+
+def repost(rnd, job):
+    """同一岗位换个写法重发。"""
+    title, company, location = job
+    edit = rnd.randrange(5)
+    if edit == 0:
+        title += " (Urgent)"
+    elif edit == 1:
+        title += " - Hiring Now"
+    elif edit == 2:
+        title += "s"
+    elif edit == 3:
+        title = title.replace("Senior ", "Sr. ").replace("Manager", "Mgr") + " x2"
+    else:
+        title = title.upper()
+    name = company.rsplit(" ", 2)[0] if "Private Limited" not in company else company.replace(" Private Limited", "")
+    company = f"{name.upper()} {rnd.choice(SUFFIXES)}"
+    return title, company, location
+
+
+def grow(conn, rnd, start, stop, stored):
+    """存量从 start 涨到 stop：算指纹后批量写入（各自成簇，不查重），触发器维护 simhash_index。"""
+    batch = []
+    for i in range(start, stop):
+        job = make_job(rnd)
+        h = neardup.to_signed(neardup.simhash(*job))
+        batch.append((f"https://www.mycareersfuture.gov.sg/job/bench-{i}", *job, h, h))
+        if len(stored) < 20_000:
+            stored.append(job)
+        if len(batch) >= 10_000:
+            _insert(conn, batch)
+    _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    conn.executemany(
+        "INSERT OR IGNORE INTO jobs (job_url, title, company, location, simhash, cluster_id) VALUES (?, ?, ?, ?, ?, ?)",
+        batch,
+    )
+    conn.commit()
+    batch.clear()
+
+
+def probe(conn, rnd, stored, n, distance):
+    """一半重发、一半新岗位；返回 (每条秒数, 重发召回率, 新岗位误判率)。"""
+    index = neardup.NearDupIndex(conn, distance)
+    jobs = [(repost(rnd, rnd.choice(stored)), True) if i % 2 == 0 else (make_job(rnd), False) for i in range(n)]
+    for job, _ in jobs[:100]:            # 预热：正则、特征缓存、页缓存
+        index.match(neardup.simhash(*job))
+    hits = false_hits = 0
+    t0 = time.perf_counter()
+    for job, is_repost in jobs:
+        cluster, _ = index.match(neardup.simhash(*job))
+        if cluster is not None:
+            if is_repost:
+                hits += 1
+            else:
+                false_hits += 1
+    elapsed = time.perf_counter() - t0
+    half = n / 2
+    return elapsed / n, hits / half, false_hits / half
+
+
+def brute_force(conn, rnd, stored, n, distance):
+    """朴素做法：和库里全部指纹逐个比（指纹先全部读进内存，只计比较时间）。"""
+    hashes = [neardup.to_unsigned(h) for (h,) in conn.execute("SELECT simhash FROM jobs")]
+    jobs = [repost(rnd, rnd.choice(stored)) for _ in range(n)]
+    t0 = time.perf_counter()
+    for job in jobs:
+        h = neardup.simhash(*job)
+        any(bin(h ^ other).count("1") <= distance for other in hashes)
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    args = parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    tmp = None
+    db_path = args.db
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "bench.sqlite")
+    conn = db.connect(db_path)
+    rnd = random.Random(7)
+    stored = []
+
+    print(f"{'stored':>10s} {'grow':>8s} {'index us/item':>14s} {'brute us/item':>14s} {'recall':>7s} {'false+':>7s}")
+    size = 0
+    for target in sizes:
+        t0 = time.perf_counter()
+        grow(conn, rnd, size, target, stored)
+        grow_s = time.perf_counter() - t0
+        size = target
+        per_item, recall, false_rate = probe(conn, rnd, stored, args.probes, args.distance)
+        brute = "-"
+        if size <= args.brute_max:
+            brute = f"{brute_force(conn, rnd, stored, min(200, args.probes), args.distance) * 1e6:,.0f}"
+        print(f"{size:>10,d} {grow_s:7.1f}s {per_item * 1e6:14,.1f} {brute:>14s} {recall:7.1%} {false_rate:7.2%}")
+
+    conn.close()
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
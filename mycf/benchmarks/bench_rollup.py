@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汇总表基准：
+
+  - 写入：同样按 500 行一批 executemany 写 jobs，有 / 没有汇总触发器各跑一遍，看触发器的额外开销
+  - 查询：库里 --rows 条岗位时，read_jobs.py summary 的三类问题（各分类每天岗位数、各关键词薪资、
+    招聘最多的公司）分别从汇总表读 vs 直接在 jobs 上 GROUP BY
+
+  python -m benchmarks.bench_rollup --rows 1000000 --insert_rows 100000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from mycf import db
+from mycf.read_jobs import summary
+from mycf.salary import parse_salary
+
+CATEGORIES = [f"Category {i}" for i in range(40)]
+KEYWORDS = [f"keyword {i}" for i in range(200)]
+
+INSERT_SQL = """INSERT OR IGNORE INTO jobs
+    (job_url, search_query, title, company, location, posted, posted_ts, category, salary, salary_min, salary_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+SCAN_QUERIES = (
+    ("category x day", """SELECT category, date(posted_ts, 'unixepoch', '+8 hours') AS day, COUNT(*)
+                          FROM jobs WHERE posted_ts >= ? GROUP BY 1, 2"""),
+    ("keyword salary", """SELECT search_query, COUNT(*), COUNT(COALESCE(salary_min, salary_max)), MIN(salary_min), AVG(salary_min),
+                                 AVG(salary_max), MAX(salary_max)
+                          FROM jobs WHERE posted_ts >= ? GROUP BY 1 ORDER BY 2 DESC LIMIT 10"""),
+    ("top companies", """SELECT company, COUNT(*) FROM jobs WHERE posted_ts >= ?
+                         GROUP BY 1 ORDER BY 2 DESC LIMIT 10"""),
+)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark rollup tables vs scanning jobs.")
+    p.add_argument("--rows", type=int, default=1_000_000, help="查询基准的库大小（默认 1,000,000）")
+    p.add_argument("--insert_rows", type=int, default=100_000, help="写入基准的行数（默认 100,000）")
+    p.add_argument("--since_days", type=int, default=30)
+    p.add_argument("--runs", type=int, default=5, help="每个查询跑几次取中位数（默认 5）")
+    return p.parse_args()
+
+
+def make_rows(start, n, rnd, now):
+    for i in range(start, start + n):
+        low = rnd.randrange(2000, 15000, 500)
+        salary = f"{low}-{low + rnd.randrange(500, 8000, 500)} SGD" if rnd.random() < 0.9 else None
+        salary_min, salary_max, _ = parse_salary(salary)
+        ts = now - rnd.randrange(365 * 86400)
+        yield (f"https://www.mycareersfuture.gov.sg/job/bench-{i}", rnd.choice(KEYWORDS), "Bench Analyst",
+               f"Company {int(rnd.paretovariate(1.2)) % 50_000}", "Central", None, ts,
+               rnd.choice(CATEGORIES), salary, salary_min, salary_max)
+
+
+def insert(conn, rows, batch=500):
+    t0 = time.perf_counter()
+    buf = []
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= batch:
+            conn.executemany(INSERT_SQL, buf)
+            conn.commit()
+            buf.clear()
+    if buf:
+        conn.executemany(INSERT_SQL, buf)
+        conn.commit()
+    return time.perf_counter() - t0
+
+
+def median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    args = parse_args()
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        # ---------- 写入开销 ----------
+        for label, with_rollups in (("without rollup trigger", False), ("with rollup trigger", True)):
+            conn = db.connect(os.path.join(tmp, f"insert-{with_rollups}.sqlite"))
+            if not with_rollups:
+                conn.execute("DROP TRIGGER jobs_rollup_ai")
+            elapsed = insert(conn, make_rows(0, args.insert_rows, random.Random(1), now))
+            print(f"insert {args.insert_rows:,} rows {label:24s}: {args.insert_rows / elapsed:>10,.0f} rows/s")
+            conn.close()
+
+        # ---------- 查询 ----------
+        conn = db.connect(os.path.join(tmp, "query.sqlite"))
+        conn.execute("DROP TRIGGER jobs_rollup_ai")        # 先不带触发器灌数据，最后一次性重算，省时间
+        t0 = time.perf_counter()
+        insert(conn, make_rows(0, args.rows, random.Random(2), now), batch=10_000)
+        db.rebuild_rollups(conn)
+        print(f"seeded {args.rows:,} rows + rollups in {time.perf_counter() - t0:.1f}s")
+
+        cutoff = now - args.since_days * 86400
+        for name, sql in SCAN_QUERIES:
+            ms = median_ms(lambda: conn.execute(sql, (cutoff,)).fetchall(), args.runs)
+            print(f"scan jobs      {name:16s}: {ms:9.1f} ms")
+        with contextlib.redirect_stdout(io.StringIO()):
+            ms = median_ms(lambda: summary(conn, args.since_days), args.runs)
+        print(f"rollup summary {'(all three)':16s}: {ms:9.1f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
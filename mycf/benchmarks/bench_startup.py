@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动基准：每次在全新子进程里跑一遍“导入爬虫 → 建 Crawler → 发出第一个请求”就退出，
+报告导入耗时、到第一个请求进入下载器的耗时，以及整个进程的墙钟时间（含解释器启动），取中位数。
+
+  full+playwright：完整配置，且在模块顶层导入 scrapy_playwright（旧行为）
+  full           ：完整配置，Playwright 只在 DOM 兜底时才导入
+  api            ：MYCF_PROFILE=api 精简配置
+
+  python -m benchmarks.bench_startup --runs 7
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+T0 = time.perf_counter()
+
+PROFILES = (
+    ("full+playwright", {"MYCF_PROFILE": "full"}, True),
+    ("full", {"MYCF_PROFILE": "full"}, False),
+    ("api", {"MYCF_PROFILE": "api"}, False),
+)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Startup / time-to-first-request benchmark.")
+    p.add_argument("--runs", type=int, default=5, help="每种配置跑几次（取中位数，默认 5）")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    p.add_argument("--api_base", default=None, help=argparse.SUPPRESS)
+    p.add_argument("--eager_playwright", action="store_true", help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+# ---------- 子进程 ----------
+def child(args):
+    """导入 → 第一个请求进入下载器时记时间并停止，结果以 JSON 打到 stdout。"""
+    if args.eager_playwright:
+        import scrapy_playwright.page  # noqa: F401
+    from mycf.spiders.mycf_jobs import MyCareersFutureSpider
+    t_import = time.perf_counter()
+
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.setdict({
+        "MYCF_API_BASE": args.api_base,
+        "MYCF_ROUTE_CACHE": None,
+        "LOG_LEVEL": "ERROR",
+        "DOWNLOAD_DELAY": 0,
+    }, priority="cmdline")
+    process = CrawlerProcess(settings, install_root_handler=False)
+    crawler = process.create_crawler(MyCareersFutureSpider)
+    result = {"import_s": t_import - T0}
+
+    def first_request(request, spider):
+        if "first_request_s" not in result:
+            result["first_request_s"] = time.perf_counter() - T0
+            crawler.engine.close_spider(spider, "first_request")
+
+    crawler.signals.connect(first_request, signal=signals.request_reached_downloader)
+    process.crawl(crawler, q="quant", max_pages=1)
+    process.start()
+    result["modules"] = len(sys.modules)
+    result["playwright_loaded"] = "scrapy_playwright" in sys.modules
+    print(json.dumps(result))
+
+
+# ---------- 主进程 ----------
+def run_once(env, eager, api_base, workdir):
+    cmd = [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--api_base", api_base]
+    if eager:
+        cmd.append("--eager_playwright")
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child_env = {**os.environ, **env, "SCRAPY_SETTINGS_MODULE": "mycf.settings",
+                 "PYTHONPATH": project_dir + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, env=child_env, cwd=workdir, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - t0
+    result = json.loads(out.strip().splitlines()[-1])
+    result["wall_s"] = wall
+    return result
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child(args)
+        return
+
+    from benchmarks.stub_api import StubConfig, serve
+
+    server, api_base = serve(StubConfig(total=20))
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'profile':16s} {'import':>8s} {'1st request':>12s} {'process wall':>13s} {'modules':>8s}  playwright")
+        for name, env, eager in PROFILES:
+            runs = [run_once(env, eager, api_base, workdir) for _ in range(args.runs)]
+            med = {k: statistics.median(r[k] for r in runs) for k in ("import_s", "first_request_s", "wall_s", "modules")}
+            print(f"{name:16s} {med['import_s'] * 1000:6.0f}ms {med['first_request_s'] * 1000:10.0f}ms "
+                  f"{med['wall_s'] * 1000:11.0f}ms {med['modules']:8.0f}  {runs[-1]['playwright_loaded']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
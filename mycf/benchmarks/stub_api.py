@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地搜索 API 桩服务，模拟 https://api.mycareersfuture.gov.sg/v2/search：
+  - POST（JSON 载荷）和 GET（查询参数）都支持，页码从 0 开始
+  - 可配置每个关键词的结果总数、响应延迟、响应结构（results/data/payload/result.results）和 429 比例
+  - --max_rps：令牌桶限流，超出速率返回 429 + Retry-After（模拟真实接口的限流，测自适应并发）
+  - 岗位按 postingDate 倒序，均匀分布在最近 --days 天内
+  - GET /v2/jobs/<uuid> 返回搜索结果里出现过的岗位详情（带描述/技能等大字段）
+
+  python -m benchmarks.stub_api --port 8765 --total 500 --latency 0.05 --shape results --rate_429 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse as ul
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SHAPES = ("results", "data", "payload", "result.results")
+
+CATEGORIES = ["Information Technology", "Banking and Finance", "Engineering", "Sciences / Laboratory / R&D"]
+EMPLOYMENT_TYPES = ["Full Time", "Contract", "Permanent"]
+SENIORITIES = ["Executive", "Senior Executive", "Manager", "Professional"]
+LOCATIONS = ["Central", "East", "West", "North", "Islandwide"]
+
+
+def make_jobs(query, start, count, total, days=30, now=None, full=False):
+    """生成第 start..start+count 条岗位（确定性，重复调用结果一致）。full=True 时附带真实接口里的大字段。"""
+    # 取整到小时：同一小时内多次运行（如增量 / 详情补全的第二次运行）看到的 postingDate 不变
+    now = now or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    step = timedelta(days=days) / max(total, 1)
+    slug = ul.quote(query.replace(" ", "-"))
+    jobs = []
+    for i in range(start, min(start + count, total)):
+        rnd = random.Random(f"{query}:{i}")
+        uuid = f"{rnd.getrandbits(128):032x}"
+        low = rnd.randrange(3000, 12000, 500)
+        jobs.append({
+            "uuid": uuid,
+            "title": f"{query.title()} {rnd.choice(['Analyst', 'Engineer', 'Lead', 'Specialist'])}",
+            "company": {"name": f"Company {rnd.randrange(500)} Pte. Ltd."},
+            "location": rnd.choice(LOCATIONS),
+            "minSalary": low,
+            "maxSalary": low + rnd.randrange(1000, 6000, 500),
+            "salaryCurrency": "SGD",
+            "postingDate": (now - step * i).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "employmentType": rnd.choice(EMPLOYMENT_TYPES),
+            "seniority": rnd.choice(SENIORITIES),
+            "category": rnd.choice(CATEGORIES),
+            "jobDetailsUrl": f"/job/{slug}-{uuid}",
+        })
+        if full:
+            jobs[-1].update({
+                "description": "<p>" + " ".join(f"Responsibility {k} for the {query} role." for k in range(40)) + "</p>",
+                "skills": [{"uuid": f"{k:032x}", "skill": f"Skill {k}", "confidence": 0.9} for k in range(12)],
+                "address": {"block": str(rnd.randrange(1, 999)), "street": "Raffles Place", "postalCode": "048616",
+                            "isOverseas": False, "lat": 1.284, "lng": 103.851},
+                "metadata": {"jobPostId": f"MCF-2025-{rnd.randrange(10**7):07d}", "totalNumberOfView": rnd.randrange(500),
+                             "newPostingDate": jobs[-1]["postingDate"], "isPostedOnBehalf": False},
+                "schemes": [{"scheme": {"id": 1, "scheme": "P-Max"}, "subScheme": None}],
+                "numberOfVacancies": rnd.randrange(1, 5),
+            })
+    return jobs
+
+
+def wrap(shape, results, total):
+    """按指定结构包装结果列表。"""
+    if shape == "result.results":
+        return {"result": {"results": results, "total": total}}
+    return {shape: results, "total": total}
+
+
+class StubConfig:
+    def __init__(self, total=200, latency=0.0, shape="results", rate_429=0.0, days=30, retry_after=1, full=False,
+                 max_rps=0.0):
+        self.total = total
+        self.latency = latency
+        self.shape = shape
+        self.rate_429 = rate_429
+        self.days = days
+        self.retry_after = retry_after
+        self.full = full
+        self.max_rps = max_rps
+        self.tokens = max_rps
+        self.refilled = time.monotonic()
+        self.throttled = 0
+        self.requests = 0
+        self.detail_requests = 0
+        self.index = {}             # uuid -> (query, i)，详情接口用
+        self.lock = threading.Lock()
+
+
+def _take_token(config):
+    """令牌桶（容量 = 1 秒的量）；没令牌时返回建议的 Retry-After 秒数。"""
+    with config.lock:
+        now = time.monotonic()
+        config.tokens = min(config.max_rps, config.tokens + (now - config.refilled) * config.max_rps)
+        config.refilled = now
+        if config.tokens >= 1:
+            config.tokens -= 1
+            return None
+        config.throttled += 1
+        return max(1, math.ceil((1 - config.tokens) / config.max_rps))
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _respond(self, query, page, limit):
+            with config.lock:
+                config.requests += 1
+            if config.latency:
+                time.sleep(config.latency)
+            retry_after = _take_token(config) if config.max_rps else None
+            if retry_after is None and config.rate_429 and random.random() < config.rate_429:
+                retry_after = config.retry_after
+            if retry_after is not None:
+                self.send_response(429)
+                self.send_header("Retry-After", str(retry_after))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            results = make_jobs(query, page * limit, limit, config.total, days=config.days, full=config.full)
+            with config.lock:
+                for i, job in enumerate(results, start=page * limit):
+                    config.index[job["uuid"]] = (query, i)
+            body = json.dumps(wrap(config.shape, results, config.total)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                payload = {}
+            self._respond(payload.get("search", ""), int(payload.get("page", 0)), int(payload.get("limit", 20)))
+
+        def _detail(self, uuid):
+            with config.lock:
+                config.detail_requests += 1
+                found = config.index.get(uuid)
+            if config.latency:
+                time.sleep(config.latency)
+            if found is None:
+                body, status = b'{"message": "not found"}', 404
+            else:
+                query, i = found
+                job = make_jobs(query, i, 1, config.total, days=config.days, full=True)[0]
+                body, status = json.dumps(job).encode("utf-8"), 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = ul.urlparse(self.path).path
+            if path.startswith("/v2/jobs/"):
+                self._detail(path.rsplit("/", 1)[-1])
+                return
+            qs = ul.parse_qs(ul.urlparse(self.path).query)
+            self._respond(qs.get("search", [""])[0], int(qs.get("page", ["0"])[0]), int(qs.get("limit", ["20"])[0]))
+
+    return Handler
+
+
+def serve(config, host="127.0.0.1", port=0):
+    """在后台线程启动桩服务，返回 (server, base_url)。"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v2/search"
+
+
+def add_stub_args(p):
+    p.add_argument("--total", type=int, default=200, help="每个关键词的结果总数（默认 200）")
+    p.add_argument("--latency", type=float, default=0.0, help="每个响应的延迟秒数（默认 0）")
+    p.add_argument("--shape", choices=SHAPES, default="results", help="响应结构（默认 results）")
+    p.add_argument("--rate_429", type=float, default=0.0, help="返回 429 的比例（默认 0）")
+    p.add_argument("--retry_after", type=int, default=1, help="429 响应的 Retry-After 秒数（默认 1）")
+    p.add_argument("--max_rps", type=float, default=0.0, help="每秒最多放行多少请求，超出返回 429（默认 0 = 不限）")
+    p.add_argument("--days", type=int, default=30, help="岗位发布时间分布在最近多少天（默认 30）")
+    p.add_argument("--full", action="store_true", help="附带描述/技能/地址等大字段，接近真实响应体积")
+
+
+def config_from_args(args):
+    return StubConfig(total=args.total, latency=args.latency, shape=args.shape, rate_429=args.rate_429,
+                      retry_after=args.retry_after, days=args.days, full=args.full, max_rps=args.max_rps)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Local stand-in for the MyCareersFuture search API.")
+    p.add_argument("--port", type=int, default=8765)
+    add_stub_args(p)
+    args = p.parse_args()
+    server, url = serve(config_from_args(args), port=args.port)
+    print(f"serving {url}  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷热分层：mycf_jobs.sqlite 只留最近 keep_days 天发布的岗位，更早的按发布月份（新加坡时间）
+搬进 archive/jobs-YYYY-MM.sqlite.gz（每月一个 gzip 压缩的 SQLite，表结构同主库，含全文索引）。
+
+  - 判重不受影响：url_hashes 表记着所有入过库的岗位（含已归档的），去重管道和增量停止都查它；
+    simhash_index 也不删，近似重复照样能匹配到已归档的岗位
+  - 汇总表（rollup_*）是累计值，归档不扣减
+  - 先写好分区文件（临时文件 + os.replace）再从主库删除，中途失败不丢数据；
+    同一岗位重复归档按 job_url INSERT OR IGNORE，可以放心重跑
+  - posted_ts 为空的岗位不归档
+  - 最后整理主库：FTS 段合并、VACUUM、PRAGMA optimize、WAL checkpoint。VACUUM 期间别同时跑爬虫
+
+  python mycf/archive.py --keep_days 90                 # 归档 + 整理
+  python mycf/archive.py --keep_days 90 --dry_run       # 只看各月会搬走多少行
+  python mycf/archive.py --list                         # 已有的分区
+  python mycf/read_jobs.py --include_archive --keyword "data scientist"   # 连同归档一起查
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 允许直接以脚本运行（python mycf/archive.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mycf import db  # noqa: E402
+from mycf.dates import SGT  # noqa: E402
+
+DAY = 86400
+PREFIX = "jobs-"
+SUFFIX = ".sqlite.gz"
+CACHE_DIR = ".cache"
+
+
+# ---------- 分区文件 ----------
+def default_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
+
+
+def partition_path(archive_dir, month):
+    return os.path.join(archive_dir, f"{PREFIX}{month}{SUFFIX}")
+
+
+def partitions(archive_dir):
+    """[(month, gz 路径)]，新的在前。"""
+    if not os.path.isdir(archive_dir):
+        return []
+    months = [name[len(PREFIX):-len(SUFFIX)] for name in os.listdir(archive_dir)
+              if name.startswith(PREFIX) and name.endswith(SUFFIX)]
+    return [(m, partition_path(archive_dir, m)) for m in sorted(months, reverse=True)]
+
+
+def _gunzip(src, dst):
+    with gzip.open(src, "rb") as fin, open(dst, "wb") as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+
+
+def _gzip(src, dst, level=6):
+    tmp = dst + ".tmp"
+    with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=level) as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+    os.replace(tmp, dst)
+
+
+def extract(archive_dir, months=None):
+    """
+    把分区解压到 archive_dir/.cache 供查询（gz 比缓存新时才重新解压）；返回 [(month, sqlite 路径)]，新的在前。
+    """
+    cache = os.path.join(archive_dir, CACHE_DIR)
+    out = []
+    for month, gz in partitions(archive_dir):
+        if months is not None and month not in months:
+            continue
+        path = os.path.join(cache, f"{PREFIX}{month}.sqlite")
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(gz):
+            os.makedirs(cache, exist_ok=True)
+            _gunzip(gz, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        out.append((month, path))
+    return out
+
+
+# ---------- 归档 ----------
+def month_bounds(month):
+    """'2025-10' → 该月（新加坡时间）的 [start, end) epoch 秒。"""
+    year, mon = (int(x) for x in month.split("-"))
+    start = datetime(year, mon, 1, tzinfo=SGT)
+    end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=SGT)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def pending_months(conn, cutoff):
+    """[(month, 行数)]：posted_ts 早于 cutoff 的岗位按发布月份分组。"""
+    return conn.execute(
+        """SELECT strftime('%Y-%m', posted_ts, 'unixepoch', '+8 hours') AS month, COUNT(*)
+           FROM jobs WHERE posted_ts < ? GROUP BY month ORDER BY month""",
+        (cutoff,),
+    ).fetchall()
+
+
+def archive_month(conn, archive_dir, month, cutoff):
+    """把 conn 里这个月（且早于 cutoff）的岗位和详情并入分区文件，写好后再从 conn 删除；返回搬走的行数。"""
+    start, end = month_bounds(month)
+    end = min(end, cutoff)
+    where = "posted_ts >= ? AND posted_ts < ?"
+    os.makedirs(archive_dir, exist_ok=True)
+    gz = partition_path(archive_dir, month)
+    with tempfile.TemporaryDirectory(dir=archive_dir) as tmp:
+        path = os.path.join(tmp, f"{PREFIX}{month}.sqlite")
+        if os.path.exists(gz):
+            _gunzip(gz, path)
+        db.connect(path).close()               # 新建或按当前版本补齐表结构
+
+        conn.execute("ATTACH DATABASE ? AS part", (path,))
+        try:
+            cols = ", ".join(db._columns(conn, "jobs"))
+            conn.execute(f"INSERT OR IGNORE INTO part.jobs ({cols}) SELECT {cols} FROM main.jobs WHERE {where}",
+                         (start, end))
+            detail_cols = ", ".join(db._columns(conn, "job_details"))
+            conn.execute(
+                f"""INSERT OR REPLACE INTO part.job_details ({detail_cols})
+                    SELECT {detail_cols} FROM main.job_details
+                    WHERE job_url IN (SELECT job_url FROM main.jobs WHERE {where})""",
+                (start, end),
+            )
+            conn.execute("DELETE FROM part.simhash_index")   # 近似重复只查主库的 simhash_index
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE part")
+
+        part = sqlite3.connect(path)
+        part.execute("PRAGMA journal_mode=DELETE")   # 单文件，方便压缩
+        part.execute("VACUUM")
+        part.close()
+        _gzip(path, gz)
+
+    # 分区已经落盘，再删主库里的行（FTS 由删除触发器同步；url_hashes / simhash_index 保留）
+    conn.execute(f"DELETE FROM job_details WHERE job_url IN (SELECT job_url FROM jobs WHERE {where})", (start, end))
+    moved = conn.execute(f"DELETE FROM jobs WHERE {where}", (start, end)).rowcount
+    conn.commit()
+    return moved
+
+
+def maintain(conn, vacuum=True):
+    """整理主库：FTS 段合并、VACUUM、更新查询规划统计、WAL checkpoint。"""
+    if db.has_fts(conn):
+        conn.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('optimize')")
+        conn.commit()
+    if vacuum:
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")   # WAL 模式下 VACUUM 的结果先写进 -wal，收回来
+
+
+def run(conn, archive_dir, keep_days=90, now=None, dry_run=False, vacuum=True):
+    """归档早于 keep_days 天的岗位并整理主库；返回 {month: 行数}。"""
+    cutoff = int(now or time.time()) - keep_days * DAY
+    months = pending_months(conn, cutoff)
+    moved = {}
+    for month, n in months:
+        if dry_run:
+            moved[month] = n
+            continue
+        t0 = time.perf_counter()
+        moved[month] = archive_month(conn, archive_dir, month, cutoff)
+        print(f"{month}: {moved[month]} 行 → {partition_path(archive_dir, month)}（{time.perf_counter() - t0:.1f}s）")
+    if not dry_run:
+        maintain(conn, vacuum=vacuum)
+    return moved
+
+
+# ---------- 命令行 ----------
+def parse_args():
+    p = argparse.ArgumentParser(description="Move old jobs into monthly compressed archive partitions.")
+    p.add_argument("--db", default="mycf_jobs.sqlite", help="SQLite 文件路径（默认 mycf_jobs.sqlite）")
+    p.add_argument("--archive_dir", default=None, help="归档目录（默认 数据库同目录下的 archive/）")
+    p.add_argument("--keep_days", type=int, default=90, help="主库保留最近多少天发布的岗位（默认 90）")
+    p.add_argument("--dry_run", action="store_true", help="只显示各月会归档多少行，不改动任何文件")
+    p.add_argument("--no_vacuum", action="store_true", help="归档后不做 VACUUM（只做 checkpoint / optimize）")
+    p.add_argument("--list", action="store_true", help="列出已有的归档分区")
+    return p.parse_args()
+
+
+def _size(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def main():
+    args = parse_args()
+    archive_dir = args.archive_dir or default_dir(args.db)
+    if args.list:
+        parts = partitions(archive_dir)
+        for month, gz in parts:
+            print(f"{month}  {os.path.getsize(gz) / 1e6:8.2f} MB  {gz}")
+        if not parts:
+            print(f"{archive_dir} 下还没有归档分区。")
+        return
+    if not os.path.exists(args.db):
+        raise SystemExit(f"找不到数据库文件：{args.db}")
+    if args.keep_days < 1:
+        raise SystemExit("--keep_days 至少为 1")
+
+    before = _size(args.db)
+    conn = db.connect(args.db)
+    t0 = time.perf_counter()
+    try:
+        moved = run(conn, archive_dir, args.keep_days, dry_run=args.dry_run, vacuum=not args.no_vacuum)
+    finally:
+        conn.close()
+    if args.dry_run:
+        for month, n in moved.items():
+            print(f"{month}: {n} 行")
+        print(f"合计 {sum(moved.values())} 行会归档到 {archive_dir}（早于 {args.keep_days} 天）")
+        return
+    print(f"完成：归档 {sum(moved.values())} 行（{len(moved)} 个月），主库 {before / 1e6:.1f} MB → "
+          f"{_size(args.db) / 1e6:.1f} MB，用时 {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# mycf/browser.py
+"""
+Playwright DOM 兜底用到的浏览器侧逻辑（USE_PLAYWRIGHT=1 时由 settings.py 启用）：
+  - contexts()：固定数量的命名浏览器上下文（mycf-0 … mycf-N-1），爬虫轮流分配，整个运行中复用
+  - should_abort_request()：PLAYWRIGHT_ABORT_REQUEST，拦掉图片 / 字体 / 媒体和统计类第三方请求
+  - goto_next()：在同一个页面里点“下一页”，等卡片列表换掉，不重新导航
+卡片和翻页按钮的选择器集中在这里，爬虫和基准（benchmarks/bench_browser.py）共用。
+"""
+from urllib.parse import urlsplit
+
+CARD_SELECTOR = "[data-testid='job-card'], a[data-testid='job-card-link']"
+NEXT_SELECTOR = (
+    "[data-testid='pagination-next'], button[aria-label='Next'], "
+    "a[aria-label='Next'], a[rel='next']"
+)
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+# 统计 / 广告 / 会话回放；按域名后缀匹配
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googleadservices.com",
+    "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "newrelic.com", "nr-data.net",
+    "adobedtm.com", "omtrdc.net", "demdex.net", "wogaa.sg",
+)
+
+
+def context_name(i: int) -> str:
+    return f"mycf-{i}"
+
+
+def contexts(n: int) -> dict:
+    """PLAYWRIGHT_CONTEXTS：n 个启动时就建好的上下文；屏蔽 service worker，否则拦截不到它发出的请求。"""
+    return {
+        context_name(i): {
+            "service_workers": "block",
+            "viewport": {"width": 1280, "height": 900},
+        }
+        for i in range(max(1, int(n)))
+    }
+
+
+def _blocked_host(host: str) -> bool:
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+def should_abort_request(request) -> bool:
+    """PLAYWRIGHT_ABORT_REQUEST：True = 不发这个请求。request 是 playwright 的 Request。"""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return _blocked_host(urlsplit(request.url).hostname or "")
+
+
+async def goto_next(page, timeout=15_000) -> bool:
+    """点“下一页”并等第一张卡片换掉；没有可点的下一页或超时返回 False。"""
+    from playwright.async_api import Error as PlaywrightError  # 可选依赖：只在 DOM 兜底时安装
+
+    button = page.locator(NEXT_SELECTOR).first
+    try:
+        if not await button.count() or await button.is_disabled():
+            return False
+        if await button.get_attribute("aria-disabled") == "true":
+            return False
+        cards = page.locator(CARD_SELECTOR)
+        before = await cards.first.inner_text() if await cards.count() else ""
+        await button.click(timeout=timeout)
+        await page.wait_for_function(
+            """([selector, before]) => {
+                const card = document.querySelector(selector);
+                return card !== null && card.innerText !== before;
+            }""",
+            arg=[CARD_SELECTOR, before],
+            timeout=timeout,
+        )
+    except PlaywrightError:  # TimeoutError 是它的子类
+        return False
+    return True
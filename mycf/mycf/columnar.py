@@ -0,0 +1,176 @@
+# mycf/columnar.py
+"""
+列式分区输出（ColumnarExportPipeline 和 compact.py 共用）：
+  output/parquet/date=<YYYY-MM-DD>/keyword=<关键词>/part-<运行ID>-<序号>.parquet
+  （MYCF_SPLIT_MODE=category 时第二层是 category_key=<分类>）
+
+  - 装了 pyarrow 写 Parquet：每批一个 row group，posted_ts 为 UTC 时间戳、薪资上下限为 float64
+  - 没装 pyarrow 退回同样目录结构的 CSV 分片（类型化列以文本写出）
+  - 写入中的分片以 "_" 开头，关闭后才改名；pyarrow.dataset 和 compact 都会跳过它们
+"""
+import csv
+import glob
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖
+    pa = pq = None
+
+COLUMNS = [
+    "search_query", "page_index",
+    "title", "company", "location",
+    "salary", "salary_min", "salary_max", "salary_currency",
+    "posted", "posted_ts",
+    "employment_type", "seniority", "category",
+    "job_url", "source_url",
+]
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("search_query", pa.string()),
+        ("page_index", pa.int32()),
+        ("title", pa.string()),
+        ("company", pa.string()),
+        ("location", pa.string()),
+        ("salary", pa.string()),
+        ("salary_min", pa.float64()),
+        ("salary_max", pa.float64()),
+        ("salary_currency", pa.string()),
+        ("posted", pa.string()),
+        ("posted_ts", pa.timestamp("s", tz="UTC")),
+        ("employment_type", pa.string()),
+        ("seniority", pa.string()),
+        ("category", pa.string()),
+        ("job_url", pa.string()),
+        ("source_url", pa.string()),
+    ])
+else:
+    SCHEMA = None
+
+
+def has_parquet() -> bool:
+    return pa is not None
+
+
+def partition_dir(base_dir, day, split_mode, key):
+    group = "keyword" if split_mode == "keyword" else "category_key"
+    return os.path.join(base_dir, f"date={day}", f"{group}={key}")
+
+
+# ---------- 分片写入 ----------
+class ParquetPart:
+    """一个 Parquet 分片：write() 一次写一个 row group，close() 写 footer 并改成正式文件名。"""
+    suffix = ".parquet"
+
+    def __init__(self, path, compression="zstd"):
+        self.path = path
+        self.tmp_path = os.path.join(os.path.dirname(path), "_" + os.path.basename(path))
+        self._writer = pq.ParquetWriter(self.tmp_path, SCHEMA, compression=compression)
+        self.rows = 0
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in COLUMNS}
+        self._writer.write_table(pa.table(columns, schema=SCHEMA))
+        self.rows += len(rows)
+
+    def close(self):
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class CsvPart:
+    """没装 pyarrow 时的分片：同样的列和目录结构，CSV 文本。"""
+    suffix = ".csv"
+
+    def __init__(self, path, compression=None):
+        self.path = path
+        self.tmp_path = os.path.join(os.path.dirname(path), "_" + os.path.basename(path))
+        self._file = open(self.tmp_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+        self.rows = 0
+
+    def write(self, rows):
+        self._writer.writerows([[row[name] for name in COLUMNS] for row in rows])
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def part_class(fmt="auto"):
+    """fmt: auto / parquet / csv；要 parquet 但没装 pyarrow 时退回 CSV。"""
+    if fmt == "csv" or pa is None:
+        return CsvPart
+    return ParquetPart
+
+
+# ---------- 合并小文件 ----------
+def list_parts(part_dir, suffix):
+    return sorted(
+        p for p in glob.glob(os.path.join(part_dir, "*" + suffix))
+        if not os.path.basename(p).startswith(("_", "."))
+    )
+
+
+def compact_partition(part_dir, min_files=2, compression="zstd"):
+    """把一个分区里的分片合并成一个（Parquet 和 CSV 各自合并）；返回 (合并掉的分片数, 行数)。"""
+    n_parts = n_rows = 0
+    for suffix in (".parquet", ".csv"):
+        parts = list_parts(part_dir, suffix)
+        if len(parts) < min_files or (suffix == ".parquet" and pq is None):
+            continue
+        out = os.path.join(part_dir, f"part-compacted-{time.time_ns()}{suffix}")
+        tmp = os.path.join(part_dir, "_" + os.path.basename(out))
+        if suffix == ".parquet":
+            rows = _merge_parquet(parts, tmp, compression)
+        else:
+            rows = _merge_csv(parts, tmp)
+        os.replace(tmp, out)
+        for p in parts:
+            os.remove(p)
+        n_parts += len(parts)
+        n_rows += rows
+    return n_parts, n_rows
+
+
+def _merge_parquet(parts, tmp, compression):
+    rows = 0
+    with pq.ParquetWriter(tmp, SCHEMA, compression=compression) as writer:
+        for p in parts:
+            table = pq.read_table(p, schema=SCHEMA)
+            writer.write_table(table)
+            rows += table.num_rows
+    return rows
+
+
+def _merge_csv(parts, tmp):
+    rows = 0
+    with open(tmp, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        for p in parts:
+            with open(p, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    writer.writerow(row)
+                    rows += 1
+    return rows
+
+
+def compact_day(base_dir, day, min_files=2, compression="zstd"):
+    """合并某一天所有分区；返回 [(分区目录, 合并前分片数, 行数), ...]。"""
+    results = []
+    for part_dir in sorted(glob.glob(os.path.join(base_dir, f"date={day}", "*=*"))):
+        if not os.path.isdir(part_dir):
+            continue
+        n_parts, rows = compact_partition(part_dir, min_files, compression)
+        if n_parts:
+            results.append((part_dir, n_parts, rows))
+    return results
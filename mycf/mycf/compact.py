@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并列式输出里某一天的小分片（每个 date=/keyword= 分区合成一个文件）。
+
+  python mycf/compact.py --date 2025-10-12
+  python mycf/compact.py --date yesterday --dir output/parquet --min_files 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 允许直接以脚本运行（python mycf/compact.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mycf import columnar  # noqa: E402
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compact a day's columnar export parts.")
+    p.add_argument("--dir", default=os.path.join("output", "parquet"), help="列式输出根目录（默认 output/parquet）")
+    p.add_argument("--date", default="yesterday", help="要合并的日期：YYYY-MM-DD / today / yesterday（默认 yesterday）")
+    p.add_argument("--min_files", type=int, default=2, help="分区里至少有几个分片才合并（默认 2）")
+    p.add_argument("--compression", default="zstd", help="合并后 Parquet 的压缩方式（默认 zstd）")
+    return p.parse_args()
+
+
+def resolve_day(value):
+    if value == "today":
+        return datetime.now().strftime("%Y-%m-%d")
+    if value == "yesterday":
+        return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def main():
+    args = parse_args()
+    day = resolve_day(args.date)
+    if not columnar.has_parquet():
+        print("pyarrow 未安装：只合并 CSV 分片。")
+    t0 = time.perf_counter()
+    results = columnar.compact_day(args.dir, day, args.min_files, args.compression)
+    for part_dir, n_parts, rows in results:
+        print(f"{os.path.relpath(part_dir, args.dir)}: {n_parts} 个分片 → 1（{rows} 行）")
+    if not results:
+        print(f"date={day} 下没有需要合并的分区。")
+    else:
+        print(f"完成：{len(results)} 个分区，用时 {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# mycf/dates.py
+"""
+posted 字段的统一解析：ISO 时间、纯日期、"12 Oct 2025"、相对时间（"3 days ago" / "yesterday" / "5 hours ago"）
+都转成 UTC epoch 秒。API 路径和 DOM 路径共用，结果按原字符串缓存。
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+SGT = timezone(timedelta(hours=8))  # 新加坡/UTC+8，纯日期按本地零点算
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_RELATIVE = re.compile(r"(\d+|an?|one)\s*(second|sec|minute|min|hour|hr|day|week|month|year)s?\b")
+_UNIT_SECONDS = {
+    "second": 1, "sec": 1,
+    "minute": 60, "min": 60,
+    "hour": 3600, "hr": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+    "month": 30 * 86400,
+    "year": 365 * 86400,
+}
+_TEXT_FORMATS = ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%d/%m/%Y")
+
+
+class PostedNormalizer:
+    """把 posted 文本转成 UTC epoch 秒；相对时间以 now 为基准，所以一个实例对应一次运行。"""
+
+    def __init__(self, now=None, tz=SGT, cache_size=100_000):
+        self.tz = tz
+        self.now = now or datetime.now(tz)
+        self.now_ts = int(self.now.timestamp())
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def to_epoch(self, value):
+        """解析失败返回 None。"""
+        if not value:
+            return None
+        try:
+            return self._cache[value]
+        except KeyError:
+            pass
+        ts = self._parse(str(value))
+        if len(self._cache) < self.cache_size:
+            self._cache[value] = ts
+        return ts
+
+    def _parse(self, value):
+        s = value.strip()
+        if _ISO_DATE.match(s):
+            try:
+                d = datetime.fromisoformat(s.replace("Z", "+00:00"))
+            except ValueError:
+                try:
+                    d = datetime.strptime(s[:10], "%Y-%m-%d")
+                except ValueError:
+                    return None
+            if d.tzinfo is None:
+                d = d.replace(tzinfo=self.tz)
+            return int(d.timestamp())
+
+        low = s.lower()
+        if low.startswith("posted"):
+            low = low[6:].strip(" :")
+        if "yesterday" in low:
+            return self.now_ts - 86400
+        if low in ("today", "just now", "now") or "just now" in low:
+            return self.now_ts
+        m = _RELATIVE.search(low)
+        if m:
+            amount = m.group(1)
+            n = int(amount) if amount.isdigit() else 1
+            return self.now_ts - n * _UNIT_SECONDS[m.group(2)]
+
+        text = s[6:].strip(" :") if s.lower().startswith("posted") else s
+        for fmt in _TEXT_FORMATS:
+            try:
+                return int(datetime.strptime(text, fmt).replace(tzinfo=self.tz).timestamp())
+            except ValueError:
+                continue
+        return None
+
+
+def date_prefix_range(prefix, tz=SGT):
+    """
+    日期前缀 → [start, end) 的 epoch 秒，和 posted LIKE '前缀%' 对 ISO 日期的匹配范围一致：
+    "2025" / "2025-10" / "2025-10-12"（可带结尾的 % 或 -）；末尾只写一位的月 / 日按字符串前缀算，
+    "2025-10-1" 是 10–19 日，"2025-1" 是 10–12 月。换算不了（不是这种形状、月 / 日越界、
+    "2025-02-3" 这种一天都不匹配）返回 None，由调用方退回 LIKE。
+    """
+    p = (prefix or "").rstrip("%")
+    m = re.fullmatch(r"(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?(-?)", p)
+    if not m:
+        return None
+    year, month, day, dash = int(m.group(1)), m.group(2), m.group(3), m.group(4)
+    try:
+        if month is None:
+            start = datetime(year, 1, 1, tzinfo=tz)
+            end = datetime(year + 1, 1, 1, tzinfo=tz)
+        elif day is None:
+            months = _prefix_span(month, not dash, 12)
+            if months is None:
+                return None
+            start = datetime(year, months[0], 1, tzinfo=tz)
+            end = datetime(year + (months[1] == 12), months[1] % 12 + 1, 1, tzinfo=tz)
+        else:
+            month = _prefix_span(month, False, 12)
+            if month is None:
+                return None
+            next_month = datetime(year + (month[0] == 12), month[0] % 12 + 1, 1)
+            days = _prefix_span(day, not dash, (next_month - timedelta(days=1)).day)
+            if days is None:
+                return None
+            start = datetime(year, month[0], days[0], tzinfo=tz)
+            end = datetime(year, month[0], days[1], tzinfo=tz) + timedelta(days=1)
+    except (ValueError, OverflowError):
+        return None
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _prefix_span(digits, partial, last):
+    """月 / 日字段 → 闭区间 (first, last)：两位数就是它本身；partial 时一位数 d 是 d0–d9 落在 1..last 的部分。"""
+    if len(digits) == 2:
+        value = int(digits)
+        return (value, value) if 1 <= value <= last else None
+    if not partial:
+        return None
+    first, end = max(1, int(digits) * 10), min(last, int(digits) * 10 + 9)
+    return (first, end) if first <= end else None
@@ -0,0 +1,517 @@
+# mycf/db.py
+"""
+mycf_jobs.sqlite 的连接与表结构，管道和爬虫共用。
+  - jobs：去重主表（job_url 为主键；posted_ts 为 posted 解析出的 UTC epoch 秒）
+    分类 / 关键词 / posted_ts 上有二级索引；jobs_fts 为 title/company/category 的 FTS5 全文索引（触发器同步）
+  - url_hashes：所有入过库的岗位（含已归档到 archive/ 的）job_url 的 64 位哈希，判重只看它
+  - keyword_watermarks：每个关键词的高水位（最新 postingDate + 最近见过的 job_url），供增量抓取
+  - job_details：详情补全的侧表（content_hash 为抓详情时摘要字段的哈希，见 mycf/details.py）
+  - crawl_progress：本次运行已完成的（关键词, 页）单元，中断后 -a resume=1 只补抓没完成的
+  - keyword_plan：-a plan=1 时每次运行的关键词计划与实际结果（见 mycf/planner.py）
+  - simhash_index：近似重复（换 URL 重发的岗位）的 SimHash 分段查找表，jobs 插入触发器维护
+  - rollup_*：按分类×天、关键词×月（含薪资）、公司×月的汇总计数，jobs 插入触发器维护，
+    read_jobs.py summary 直接读它们
+分片运行时（mycf/launcher.py）每个分片写自己的库，主库以只读方式 ATTACH 为 seed，
+判重 / 高水位 / 详情哈希同时查两边；结束后 merge_shard() 把分片库并回主库。
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+from hashlib import blake2b
+
+from mycf.dates import PostedNormalizer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_url TEXT PRIMARY KEY,
+    search_query TEXT,
+    title TEXT,
+    company TEXT,
+    location TEXT,
+    posted TEXT,
+    posted_ts INTEGER,
+    employment_type TEXT,
+    seniority TEXT,
+    category TEXT,
+    simhash INTEGER,            -- title/company/location 的 SimHash（有符号 64 位），见 mycf/neardup.py
+    cluster_id INTEGER,         -- 近似重复簇：簇里第一条岗位的 simhash
+    salary TEXT,                -- 爬虫拼出的薪资文本（如 "5000-8000 SGD"）
+    salary_min REAL,            -- salary 解析出的数值（见 mycf/salary.py）
+    salary_max REAL
+);
+CREATE TABLE IF NOT EXISTS url_hashes (
+    hash INTEGER PRIMARY KEY    -- url_hash(job_url)；jobs 行归档后仍保留
+);
+CREATE TABLE IF NOT EXISTS keyword_watermarks (
+    search_query TEXT PRIMARY KEY,
+    newest_posted TEXT,
+    recent_urls TEXT,           -- JSON 数组，新的在前
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS job_details (
+    job_url TEXT PRIMARY KEY,
+    content_hash TEXT,
+    description TEXT,
+    skills TEXT,                -- JSON 数组
+    vacancies INTEGER,
+    min_experience INTEGER,
+    address TEXT,
+    job_post_id TEXT,
+    updated_at TEXT,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_progress (
+    search_query TEXT,
+    page INTEGER,               -- 相对页码起点的偏移；-1（QUERY_DONE）表示该关键词已全部抓完
+    route TEXT,                 -- "POST:0" / "GET:1" / "DOM"
+    items INTEGER,
+    done_at TEXT,
+    PRIMARY KEY (search_query, page)
+);
+CREATE TABLE IF NOT EXISTS keyword_plan (
+    run_id TEXT,                -- 运行开始时间（ISO）
+    search_query TEXT,
+    rank INTEGER,               -- 调度顺序（0 最先）
+    pages INTEGER,              -- 分到的页数
+    expected_results REAL,      -- 预计结果数；NULL = 没有历史
+    expected_new REAL,          -- 预计结果数 × 不与前面关键词重叠的比例
+    unique_share REAL,
+    overlap_with TEXT,          -- Jaccard 最大的其他关键词
+    jaccard REAL,
+    actual_pages INTEGER,       -- 运行结束时回填
+    actual_new INTEGER,
+    PRIMARY KEY (run_id, search_query)
+);
+"""
+
+QUERY_DONE = -1
+
+# 表结构版本（PRAGMA user_version）：SCHEMA / 索引 / 触发器 / _migrate 有改动时加一，
+# read_jobs 据此判断能否直接只读打开
+SCHEMA_VERSION = 2
+
+
+# LIKE 默认不区分大小写，索引用 NOCASE 排序规则才能被前缀匹配用上
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_posted_ts ON jobs (posted_ts);
+CREATE INDEX IF NOT EXISTS idx_jobs_category ON jobs (category COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_jobs_search_query ON jobs (search_query COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_jobs_cluster ON jobs (cluster_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_simhash_missing ON jobs (simhash) WHERE simhash IS NULL;
+"""
+
+# 近似重复查找表：每条岗位按 64 位 SimHash 的 4 段 × 16 位记 4 个桶（段号 << 16 | 段值），见 mycf/neardup.py
+NEARDUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS simhash_index (
+    bucket INTEGER,
+    simhash INTEGER,            -- 有符号 64 位
+    cluster_id INTEGER,
+    PRIMARY KEY (bucket, simhash)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS jobs_simhash_ai AFTER INSERT ON jobs WHEN new.simhash IS NOT NULL BEGIN
+    INSERT OR IGNORE INTO simhash_index (bucket, simhash, cluster_id) VALUES
+        ((0 << 16) | (new.simhash & 65535), new.simhash, new.cluster_id),
+        ((1 << 16) | ((new.simhash >> 16) & 65535), new.simhash, new.cluster_id),
+        ((2 << 16) | ((new.simhash >> 32) & 65535), new.simhash, new.cluster_id),
+        ((3 << 16) | ((new.simhash >> 48) & 65535), new.simhash, new.cluster_id);
+END;
+"""
+
+# 汇总表：jobs 每插入一行（INSERT OR IGNORE 忽略的不算）就在触发器里 upsert 计数，与岗位同一事务提交。
+# 日期按新加坡时间；没有 posted_ts / 分类 / 公司的记为 ''。只随插入累加，删除 jobs 行（归档）不回减。
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_category_day (
+    category TEXT,
+    day TEXT,                   -- YYYY-MM-DD
+    jobs INTEGER,
+    PRIMARY KEY (category, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_keyword_month (
+    search_query TEXT,
+    month TEXT,                 -- YYYY-MM
+    jobs INTEGER,
+    salary_jobs INTEGER,        -- 有薪资（下限或上限）的岗位数
+    salary_min_sum REAL,        -- 下限均值 = salary_min_sum / salary_min_jobs
+    salary_max_sum REAL,        -- 上限均值 = salary_max_sum / salary_max_jobs
+    salary_min REAL,            -- 最低的下限
+    salary_max REAL,            -- 最高的上限
+    salary_min_jobs INTEGER,    -- 有下限的岗位数（"-8000 SGD" 这种只有上限）
+    salary_max_jobs INTEGER,    -- 有上限的岗位数
+    PRIMARY KEY (search_query, month)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_company_month (
+    company TEXT,
+    month TEXT,
+    jobs INTEGER,
+    PRIMARY KEY (company, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_category_day_day ON rollup_category_day (day);
+CREATE INDEX IF NOT EXISTS idx_rollup_company_month_month ON rollup_company_month (month);
+CREATE TRIGGER IF NOT EXISTS jobs_rollup_ai AFTER INSERT ON jobs BEGIN
+    INSERT INTO rollup_category_day (category, day, jobs)
+    VALUES (COALESCE(new.category, ''), COALESCE(date(new.posted_ts, 'unixepoch', '+8 hours'), ''), 1)
+    ON CONFLICT (category, day) DO UPDATE SET jobs = jobs + 1;
+
+    INSERT INTO rollup_keyword_month
+        (search_query, month, jobs, salary_jobs, salary_min_sum, salary_max_sum, salary_min, salary_max,
+         salary_min_jobs, salary_max_jobs)
+    VALUES (COALESCE(new.search_query, ''),
+            COALESCE(strftime('%Y-%m', new.posted_ts, 'unixepoch', '+8 hours'), ''),
+            1, COALESCE(new.salary_min, new.salary_max) IS NOT NULL,
+            COALESCE(new.salary_min, 0), COALESCE(new.salary_max, 0), new.salary_min, new.salary_max,
+            new.salary_min IS NOT NULL, new.salary_max IS NOT NULL)
+    ON CONFLICT (search_query, month) DO UPDATE SET
+        jobs = jobs + 1,
+        salary_jobs = salary_jobs + excluded.salary_jobs,
+        salary_min_sum = salary_min_sum + excluded.salary_min_sum,
+        salary_max_sum = salary_max_sum + excluded.salary_max_sum,
+        salary_min_jobs = salary_min_jobs + excluded.salary_min_jobs,
+        salary_max_jobs = salary_max_jobs + excluded.salary_max_jobs,
+        salary_min = MIN(COALESCE(salary_min, excluded.salary_min), COALESCE(excluded.salary_min, salary_min)),
+        salary_max = MAX(COALESCE(salary_max, excluded.salary_max), COALESCE(excluded.salary_max, salary_max));
+
+    INSERT INTO rollup_company_month (company, month, jobs)
+    VALUES (COALESCE(new.company, ''), COALESCE(strftime('%Y-%m', new.posted_ts, 'unixepoch', '+8 hours'), ''), 1)
+    ON CONFLICT (company, month) DO UPDATE SET jobs = jobs + 1;
+END;
+"""
+
+ROLLUP_TABLES = ("rollup_category_day", "rollup_keyword_month", "rollup_company_month")
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE jobs_fts USING fts5(
+    title, company, category,
+    content='jobs', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+    INSERT INTO jobs_fts (rowid, title, company, category)
+    VALUES (new.rowid, new.title, new.company, new.category);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, category)
+    VALUES ('delete', old.rowid, old.title, old.company, old.category);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE OF title, company, category ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, category)
+    VALUES ('delete', old.rowid, old.title, old.company, old.category);
+    INSERT INTO jobs_fts (rowid, title, company, category)
+    VALUES (new.rowid, new.title, new.company, new.category);
+END;
+"""
+
+
+def connect(path: str, check_same_thread: bool = True, seed_path: str = None) -> sqlite3.Connection:
+    """打开（必要时创建）数据库：WAL 模式 + 建表；给了 seed_path 且文件存在时把它 ATTACH 为 seed。"""
+    db_dir = os.path.dirname(path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    ensure_schema(conn)
+    if seed_path and os.path.exists(seed_path) and os.path.abspath(seed_path) != os.path.abspath(path):
+        conn.execute("ATTACH DATABASE ? AS seed", (seed_path,))
+    return conn
+
+
+def has_seed(conn: sqlite3.Connection) -> bool:
+    return any(row[1] == "seed" for row in conn.execute("PRAGMA database_list"))
+
+
+def _columns(conn: sqlite3.Connection, table: str):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _has_table(conn: sqlite3.Connection, table: str, schema: str = "main") -> bool:
+    return conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """建表 / 补列 / 建触发器（都可重复执行），最后把 PRAGMA user_version 记为 SCHEMA_VERSION。"""
+    fresh_hashes = not _has_table(conn, "url_hashes")
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    if fresh_hashes:
+        # 旧库第一次打开：按现有 jobs 补一遍 URL 哈希
+        conn.create_function("mycf_url_hash", 1, url_hash, deterministic=True)
+        conn.execute("INSERT OR IGNORE INTO url_hashes (hash) SELECT mycf_url_hash(job_url) FROM jobs")
+    conn.executescript(INDEXES)
+    conn.executescript(NEARDUP_SCHEMA)
+    ensure_rollups(conn)
+    ensure_fts(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """库里记的表结构版本；ensure_schema 之前建的库为 0。"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def ensure_rollups(conn: sqlite3.Connection):
+    """建汇总表和触发器；第一次建时从已有的 jobs 算一遍。"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'jobs_rollup_ai'"
+    ).fetchone() is not None
+    if exists and "salary_max_jobs" not in _columns(conn, "rollup_keyword_month"):
+        _migrate_keyword_rollup(conn)
+    conn.executescript(ROLLUP_SCHEMA)
+    if not exists:
+        rebuild_rollups(conn)
+
+
+def _migrate_keyword_rollup(conn: sqlite3.Connection):
+    """
+    版本 1 的 rollup_keyword_month 只有一个 salary_jobs（有下限的岗位数），上限均值的分母不对。
+    补上下限 / 上限各自的计数、换掉触发器；岗位都还在 jobs 里的（关键词, 月）按 jobs 重算薪资列，
+    已归档的月份没有明细，只能沿用旧计数。
+    """
+    conn.execute("DROP TRIGGER jobs_rollup_ai")   # 由 ROLLUP_SCHEMA 重建
+    for column in ("salary_min_jobs", "salary_max_jobs"):
+        conn.execute(f"ALTER TABLE rollup_keyword_month ADD COLUMN {column} INTEGER")
+    conn.execute("UPDATE rollup_keyword_month SET salary_min_jobs = salary_jobs, salary_max_jobs = salary_jobs")
+    conn.execute(
+        """UPDATE rollup_keyword_month AS r SET
+               salary_jobs = j.salary_jobs, salary_min_sum = j.min_sum, salary_max_sum = j.max_sum,
+               salary_min_jobs = j.min_jobs, salary_max_jobs = j.max_jobs
+           FROM (SELECT COALESCE(search_query, '') AS search_query,
+                        COALESCE(strftime('%Y-%m', posted_ts, 'unixepoch', '+8 hours'), '') AS month,
+                        COUNT(*) AS jobs, COUNT(COALESCE(salary_min, salary_max)) AS salary_jobs,
+                        COALESCE(SUM(salary_min), 0) AS min_sum, COALESCE(SUM(salary_max), 0) AS max_sum,
+                        COUNT(salary_min) AS min_jobs, COUNT(salary_max) AS max_jobs
+                 FROM jobs GROUP BY 1, 2) AS j
+           WHERE r.search_query = j.search_query AND r.month = j.month AND r.jobs = j.jobs"""
+    )
+
+
+def rebuild_rollups(conn: sqlite3.Connection):
+    """按 jobs 现有内容重算汇总表（会丢掉归档前累计的部分）。"""
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute(
+        """INSERT INTO rollup_category_day (category, day, jobs)
+           SELECT COALESCE(category, ''), COALESCE(date(posted_ts, 'unixepoch', '+8 hours'), ''), COUNT(*)
+           FROM jobs GROUP BY 1, 2"""
+    )
+    conn.execute(
+        """INSERT INTO rollup_keyword_month
+               (search_query, month, jobs, salary_jobs, salary_min_sum, salary_max_sum, salary_min, salary_max,
+                salary_min_jobs, salary_max_jobs)
+           SELECT COALESCE(search_query, ''), COALESCE(strftime('%Y-%m', posted_ts, 'unixepoch', '+8 hours'), ''),
+                  COUNT(*), COUNT(COALESCE(salary_min, salary_max)),
+                  COALESCE(SUM(salary_min), 0), COALESCE(SUM(salary_max), 0), MIN(salary_min), MAX(salary_max),
+                  COUNT(salary_min), COUNT(salary_max)
+           FROM jobs GROUP BY 1, 2"""
+    )
+    conn.execute(
+        """INSERT INTO rollup_company_month (company, month, jobs)
+           SELECT COALESCE(company, ''), COALESCE(strftime('%Y-%m', posted_ts, 'unixepoch', '+8 hours'), ''), COUNT(*)
+           FROM jobs GROUP BY 1, 2"""
+    )
+    conn.commit()
+
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs_fts'"
+    ).fetchone() is not None
+
+
+def ensure_fts(conn: sqlite3.Connection) -> bool:
+    """建全文索引并对已有数据重建一次；SQLite 没编译 FTS5 时返回 False。"""
+    if has_fts(conn):
+        return True
+    try:
+        conn.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+    return True
+
+
+def _migrate(conn: sqlite3.Connection):
+    """给旧库补列（只加不删）。"""
+    columns = _columns(conn, "jobs")
+    for column, kind in (("simhash", "INTEGER"), ("cluster_id", "INTEGER"),  # 由 NearDuplicatePipeline 回填
+                         ("salary", "TEXT"), ("salary_min", "REAL"), ("salary_max", "REAL")):  # 旧行没有薪资
+        if column not in columns:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+    if "posted_ts" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN posted_ts INTEGER")
+        # 一次性回填：ISO 日期准确；相对时间只能按当前时间近似
+        normalizer = PostedNormalizer()
+        conn.create_function("mycf_posted_ts", 1, normalizer.to_epoch, deterministic=True)
+        conn.execute("UPDATE jobs SET posted_ts = mycf_posted_ts(posted) WHERE posted IS NOT NULL")
+
+
+# ---------- 详情补全 ----------
+def detail_hashes(conn: sqlite3.Connection, seed: bool = False) -> dict:
+    """{job_url 哈希: 摘要哈希（整数）}：详情补全时在内存里比对，不用每条岗位查一次库。"""
+    tables = ("seed.job_details", "job_details") if seed else ("job_details",)
+    hashes = {}
+    for table in tables:   # 本库的覆盖 seed 的
+        for job_url, content_hash in conn.execute(
+            f"SELECT job_url, content_hash FROM {table} WHERE content_hash IS NOT NULL"
+        ):
+            hashes[url_hash(job_url)] = int(content_hash, 16)
+    return hashes
+
+
+# ---------- 判重（URL 哈希） ----------
+def url_hash(job_url: str) -> int:
+    """job_url 的 64 位哈希（有符号，直接当 SQLite INTEGER PRIMARY KEY）；千万级岗位下碰撞概率约 1e-5。"""
+    return int.from_bytes(blake2b(job_url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def add_url_hashes(conn: sqlite3.Connection, job_urls):
+    conn.executemany("INSERT OR IGNORE INTO url_hashes (hash) VALUES (?)", ((url_hash(u),) for u in job_urls))
+
+
+def _seed_hash_rows(conn: sqlite3.Connection, sql_hashes: str, sql_urls: str, params=()):
+    """seed 库还没有 url_hashes 表（从没被新版本打开过）时退回按 job_url 现算。"""
+    if _has_table(conn, "url_hashes", "seed"):
+        return conn.execute(sql_hashes, params)
+    return ((url_hash(u),) for (u,) in conn.execute(sql_urls, params))
+
+
+def url_hashes(conn: sqlite3.Connection, seed: bool = False) -> set:
+    """判重集合：本库（和 seed）里所有岗位 job_url 的哈希，含已归档的；比存 URL 字符串省内存、加载快。"""
+    hashes = {row[0] for row in conn.execute("SELECT hash FROM url_hashes")}
+    if seed:
+        hashes.update(row[0] for row in _seed_hash_rows(
+            conn, "SELECT hash FROM seed.url_hashes", "SELECT job_url FROM seed.jobs"))
+    return hashes
+
+
+# ---------- 关键词高水位 ----------
+def load_watermarks(conn: sqlite3.Connection, seed: bool = False):
+    """返回 {search_query: (newest_posted, set(recent_urls))}；seed=True 时与 seed 库的合并。"""
+    marks = {}
+    tables = ("seed.keyword_watermarks", "keyword_watermarks") if seed else ("keyword_watermarks",)
+    for table in tables:
+        for query, newest, urls in conn.execute(
+            f"SELECT search_query, newest_posted, recent_urls FROM {table}"
+        ):
+            try:
+                recent = set(json.loads(urls or "[]"))
+            except ValueError:
+                recent = set()
+            if query in marks:
+                old_newest, old_recent = marks[query]
+                if old_newest and (not newest or old_newest > newest):
+                    newest = old_newest
+                recent |= old_recent
+            marks[query] = (newest, recent)
+    return marks
+
+
+def save_watermarks(conn: sqlite3.Connection, seen: dict, keep_urls: int = 200):
+    """
+    合并本次运行看到的 {search_query: (newest_posted, [job_url, ...])}：
+    newest_posted 按解析出的时间取较新者（格式不一定相同，不能按字符串比），
+    URL 列表新的在前、去重后截断到 keep_urls 个。
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    normalizer = PostedNormalizer()
+    for query, (newest, urls) in seen.items():
+        row = conn.execute(
+            "SELECT newest_posted, recent_urls FROM keyword_watermarks WHERE search_query = ?", (query,)
+        ).fetchone()
+        if row:
+            old_newest, old_urls = row
+            newest = _newer_posted(newest, old_newest, normalizer)
+            try:
+                urls = list(urls) + json.loads(old_urls or "[]")
+            except ValueError:
+                pass
+        merged = list(dict.fromkeys(u for u in urls if u))[:keep_urls]
+        conn.execute(
+            """INSERT OR REPLACE INTO keyword_watermarks (search_query, newest_posted, recent_urls, updated_at)
+               VALUES (?, ?, ?, ?)""",
+            (query, newest, json.dumps(merged), now),
+        )
+    conn.commit()
+
+
+def _newer_posted(a, b, normalizer):
+    """两个 newest_posted 里较新的一个；解析不出时间的让给解析得出的，都解析不出时保留 a（本次的）。"""
+    if not b:
+        return a
+    if not a:
+        return b
+    ts_a, ts_b = normalizer.to_epoch(a), normalizer.to_epoch(b)
+    if ts_b is not None and (ts_a is None or ts_b > ts_a):
+        return b
+    return a
+
+
+# ---------- 断点续抓 ----------
+def save_progress(conn: sqlite3.Connection, units):
+    """写入完成的 (search_query, page, route, items) 单元；不提交，和同批岗位一起由调用方 commit。"""
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        """INSERT OR REPLACE INTO crawl_progress (search_query, page, route, items, done_at)
+           VALUES (?, ?, ?, ?, ?)""",
+        [tuple(unit) + (now,) for unit in units],
+    )
+
+
+def load_progress(conn: sqlite3.Connection):
+    """返回 ({search_query: {已完成的页}}, {已全部抓完的 search_query})。"""
+    pages, finished = {}, set()
+    for query, page in conn.execute("SELECT search_query, page FROM crawl_progress"):
+        if page == QUERY_DONE:
+            finished.add(query)
+        else:
+            pages.setdefault(query, set()).add(page)
+    return pages, finished
+
+
+def clear_progress(conn: sqlite3.Connection):
+    conn.execute("DELETE FROM crawl_progress")
+    conn.commit()
+
+
+# ---------- 分片合并 ----------
+def merge_shard(conn: sqlite3.Connection, shard_path: str, keep_urls: int = 200):
+    """
+    把分片库并入 conn：jobs 按 job_url INSERT OR IGNORE（先并入的分片胜出），
+    job_details 按 fetched_at 取较新的，关键词高水位合并。返回新增的岗位数。
+    """
+    conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+    try:
+        common = [c for c in _columns(conn, "jobs") if c in _shard_columns(conn, "jobs")]
+        cols = ", ".join(common)
+        # rowcount 不含 FTS 触发器写入的行（total_changes 会算上）
+        added = conn.execute(f"INSERT OR IGNORE INTO jobs ({cols}) SELECT {cols} FROM shard.jobs").rowcount
+        conn.execute("INSERT OR IGNORE INTO url_hashes (hash) SELECT hash FROM shard.url_hashes")
+
+        detail_cols = ", ".join(c for c in _columns(conn, "job_details") if c in _shard_columns(conn, "job_details"))
+        conn.execute(
+            f"""INSERT OR REPLACE INTO job_details ({detail_cols})
+                SELECT {detail_cols} FROM shard.job_details s
+                WHERE NOT EXISTS (SELECT 1 FROM job_details d
+                                  WHERE d.job_url = s.job_url AND d.fetched_at >= s.fetched_at)"""
+        )
+        marks = {}
+        for query, newest, urls in conn.execute(
+            "SELECT search_query, newest_posted, recent_urls FROM shard.keyword_watermarks"
+        ):
+            try:
+                marks[query] = (newest, json.loads(urls or "[]"))
+            except ValueError:
+                marks[query] = (newest, [])
+        conn.commit()
+        if marks:
+            save_watermarks(conn, marks, keep_urls=keep_urls)
+        return added
+    finally:
+        conn.commit()
+        conn.execute("DETACH DATABASE shard")
+
+
+def _shard_columns(conn: sqlite3.Connection, table: str):
+    return {row[1] for row in conn.execute(f"PRAGMA shard.table_info({table})")}
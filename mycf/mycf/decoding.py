@@ -0,0 +1,220 @@
+# mycf/decoding.py
+"""
+搜索 API 响应的解码层：
+  - 每条路线第一次响应时探测结构（results/data/payload/result.results/jobs/items），之后按记住的结构直接解码
+  - 装了 msgspec 时用类型化解码，只解出 JobSummaryItem 需要的字段；否则退回 orjson / 标准库 json
+  - 结构变了（类型化解码失败或容器为空）就退回通用解码并重新探测
+"""
+import json
+from collections import namedtuple
+from typing import Any, List, Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # 可选依赖
+    msgspec = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # 可选依赖
+    orjson = None
+    _loads = json.loads
+
+# 按优先级排列的结果容器路径
+SHAPES = (("results",), ("data",), ("payload",), ("result", "results"), ("jobs",), ("items",))
+TOTAL_KEYS = ("total", "totalCount", "count")
+
+# 归一化后的一条岗位（字段的多种别名已在这里合并）
+JobFields = namedtuple("JobFields", [
+    "url_path", "title", "company", "location",
+    "min_salary", "max_salary", "currency", "posted",
+    "employment_type", "seniority", "category",
+])
+
+
+class DecodeError(ValueError):
+    """响应不是 JSON。"""
+
+
+def detect_shape(data):
+    """返回结果列表所在的路径（SHAPES 之一）；找不到返回 None。"""
+    if not isinstance(data, dict):
+        return None
+    for shape in SHAPES:
+        node = data
+        for key in shape:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, list) and (node or shape[0] in ("results", "data", "payload", "result")):
+            return shape
+    return None
+
+
+def _extract(data, shape):
+    node = data
+    for key in shape:
+        node = node.get(key) if isinstance(node, dict) else None
+    return node if isinstance(node, list) else []
+
+
+def _extract_total(data):
+    if not isinstance(data, dict):
+        return None
+    for container in (data, data.get("result")):
+        if not isinstance(container, dict):
+            continue
+        for key in TOTAL_KEYS:
+            value = container.get(key)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    return None
+
+
+def _from_dict(j):
+    company = j.get("company")
+    if isinstance(company, dict):
+        company = company.get("name") or company.get("companyName")
+    elif not isinstance(company, str):
+        company = None
+    return JobFields(
+        j.get("jobDetailsUrl") or j.get("seoUrl") or j.get("urlPath") or j.get("jobUrl"),
+        j.get("title") or j.get("jobTitle"),
+        company,
+        j.get("location") or j.get("postal") or j.get("jobLocation") or None,
+        j.get("minSalary"),
+        j.get("maxSalary"),
+        j.get("salaryCurrency"),
+        j.get("postingDate") or j.get("postedDate") or j.get("createDate") or j.get("lastUpdatedDate"),
+        j.get("employmentType"),
+        j.get("seniority"),
+        j.get("category") or j.get("jobCategory"),
+    )
+
+
+# ---------- msgspec 类型化解码 ----------
+if msgspec is not None:
+    class _Company(msgspec.Struct):
+        name: Optional[str] = None
+        companyName: Optional[str] = None
+
+    class _Job(msgspec.Struct):
+        jobDetailsUrl: Optional[str] = None
+        seoUrl: Optional[str] = None
+        urlPath: Optional[str] = None
+        jobUrl: Optional[str] = None
+        title: Optional[str] = None
+        jobTitle: Optional[str] = None
+        company: Union[str, _Company, None] = None
+        location: Any = None
+        postal: Any = None
+        jobLocation: Any = None
+        minSalary: Any = None
+        maxSalary: Any = None
+        salaryCurrency: Any = None
+        postingDate: Any = None
+        postedDate: Any = None
+        createDate: Any = None
+        lastUpdatedDate: Any = None
+        employmentType: Any = None
+        seniority: Any = None
+        category: Any = None
+        jobCategory: Any = None
+
+    def _envelope(shape):
+        """为某个结构生成只含结果列表和总数字段的 Struct。"""
+        fields = [(key, Any, None) for key in TOTAL_KEYS]
+        inner = msgspec.defstruct(
+            "Envelope_" + "_".join(shape), [(shape[-1], List[_Job], [])] + fields
+        )
+        if len(shape) == 1:
+            return inner
+        return msgspec.defstruct("Outer_" + "_".join(shape), [(shape[0], Optional[inner], None)] + fields)
+
+    def _from_struct(j):
+        company = j.company
+        if isinstance(company, _Company):
+            company = company.name or company.companyName
+        return JobFields(
+            j.jobDetailsUrl or j.seoUrl or j.urlPath or j.jobUrl,
+            j.title or j.jobTitle,
+            company,
+            j.location or j.postal or j.jobLocation or None,
+            j.minSalary,
+            j.maxSalary,
+            j.salaryCurrency,
+            j.postingDate or j.postedDate or j.createDate or j.lastUpdatedDate,
+            j.employmentType,
+            j.seniority,
+            j.category or j.jobCategory,
+        )
+
+
+class ResponseDecoder:
+    """按路线记住响应结构的解码器；decode() 返回 (JobFields 列表, total 或 None)。"""
+
+    def __init__(self, typed=True):
+        self.typed = typed and msgspec is not None
+        self.shapes = {}        # route -> shape
+        self._decoders = {}     # shape -> msgspec.json.Decoder
+
+    @property
+    def backend(self):
+        if self.typed:
+            return "msgspec"
+        return "orjson" if orjson is not None else "json"
+
+    def decode(self, route, body):
+        shape = self.shapes.get(route)
+        if shape is not None and self.typed:
+            decoded = self._decode_typed(shape, body)
+            if decoded is not None:
+                return decoded
+        return self._decode_generic(route, body)
+
+    def _decode_typed(self, shape, body):
+        decoder = self._decoders.get(shape)
+        if decoder is None:
+            decoder = self._decoders[shape] = msgspec.json.Decoder(_envelope(shape))
+        try:
+            env = decoder.decode(body)
+        except msgspec.DecodeError:
+            return None  # 非 JSON 或结构变了：交给通用路径判断
+        container = env
+        for key in shape[:-1]:
+            container = getattr(container, key)
+            if container is None:
+                return None
+        jobs = getattr(container, shape[-1])
+        if not jobs:
+            return None
+        total = None
+        for obj in (env, container):
+            for key in TOTAL_KEYS:
+                value = getattr(obj, key)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    total = value
+                    break
+            if total is not None:
+                break
+        return [_from_struct(j) for j in jobs], total
+
+    def _decode_generic(self, route, body):
+        try:
+            data = _loads(body)
+        except ValueError as e:
+            raise DecodeError(str(e)) from e
+        shape = detect_shape(data)
+        if shape is None:
+            return [], _extract_total(data)
+        self.shapes[route] = shape
+        results = [_from_dict(j) for j in _extract(data, shape) if isinstance(j, dict)]
+        return results, _extract_total(data)
+
+    @staticmethod
+    def describe(body):
+        """空结果时用于日志：顶层键或类型名。"""
+        try:
+            data = _loads(body)
+        except ValueError:
+            return "non-JSON"
+        return list(data)[:8] if isinstance(data, dict) else type(data).__name__
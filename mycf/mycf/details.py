@@ -0,0 +1,63 @@
+# mycf/details.py
+"""
+岗位详情补全（-a details=1 / MYCF_DETAILS=True）：
+  - 摘要字段算一个内容哈希；job_details 里没有该 job_url，或记录的哈希与本次不同，才去抓详情
+  - 详情走 /v2/jobs/<uuid> 接口，放在单独的下载槽 "mycf-details"（并发见 settings.DOWNLOAD_SLOTS）
+  - 解析结果作为 JobDetailItem 交给 DetailPipeline 写入 job_details 侧表
+"""
+import hashlib
+import json
+import re
+
+from w3lib.html import remove_tags, replace_entities
+
+DETAIL_SLOT = "mycf-details"
+
+# 参与内容哈希的摘要字段：任一变化都视为岗位被修改
+SUMMARY_FIELDS = (
+    "title", "company", "location", "salary", "posted",
+    "employment_type", "seniority", "category",
+)
+
+_UUID = re.compile(r"([0-9a-f]{32})(?:[/?#]|$)")
+_SPACES = re.compile(r"\s+")
+
+
+def summary_hash(item) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for field in SUMMARY_FIELDS:
+        value = item.get(field)
+        h.update(b"\x00" if value is None else str(value).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def job_uuid(job_url):
+    """从 .../job/<slug>-<32 位十六进制 uuid> 里取出 uuid；取不到返回 None。"""
+    m = _UUID.search(job_url or "")
+    return m.group(1) if m else None
+
+
+def _text(html):
+    if not html:
+        return None
+    return _SPACES.sub(" ", replace_entities(remove_tags(html))).strip() or None
+
+
+def parse_detail(data) -> dict:
+    """详情接口的 JSON → job_details 的列（缺的字段为 None）。"""
+    skills = [s.get("skill") for s in data.get("skills") or () if isinstance(s, dict) and s.get("skill")]
+    address = data.get("address") or {}
+    address_text = " ".join(
+        str(address[k]) for k in ("block", "street", "postalCode") if address.get(k)
+    ) if isinstance(address, dict) else None
+    metadata = data.get("metadata") or {}
+    return {
+        "description": _text(data.get("description")),
+        "skills": json.dumps(skills, ensure_ascii=False) if skills else None,
+        "vacancies": data.get("numberOfVacancies"),
+        "min_experience": data.get("minimumYearsExperience"),
+        "address": address_text or None,
+        "job_post_id": metadata.get("jobPostId"),
+        "updated_at": metadata.get("updatedAt") or metadata.get("newPostingDate"),
+    }
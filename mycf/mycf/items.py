@@ -5,21 +5,103 @@
 
 
 # mycf/items.py
+import sys
+from dataclasses import dataclass, fields
+
 import scrapy
 
-class JobSummaryItem(scrapy.Item):
-    search_query = scrapy.Field()
-    page_index   = scrapy.Field()
+# slots=True 需要 3.10+；更早的版本退回普通 dataclass（仍比 scrapy.Item 的 dict 小）
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class _FieldAccess:
+    """
+    给 dataclass 条目补上 scrapy.Item 的字典式读写（item["title"]、item.get("title")），
+    管道和爬虫照旧用；导出器 / ItemAdapter 把它当 dataclass 处理。
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self._names:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._names:
+            raise KeyError(f"{type(self).__name__} does not support field: {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._names else default
+
+    def keys(self):
+        return iter(self._fields)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def items(self):
+        return ((name, getattr(self, name)) for name in self._fields)
+
+    def copy(self):
+        return type(self)(**dict(self.items()))
+
+
+# 值域小、在很多条岗位里重复的字段；posted / source_url 这类几乎每条都不同的 intern 了也省不下内存，
+# 反而让 intern 表一直变大
+_INTERNED = ("search_query", "company", "location", "employment_type", "seniority")
+
+
+@dataclass(**_SLOTS)
+class JobSummaryItem(_FieldAccess):
+    """
+    搜索结果里的一条岗位：带 __slots__ 的 dataclass，不为每条岗位建一个 dict；
+    关键词、公司、地点、雇佣类型、资历这些反复出现的字符串在构造时 sys.intern，同值只留一份。
+    """
+    search_query: str = None
+    page_index: int = None
+
+    title: str = None
+    company: str = None
+    location: str = None
+    salary: str = None
+    posted: str = None
+    posted_ts: int = None   # posted 解析成的 UTC epoch 秒（解析不了为 None）
+
+    employment_type: str = None
+    seniority: str = None
+    category: str = None
+
+    job_url: str = None
+    source_url: str = None
+
+    simhash: int = None      # NearDuplicatePipeline 填：title/company/location 的 SimHash（有符号 64 位）
+    cluster_id: int = None   # 近似重复簇（簇里第一条岗位的 simhash）
+
+    def __post_init__(self):
+        intern = sys.intern
+        for name in _INTERNED:
+            value = getattr(self, name)
+            if value.__class__ is str:
+                setattr(self, name, intern(value))
+
+
+JobSummaryItem._fields = tuple(f.name for f in fields(JobSummaryItem))
+JobSummaryItem._names = frozenset(JobSummaryItem._fields)
 
-    title    = scrapy.Field()
-    company  = scrapy.Field()
-    location = scrapy.Field()
-    salary   = scrapy.Field()
-    posted   = scrapy.Field()
 
-    employment_type = scrapy.Field()
-    seniority       = scrapy.Field()
-    category        = scrapy.Field()
+class JobDetailItem(scrapy.Item):
+    """详情补全结果，只由 DetailPipeline 处理（写入 job_details），其余管道原样放过。"""
+    job_url      = scrapy.Field()
+    content_hash = scrapy.Field()   # 抓取时摘要字段的哈希
 
-    job_url    = scrapy.Field()
-    source_url = scrapy.Field()
+    description    = scrapy.Field()
+    skills         = scrapy.Field()   # JSON 数组文本
+    vacancies      = scrapy.Field()
+    min_experience = scrapy.Field()
+    address        = scrapy.Field()
+    job_post_id    = scrapy.Field()
+    updated_at     = scrapy.Field()
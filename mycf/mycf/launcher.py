@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程分片抓取：把关键词分给 N 个工作进程，各自跑一遍 mycf_jobs，结束后合并回主库和 output/。
+
+  python mycf/launcher.py --keywords_file keywords.txt --workers 4 --rate 4 -a within_days=7 -a max_pages=3
+  python mycf/launcher.py --merge_only shards/20251012-083000          # 只重做合并（如某个分片中途失败）
+
+每个分片在 shards/<运行ID>/shard-<i>/ 下有自己的 keywords.txt、mycf_jobs.sqlite、output/ 和 crawl.log：
+  - 主库以只读方式挂给分片（MYCF_SEED_SQLITE_PATH），判重 / 增量高水位 / 详情哈希照常生效
+  - --rate：所有分片共享的每秒请求预算（跨进程令牌桶，见 mycf/ratelimit.py）
+  - 合并：分片库按顺序 INSERT OR IGNORE 进主库；CSV / Parquet 输出按 job_url 去重后并入主 output/
+"""
+
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+# 允许直接以脚本运行（python mycf/launcher.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "mycf.settings")
+from mycf import db as mycf_db  # noqa: E402
+from mycf import ratelimit  # noqa: E402
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖
+    pa = pc = pq = None
+
+
+# 关键词由启动器按分片分配（每个分片传自己的 keywords_file），这些爬虫参数不能再从 -a 给
+RESERVED_SPIDER_ARGS = {"keywords_file", "q"}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run mycf_jobs in parallel keyword shards and merge the results.")
+    p.add_argument("--keywords_file", default="keywords.txt", help="关键词文件（默认 keywords.txt）")
+    p.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)), help="分片进程数")
+    p.add_argument("--rate", type=float, default=0.0, help="所有分片合计每秒最多请求数（默认 0 = 不限，仅靠各自限速）")
+    p.add_argument("--shards_dir", default="shards", help="分片工作目录（默认 shards/）")
+    p.add_argument("--keep_shards", action="store_true", help="合并后保留分片目录")
+    p.add_argument("--merge_only", default=None, metavar="RUN_DIR", help="不抓取，只把已有运行目录的分片合并")
+    p.add_argument("-a", dest="spider_args", action="append", default=[], metavar="NAME=VALUE",
+                   help="传给爬虫的参数（同 scrapy crawl -a），可重复")
+    p.add_argument("-s", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                   help="额外的 Scrapy 设置，可重复")
+    args = p.parse_args()
+    for name in sorted(set(_pairs(args.spider_args)) & RESERVED_SPIDER_ARGS):
+        p.error(f"-a {name}=... 由启动器按分片设置；关键词请写进 --keywords_file")
+    return args
+
+
+def read_keywords(path):
+    """与爬虫相同的规则：去空白、跳过空行和 # 注释、去重。"""
+    with open(path, "r", encoding="utf-8") as f:
+        kws = {line.strip() for line in f if line.strip() and not line.strip().startswith("#")}
+    return sorted(kws)
+
+
+def split_keywords(keywords, n):
+    """轮转分配，各分片关键词数相差不超过 1。"""
+    shards = [keywords[i::n] for i in range(n)]
+    return [s for s in shards if s]
+
+
+def _pairs(items):
+    return dict(item.partition("=")[::2] for item in items)
+
+
+# ---------- 工作进程 ----------
+def run_shard(shard_dir, main_db, spider_args, overrides, budget):
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    ratelimit.install(budget)
+    settings = get_project_settings()
+    # 分片自己的路径放在 -s 之后：-s MYCF_SQLITE_PATH / MYCF_OUTPUT_DIR 指的是主库和主输出目录（见 main），
+    # 不能让分片直接写进去
+    settings.setdict({
+        **overrides,
+        "MYCF_SQLITE_PATH": os.path.join(shard_dir, "mycf_jobs.sqlite"),
+        "MYCF_SEED_SQLITE_PATH": main_db,
+        "MYCF_OUTPUT_DIR": os.path.join(shard_dir, "output"),
+        "LOG_FILE": os.path.join(shard_dir, "crawl.log"),
+        "MYCF_METRICS_JSON": os.path.join(shard_dir, "metrics.json"),
+        "MYCF_METRICS_PROM": os.path.join(shard_dir, "metrics.prom"),
+    }, priority="cmdline")
+
+    process = CrawlerProcess(settings, install_root_handler=True)
+    crawler = process.create_crawler("mycf_jobs")
+    process.crawl(crawler, keywords_file=os.path.join(shard_dir, "keywords.txt"), **spider_args)
+    process.start()
+
+    stats = {k: v for k, v in crawler.stats.get_stats().items() if isinstance(v, (int, float, str))}
+    with open(os.path.join(shard_dir, "stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, indent=1, default=str)
+
+
+# ---------- 合并 ----------
+def _read_csv_urls(path, seen):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("job_url"):
+                seen.add(row["job_url"])
+
+
+def _merge_csv(src, dst, seen):
+    """把 src 里 job_url 没见过的行追加到 dst（dst 不存在时带表头新建）。"""
+    if os.path.exists(dst):
+        _read_csv_urls(dst, seen)
+    added = 0
+    with open(src, newline="", encoding="utf-8") as fin:
+        reader = csv.reader(fin)
+        header = next(reader, None)
+        if not header:
+            return 0
+        url_idx = header.index("job_url") if "job_url" in header else None
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        new_file = not os.path.exists(dst) or os.path.getsize(dst) == 0
+        with open(dst, "a", newline="", encoding="utf-8") as fout:
+            writer = csv.writer(fout)
+            if new_file:
+                writer.writerow(header)
+            for row in reader:
+                url = row[url_idx] if url_idx is not None and url_idx < len(row) else None
+                if url:
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                writer.writerow(row)
+                added += 1
+    return added
+
+
+def _merge_parquet(src, dst, seen):
+    """Parquet 分片：过滤掉见过的 job_url 后写到 dst（分片文件名各不相同，不会覆盖）。"""
+    table = pq.read_table(src)
+    if seen and "job_url" in table.column_names:
+        mask = pc.invert(pc.is_in(table["job_url"], value_set=pa.array(list(seen), pa.string())))
+        table = table.filter(pc.fill_null(mask, True))
+    if "job_url" in table.column_names:
+        seen.update(u for u in table["job_url"].to_pylist() if u)
+    if table.num_rows:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        pq.write_table(table, dst, compression="zstd")
+    return table.num_rows
+
+
+def merge_outputs(shard_dirs, output_dir):
+    """各输出树（by_keyword / by_category / parquet）分别按 job_url 去重，分片顺序与合并数据库时一致。"""
+    seen = {}       # 顶层目录 -> 已写入的 job_url
+    added = 0
+    for shard_dir in shard_dirs:
+        src_root = os.path.join(shard_dir, "output")
+        for src in sorted(glob.glob(os.path.join(src_root, "**", "*.*"), recursive=True)):
+            rel = os.path.relpath(src, src_root)
+            if os.path.basename(src).startswith(("_", ".")):
+                continue  # 未写完的列式分片
+            tree = rel.split(os.sep, 1)[0]
+            dst = os.path.join(output_dir, rel)
+            if src.endswith(".csv"):
+                added += _merge_csv(src, dst, seen.setdefault(tree, set()))
+            elif src.endswith(".parquet") and pq is not None:
+                added += _merge_parquet(src, dst, seen.setdefault(tree, set()))
+    return added
+
+
+def merge(run_dir, main_db, output_dir, keep_urls=200):
+    shard_dirs = sorted(d for d in glob.glob(os.path.join(run_dir, "shard-*")) if os.path.isdir(d))
+    conn = mycf_db.connect(main_db)
+    try:
+        for shard_dir in shard_dirs:
+            shard_db = os.path.join(shard_dir, "mycf_jobs.sqlite")
+            if os.path.exists(shard_db):
+                added = mycf_db.merge_shard(conn, shard_db, keep_urls=keep_urls)
+                print(f"{os.path.basename(shard_dir)}：新增 {added} 条 -> {main_db}")
+    finally:
+        conn.close()
+    rows = merge_outputs(shard_dirs, output_dir)
+    print(f"输出：新增 {rows} 行 -> {output_dir}")
+    return shard_dirs
+
+
+def main():
+    args = parse_args()
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    overrides = _pairs(args.overrides)
+    main_db = overrides.get("MYCF_SQLITE_PATH") or settings.get("MYCF_SQLITE_PATH", "mycf_jobs.sqlite")
+    output_dir = overrides.get("MYCF_OUTPUT_DIR") or settings.get("MYCF_OUTPUT_DIR", "output")
+    keep_urls = settings.getint("MYCF_WATERMARK_URLS", 200)
+
+    if args.merge_only:
+        merge(args.merge_only, main_db, output_dir, keep_urls)
+        if not args.keep_shards:
+            shutil.rmtree(args.merge_only)
+        return
+
+    keywords = read_keywords(args.keywords_file)
+    shards = split_keywords(keywords, max(1, args.workers))
+    run_dir = os.path.join(args.shards_dir, datetime.now().strftime("%Y%m%d-%H%M%S"))
+    mycf_db.connect(main_db).close()  # 先建好主库表结构，分片只读挂载
+    budget = ratelimit.SharedRateBudget(args.rate) if args.rate > 0 else None
+    spider_args = _pairs(args.spider_args)
+
+    workers = []
+    for i, shard in enumerate(shards):
+        shard_dir = os.path.join(run_dir, f"shard-{i:02d}")
+        os.makedirs(shard_dir, exist_ok=True)
+        with open(os.path.join(shard_dir, "keywords.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(shard) + "\n")
+        proc = mp.Process(target=run_shard, args=(shard_dir, main_db, spider_args, overrides, budget),
+                          name=f"mycf-shard-{i}")
+        proc.start()
+        workers.append((shard_dir, proc))
+    print(f"{len(keywords)} 个关键词 → {len(workers)} 个分片（{run_dir}）"
+          + (f"，共享预算 {args.rate:g} 请求/秒" if budget else ""))
+
+    t0 = time.perf_counter()
+    failed = []
+    for shard_dir, proc in workers:
+        proc.join()
+        if proc.exitcode != 0:
+            failed.append(shard_dir)
+            print(f"⚠️ {os.path.basename(shard_dir)} 退出码 {proc.exitcode}，见 {shard_dir}/crawl.log")
+    print(f"抓取完成，用时 {time.perf_counter() - t0:.1f}s")
+
+    requests = items = 0
+    for shard_dir, _ in workers:
+        try:
+            with open(os.path.join(shard_dir, "stats.json"), encoding="utf-8") as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            continue
+        requests += stats.get("downloader/request_count", 0)
+        items += stats.get("item_scraped_count", 0)
+    print(f"请求 {requests} 次，item {items} 条")
+
+    merge(run_dir, main_db, output_dir, keep_urls)
+    if failed:
+        print(f"{len(failed)} 个分片失败，保留 {run_dir}；处理后可用 --merge_only 重新合并")
+    elif not args.keep_shards:
+        shutil.rmtree(run_dir)
+
+
+if __name__ == "__main__":
+    main()
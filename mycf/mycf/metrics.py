@@ -0,0 +1,300 @@
+# mycf/metrics.py
+"""
+运行指标扩展 CrawlMetrics（MYCF_METRICS_ENABLED，默认开启）：
+  - 按关键词：请求 / 响应 / 解析页数 / 结果数 / 产出 item / 空页 / 解析失败 / 各类丢弃
+  - 按路线（"POST:0" / "GET:1" / "DOM" / "detail"）：请求、各状态码响应、字节数，延迟与响应体大小直方图
+  - 丢弃原因分开计数：duplicate / missing_url（DedupePipeline）、stale（早于 within_days，爬虫里过滤）等
+  - 每个管道 process_item 的调用次数与耗时（同步部分）
+  - 结束时写 JSON（MYCF_METRICS_JSON）和 Prometheus textfile（MYCF_METRICS_PROM，给 node_exporter 的
+    textfile collector 读）；两者都是先写临时文件再改名
+只在信号回调里做字典累加和一次 bisect，常开的开销可以忽略。
+"""
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from mycf.details import DETAIL_SLOT
+
+# 爬虫每解析完一页发送：query, route, results, stale, outcome（"ok" / "empty" / "decode_error" / "error"）
+page_parsed = object()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)          # 秒
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)          # 字节
+
+
+class Histogram:
+    """固定桶直方图（桶上界递增，最后隐含 +Inf）。"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return {"buckets": list(self.bounds), "counts": self.counts, "sum": self.sum, "count": self.count}
+
+    def cumulative(self):
+        """[(le, 累计数), ...]，le 最后一个为 "+Inf"（Prometheus 格式）。"""
+        out, total = [], 0
+        for bound, n in zip((*self.bounds, "+Inf"), self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+def route_name(route):
+    """API 路线 (method, page_base) → "POST:0" / "GET:1"；None（浏览器兜底）→ "DOM"。指标、限速统计和抓取进度共用。"""
+    return "DOM" if route is None else f"{route[0]}:{route[1]}"
+
+
+def route_of(request):
+    if request.meta.get("download_slot") == DETAIL_SLOT:
+        return "detail"
+    route = request.meta.get("mycf_route")
+    if route:
+        return route_name(route)
+    if request.meta.get("playwright"):
+        return "DOM"
+    return "other"
+
+
+def keyword_of(request):
+    return request.cb_kwargs.get("query") or request.meta.get("query")
+
+
+def drop_reason(exception):
+    """管道用 DropItem 带上 reason 属性（见 pipelines._drop）；没有就归到 other。"""
+    return getattr(exception, "reason", None) or "other"
+
+
+class CrawlMetrics:
+    def __init__(self, crawler, json_path=None, prom_path=None):
+        self.crawler = crawler
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.keywords = defaultdict(Counter)     # query -> 计数
+        self.routes = defaultdict(Counter)       # route -> 计数（含 status/<码>）
+        self.latency = {}                        # route -> Histogram
+        self.size = {}                           # route -> Histogram
+        self.drops = Counter()                   # reason -> 数量
+        self.pipelines = {}                      # 管道名 -> [调用次数, 总秒数, 最大秒数]
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("MYCF_METRICS_ENABLED", True):
+            raise NotConfigured
+        json_path = settings.get("MYCF_METRICS_JSON")
+        prom_path = settings.get("MYCF_METRICS_PROM")
+        if not json_path and not prom_path:
+            raise NotConfigured
+        ext = cls(crawler, json_path, prom_path)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(ext.page_parsed, signal=page_parsed)
+        return ext
+
+    # ---------- 信号 ----------
+    def spider_opened(self, spider):
+        self.started = time.time()
+        self._time_pipelines()
+
+    def request_reached_downloader(self, request, spider):
+        self.routes[route_of(request)]["requests"] += 1
+        query = keyword_of(request)
+        if query:
+            self.keywords[query]["requests"] += 1
+
+    def response_received(self, response, request, spider):
+        route = route_of(request)
+        counts = self.routes[route]
+        counts["responses"] += 1
+        counts[f"status/{response.status}"] += 1
+        size = len(response.body)
+        counts["bytes"] += size
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            hist = self.latency.get(route)
+            if hist is None:
+                hist = self.latency[route] = Histogram(LATENCY_BUCKETS)
+            hist.observe(latency)
+        hist = self.size.get(route)
+        if hist is None:
+            hist = self.size[route] = Histogram(SIZE_BUCKETS)
+        hist.observe(size)
+        query = keyword_of(request)
+        if query:
+            self.keywords[query]["responses"] += 1
+            if response.status >= 400:
+                self.keywords[query]["errors"] += 1
+
+    def page_parsed(self, query, route, results=0, stale=0, outcome="ok"):
+        counts = self.keywords[query]
+        counts["pages"] += 1
+        counts["results"] += results
+        if stale:
+            counts["drop/stale"] += stale
+            self.drops["stale"] += stale
+        if outcome != "ok":
+            counts[outcome] += 1
+            self.routes[route][outcome] += 1
+
+    def item_scraped(self, item, response, spider):
+        query = item.get("search_query")
+        if query:
+            self.keywords[query]["items"] += 1
+
+    def item_dropped(self, item, response, exception, spider):
+        reason = drop_reason(exception)
+        self.drops[reason] += 1
+        query = item.get("search_query")
+        if query:
+            self.keywords[query][f"drop/{reason}"] += 1
+
+    # ---------- 管道耗时 ----------
+    def _time_pipelines(self):
+        """给 ItemPipelineManager 里的 process_item 逐个套计时（只计同步部分）；结构对不上就跳过。"""
+        try:
+            itemproc = self.crawler.engine.scraper.itemproc
+            methods = itemproc.methods["process_item"]
+            pipes = [p for p in itemproc.middlewares if hasattr(p, "process_item")]
+        except AttributeError:
+            return
+        if len(pipes) != len(methods):
+            return
+        for i, (pipe, method) in enumerate(zip(pipes, list(methods))):
+            methods[i] = self._timed(type(pipe).__name__, method)
+
+    def _timed(self, name, method):
+        acc = self.pipelines.setdefault(name, [0, 0.0, 0.0])
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                dt = perf_counter() - t0
+                acc[0] += 1
+                acc[1] += dt
+                if dt > acc[2]:
+                    acc[2] = dt
+
+        return timed
+
+    # ---------- 输出 ----------
+    def snapshot(self, reason=None):
+        finished = time.time()
+        return {
+            "spider": self.crawler.spider.name if self.crawler.spider else None,
+            "reason": reason,
+            "started_at": self.started,
+            "finished_at": finished,
+            "duration_s": finished - self.started if self.started else None,
+            "keywords": {q: dict(c) for q, c in sorted(self.keywords.items())},
+            "routes": {
+                r: {
+                    **dict(c),
+                    "latency_s": self.latency[r].to_dict() if r in self.latency else None,
+                    "size_bytes": self.size[r].to_dict() if r in self.size else None,
+                }
+                for r, c in sorted(self.routes.items())
+            },
+            "drops": dict(self.drops),
+            "pipelines": {
+                name: {"calls": n, "seconds": total, "max_ms": peak * 1000}
+                for name, (n, total, peak) in self.pipelines.items()
+            },
+        }
+
+    def prometheus(self, snap):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        metric("mycf_run_duration_seconds", "gauge", "Duration of the last run.",
+               [({}, snap["duration_s"] or 0)])
+        metric("mycf_run_finished_timestamp_seconds", "gauge", "When the last run finished.",
+               [({"reason": snap["reason"] or ""}, snap["finished_at"])])
+
+        kw_keys = sorted({k for c in self.keywords.values() for k in c})
+        for key in kw_keys:
+            name = "mycf_keyword_" + key.replace("/", "_").replace("-", "_") + "_total"
+            metric(name, "counter", f"Per-keyword {key} count.",
+                   [({"keyword": q}, c[key]) for q, c in sorted(self.keywords.items()) if key in c])
+
+        samples = defaultdict(list)
+        for route, c in sorted(self.routes.items()):
+            for key, value in c.items():
+                if key.startswith("status/"):
+                    samples["mycf_route_responses_by_status_total"].append(
+                        ({"route": route, "status": key[7:]}, value))
+                else:
+                    samples[f"mycf_route_{key.replace('-', '_')}_total"].append(({"route": route}, value))
+        for name, items in sorted(samples.items()):
+            metric(name, "counter", "Per-route count.", items)
+
+        for name, hists, help_text in (
+            ("mycf_response_latency_seconds", self.latency, "Download latency per route."),
+            ("mycf_response_size_bytes", self.size, "Response body size per route."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for route, hist in sorted(hists.items()):
+                for le, n in hist.cumulative():
+                    lines.append(f'{name}_bucket{{route="{_escape(route)}",le="{le}"}} {n}')
+                lines.append(f'{name}_sum{{route="{_escape(route)}"}} {hist.sum}')
+                lines.append(f'{name}_count{{route="{_escape(route)}"}} {hist.count}')
+
+        metric("mycf_drops_total", "counter", "Dropped or filtered jobs by reason.",
+               [({"reason": r}, n) for r, n in sorted(self.drops.items())])
+        metric("mycf_pipeline_calls_total", "counter", "process_item calls per pipeline.",
+               [({"pipeline": p}, v["calls"]) for p, v in sorted(snap["pipelines"].items())])
+        metric("mycf_pipeline_seconds_total", "counter", "Time spent in process_item per pipeline.",
+               [({"pipeline": p}, v["seconds"]) for p, v in sorted(snap["pipelines"].items())])
+        return "\n".join(lines) + "\n"
+
+    def spider_closed(self, spider, reason):
+        snap = self.snapshot(reason)
+        if self.json_path:
+            _write_atomic(self.json_path, json.dumps(snap, ensure_ascii=False, indent=1))
+        if self.prom_path:
+            _write_atomic(self.prom_path, self.prometheus(snap))
+        spider.logger.info(f"Crawl metrics written to {', '.join(p for p in (self.json_path, self.prom_path) if p)}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -1,100 +1,362 @@
-# Define here the models for your spider middleware
-#
-# See documentation in:
-# https://docs.scrapy.org/en/latest/topics/spider-middleware.html
+# mycf/middlewares.py
+"""
+下载中间件：
+  - MycfDownloaderMiddleware：录制 / 离线回放（MYCF_REPLAY_MODE）
+  - AdaptiveConcurrencyMiddleware：按响应反馈调整每个下载槽的并发和间隔
+  - SharedRateLimitMiddleware：分片启动器下所有进程共享的速率预算
+"""
+
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from twisted.internet.task import deferLater
+from w3lib.url import canonicalize_url
+
+from mycf import ratelimit
+from mycf.metrics import route_of
 
-# useful for handling different item types with a single interface
-from itemadapter import ItemAdapter
 
+class MycfDownloaderMiddleware:
+    """
+    录制 / 回放下载层（MYCF_REPLAY_MODE）：
+      - "record"：每个响应追加写入 MYCF_REPLAY_DIR 下本次运行的段文件（gzip 压缩的 JSON 行，只追加）
+      - "replay"：启动时读入全部段文件，命中的请求直接返回录制的响应，不走网络
+      - "off"（默认）：不启用
+    请求键 = method + 规范化 URL + 规范化 JSON 请求体（POST 的载荷只在 page 上不同）。
+    """
 
-class MycfSpiderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the spider middleware does not modify the
-    # passed objects.
+    def __init__(self, mode="off", replay_dir="replay", passthrough=False, stats=None):
+        self.mode = mode
+        self.replay_dir = replay_dir
+        self.passthrough = passthrough
+        self.stats = stats
+        self.index = {}
+        self.segment = None
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        mode = (crawler.settings.get("MYCF_REPLAY_MODE") or "off").lower()
+        if mode not in ("record", "replay"):
+            raise NotConfigured
+        s = cls(
+            mode=mode,
+            replay_dir=crawler.settings.get("MYCF_REPLAY_DIR", "replay"),
+            passthrough=crawler.settings.getbool("MYCF_REPLAY_PASSTHROUGH", False),
+            stats=crawler.stats,
+        )
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
-    def process_spider_input(self, response, spider):
-        # Called for each response that goes through the spider
-        # middleware and into the spider.
+    @staticmethod
+    def request_key(request):
+        body = request.body or b""
+        if body:
+            try:
+                body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+            except ValueError:
+                pass
+        h = hashlib.sha1()
+        h.update(request.method.upper().encode("ascii"))
+        h.update(b" ")
+        h.update(canonicalize_url(request.url).encode("utf-8"))
+        h.update(b"\n")
+        h.update(body)
+        return h.hexdigest()
 
-        # Should return None or raise an exception.
-        return None
+    # ---------- 段文件 ----------
+    def _load_segments(self):
+        paths = sorted(glob.glob(os.path.join(self.replay_dir, "segment-*.jsonl.gz")))
+        for path in paths:
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            break  # 上次录制被中断，截断的尾部
+                        self.index[record["key"]] = record
+            except (OSError, EOFError):
+                pass  # gzip 尾部不完整：保留已读到的记录
+        return len(paths)
 
-    def process_spider_output(self, response, result, spider):
-        # Called with the results returned from the Spider, after
-        # it has processed the response.
+    def _open_segment(self):
+        os.makedirs(self.replay_dir, exist_ok=True)
+        name = f"segment-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.jsonl.gz"
+        self.segment = gzip.open(os.path.join(self.replay_dir, name), "at", encoding="utf-8")
 
-        # Must return an iterable of Request, or item objects.
-        for i in result:
-            yield i
+    def _record(self, request, response):
+        record = {
+            "key": self.request_key(request),
+            "method": request.method,
+            "url": request.url,
+            "status": response.status,
+            "headers": {
+                k.decode("latin-1"): [v.decode("latin-1") for v in vs]
+                for k, vs in response.headers.items()
+            },
+            "body": base64.b64encode(response.body).decode("ascii"),
+        }
+        self.segment.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stats.inc_value("mycf/replay/recorded")
 
-    def process_spider_exception(self, response, exception, spider):
-        # Called when a spider or process_spider_input() method
-        # (from other spider middleware) raises an exception.
+    def _replay(self, request, record):
+        headers = Headers({k: vs for k, vs in record["headers"].items()})
+        body = base64.b64decode(record["body"])
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return respcls(
+            url=request.url,
+            status=record["status"],
+            headers=headers,
+            body=body,
+            request=request,
+            flags=["replay"],
+        )
 
-        # Should return either None or an iterable of Request or item objects.
-        pass
+    # ---------- 下载中间件接口 ----------
+    def process_request(self, request, spider):
+        if self.mode != "replay":
+            return None
+        record = self.index.get(self.request_key(request))
+        if record is not None:
+            self.stats.inc_value("mycf/replay/hit")
+            return self._replay(request, record)
+        self.stats.inc_value("mycf/replay/miss")
+        if self.passthrough:
+            return None
+        raise IgnoreRequest(f"Not in replay capture: {request.method} {request.url}")
 
-    async def process_start(self, start):
-        # Called with an async iterator over the spider start() method or the
-        # maching method of an earlier spider middleware.
-        async for item_or_request in start:
-            yield item_or_request
+    def process_response(self, request, response, spider):
+        if self.mode == "record" and "replay" not in response.flags:
+            self._record(request, response)
+        return response
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        if self.mode == "replay":
+            n = self._load_segments()
+            spider.logger.info(f"Replay: {len(self.index)} responses loaded from {n} segments in {self.replay_dir}")
+        else:
+            self._open_segment()
+            spider.logger.info(f"Recording responses to {self.segment.name}")
 
+    def spider_closed(self, spider):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
 
-class MycfDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+
+class _SlotState:
+    """一个下载槽的控制状态（Scrapy 会回收空闲的槽，所以状态存在这里，每次再写回槽上）。"""
+
+    def __init__(self, concurrency, delay, max_concurrency, min_delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.max_concurrency = max_concurrency
+        self.min_delay = min_delay
+        self.latency = None          # 响应延迟的 EWMA（秒），整个槽的，用于调并发
+        self.ok_streak = 0           # 上次调整后连续正常的响应数
+        self.last_backoff = 0.0
+        self.cooldown_until = 0.0    # Retry-After 要求的最早下一次请求时间
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    反馈式并发控制（MYCF_THROTTLE_ENABLED，取代 AutoThrottle）：按下载槽做 AIMD
+      - 起点：槽的初始并发 / 间隔（CONCURRENT_REQUESTS_PER_DOMAIN、DOWNLOAD_DELAY 或 DOWNLOAD_SLOTS）
+      - 连续 MYCF_THROTTLE_WINDOW 个正常响应且延迟 EWMA 不超过 MYCF_THROTTLE_TARGET_LATENCY：
+        先把间隔缩短 1/4（直到 MYCF_THROTTLE_MIN_DELAY），再逐格加并发（直到 MYCF_THROTTLE_MAX_CONCURRENCY）
+      - 429 / 503：并发减半、间隔翻倍；带 Retry-After 时该槽在此之前不再放行请求
+      - 其他 5xx、超时 / 连接错误：并发减一、间隔 ×1.5；延迟 EWMA 超过目标 2 倍也减一格并发
+      同一轮突发的多个失败只算一次退避。按路线（mycf_route / 详情）各自统计延迟 EWMA 和错误，
+      选定的并发与间隔写入 stats。
+    """
+
+    BACKOFF_STATUSES = (429, 503)
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_concurrency = settings.getint("MYCF_THROTTLE_MAX_CONCURRENCY", 8)
+        self.min_delay = settings.getfloat("MYCF_THROTTLE_MIN_DELAY", 0.1)
+        self.max_delay = settings.getfloat("MYCF_THROTTLE_MAX_DELAY", 60.0)
+        self.target_latency = settings.getfloat("MYCF_THROTTLE_TARGET_LATENCY", 2.0)
+        self.window = max(1, settings.getint("MYCF_THROTTLE_WINDOW", 10))
+        self.slot_settings = settings.getdict("DOWNLOAD_SLOTS")
+        self.states = {}
+        self.route_latency = {}      # 路线 -> 响应延迟的 EWMA（秒），只用于 stats
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
-        return s
+        if not crawler.settings.getbool("MYCF_THROTTLE_ENABLED", True):
+            raise NotConfigured
+        if crawler.settings.getbool("AUTOTHROTTLE_ENABLED"):
+            raise NotConfigured("AUTOTHROTTLE_ENABLED is on; adaptive concurrency disabled")
+        return cls(crawler)
+
+    # ---------- 状态 ----------
+    def _slot(self, request):
+        downloader = self.crawler.engine.downloader
+        key = downloader.get_slot_key(request)
+        return key, downloader.slots.get(key)
+
+    def _state(self, key, slot):
+        state = self.states.get(key)
+        if state is None and slot is not None:
+            configured = self.slot_settings.get(key, {})
+            # DOWNLOAD_SLOTS 里单独配置过的槽：配置值就是上限 / 下限
+            max_concurrency = configured.get("concurrency", self.max_concurrency)
+            min_delay = configured.get("delay", self.min_delay)
+            state = self.states[key] = _SlotState(
+                min(slot.concurrency, max_concurrency), max(slot.delay, min_delay), max_concurrency, min_delay
+            )
+            self._report(key, state)
+        return state
 
+    def _apply(self, slot, state):
+        if slot is not None:
+            slot.concurrency = state.concurrency
+            slot.delay = state.delay
+
+    def _report(self, key, state):
+        prefix = f"mycf/throttle/{key}"
+        self.stats.set_value(f"{prefix}/concurrency", state.concurrency)
+        self.stats.set_value(f"{prefix}/delay", round(state.delay, 3))
+        self.stats.max_value(f"{prefix}/concurrency_max", state.concurrency)
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get(b"Retry-After")
+        if not value:
+            return None
+        value = value.decode("latin-1").strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+    # ---------- 调整 ----------
+    def _backoff(self, key, state, halve, delay_factor, reason):
+        now = time.time()
+        # 同一轮在途请求一起失败时只退避一次
+        if now - state.last_backoff < max(state.latency or 0.0, 1.0):
+            return
+        state.last_backoff = now
+        state.ok_streak = 0
+        state.concurrency = max(1, state.concurrency // 2 if halve else state.concurrency - 1)
+        if delay_factor:
+            # 间隔为 0 时翻倍无效，至少从 0.25 秒起退
+            state.delay = min(self.max_delay, max(state.delay * delay_factor, state.min_delay, 0.25))
+        self.stats.inc_value(f"mycf/throttle/{key}/backoffs/{reason}")
+
+    def _grow(self, key, state):
+        state.ok_streak = 0
+        if state.delay > state.min_delay:
+            state.delay = max(state.min_delay, state.delay * 0.75)
+        elif state.concurrency < state.max_concurrency:
+            state.concurrency += 1
+
+    # ---------- 下载中间件接口 ----------
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        key, slot = self._slot(request)
+        state = self.states.get(key)
+        if state is None:
+            return None
+        self._apply(slot, state)
+        wait = state.cooldown_until - time.time()
+        if wait > 0:
+            from twisted.internet import reactor
+
+            self.stats.inc_value(f"mycf/throttle/{key}/retry_after_waits")
+            return deferLater(reactor, wait, lambda: None)
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        key, slot = self._slot(request)
+        state = self._state(key, slot)
+        if state is None:
+            return response
+        route = route_of(request)
+        latency = request.meta.get("download_latency")
+        self.stats.inc_value(f"mycf/throttle/route/{route}/responses")
+
+        if response.status in self.BACKOFF_STATUSES:
+            self.stats.inc_value(f"mycf/throttle/route/{route}/errors")
+            retry_after = self._retry_after(response)
+            if retry_after:
+                retry_after = min(retry_after, self.max_delay)
+                state.cooldown_until = max(state.cooldown_until, time.time() + retry_after)
+                self.stats.max_value(f"mycf/throttle/{key}/retry_after_max", retry_after)
+            self._backoff(key, state, True, 2.0, response.status)
+        elif response.status >= 500:
+            self.stats.inc_value(f"mycf/throttle/route/{route}/errors")
+            self._backoff(key, state, False, 1.5, response.status)
+        elif latency is not None and "cached" not in response.flags and "replay" not in response.flags:
+            state.latency = _ewma(state.latency, latency)
+            self.route_latency[route] = _ewma(self.route_latency.get(route), latency)
+            self.stats.set_value(f"mycf/throttle/route/{route}/latency_ms", round(self.route_latency[route] * 1000, 1))
+            if state.latency > 2 * self.target_latency:
+                self._backoff(key, state, False, None, "latency")
+            elif state.latency <= self.target_latency:
+                state.ok_streak += 1
+                if state.ok_streak >= self.window:
+                    self._grow(key, state)
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        self._apply(slot, state)
+        self._report(key, state)
         return response
 
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        key, slot = self._slot(request)
+        state = self._state(key, slot)
+        if state is not None:
+            self.stats.inc_value(f"mycf/throttle/route/{route_of(request)}/errors")
+            self._backoff(key, state, False, 1.5, type(exception).__name__)
+            self._apply(slot, state)
+            self._report(key, state)
+        return None
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+def _ewma(average, sample):
+    return sample if average is None else 0.8 * average + 0.2 * sample
+
+
+class SharedRateLimitMiddleware:
+    """
+    多个分片进程共享一个请求速率预算（mycf/launcher.py --rate）：每个请求先从共享令牌桶取令牌，
+    取不到就延后重试。重试请求同样计入。单进程运行时没有预算，自动停用。
+    """
+
+    def __init__(self, budget, stats):
+        self.budget = budget
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        budget = ratelimit.current()
+        if budget is None:
+            raise NotConfigured
+        return cls(budget, crawler.stats)
+
+    def process_request(self, request, spider):
+        wait = self.budget.take()
+        if not wait:
+            return None
+        from twisted.internet import reactor
+
+        self.stats.inc_value("mycf/ratelimit/waits")
+        return deferLater(reactor, wait, self.process_request, request, spider)
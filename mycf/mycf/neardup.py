@@ -0,0 +1,236 @@
+# mycf/neardup.py
+"""
+近似重复岗位（换了 URL 的重发帖）：title / company / location 的 64 位 SimHash + 分段查找表。
+
+  - 特征：标题归一化（去掉括号内容、urgent / hiring / x3 之类的噪声，展开 Sr. / Mgr 等缩写，词尾复数 s）
+    后的词（权重 2）和字符 3-gram（权重 1）；公司名去掉 Pte. Ltd. 等后缀后整体作一个特征，地点整体作一个特征
+  - 汉明距离 ≤ distance（0–3）视为同一岗位。64 位切成 4 段 × 16 位，距离 ≤ 3 的两个指纹至少有一段
+    完全相同（抽屉原理），所以只需按 4 个 (段号, 段值) 桶查候选：每条岗位 4 次索引查找，候选数约为
+    存量 / 16384（100 万条时百来个），比逐条比较少 4 个数量级
+  - 桶存在 simhash_index 表里（WITHOUT ROWID，按桶聚簇），由 jobs 的插入触发器维护（见 db.py）；
+    本次运行还没落库的岗位放在内存里的同结构桶中，分两代、每代最多 max_pending 条，满了丢掉旧的一代
+  - cluster_id = 簇里第一条岗位的指纹（有符号 64 位，直接存 SQLite INTEGER）
+"""
+import re
+import struct
+from hashlib import blake2b
+
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_DISTANCE = BANDS - 1          # 分段查找能保证召回的最大汉明距离
+MASK = (1 << BITS) - 1
+
+WORD_WEIGHT = 2
+COMPANY_WEIGHT = 6
+LOCATION_WEIGHT = 3
+
+_NOISE = re.compile(
+    r"\((?:[^)]*)\)|\[(?:[^\]]*)\]|\b(?:urgent(?:ly)?|hiring|immediate(?:ly)?|start|new|hot|job|jobs|vacancy|"
+    r"wanted|needed|apply now|now|x ?\d+|\d+ ?x|up to \$?[\d,.]+k?|\$[\d,.]+k?)\b",
+    re.I,
+)
+_COMPANY_SUFFIX = re.compile(
+    r"\b(?:pte\.?|private|ltd\.?|limited|llp|inc\.?|corp(?:oration)?\.?|co\.?|plc|singapore branch|"
+    r"\(?s\)?|sg)\b",
+    re.I,
+)
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_ABBREVIATIONS = {
+    "sr": "senior", "snr": "senior", "jr": "junior", "jnr": "junior", "mgr": "manager", "asst": "assistant",
+    "exec": "executive", "eng": "engineer", "engr": "engineer", "dev": "developer", "admin": "administrator",
+    "assoc": "associate", "dir": "director", "vp": "vice president", "avp": "assistant vice president",
+}
+
+# 每个特征展开成 64 条 16 位“计数道”（第 i 位为 1 → 第 i 道为 1）；加权相加一次就得到每一位的计数
+_LANE_BITS = 16
+_SPREAD = []
+for _byte in range(256):
+    _v = 0
+    for _bit in range(8):
+        if _byte >> _bit & 1:
+            _v |= 1 << (_bit * _LANE_BITS)
+    _SPREAD.append(_v)
+_LANES = struct.Struct(f"<{BITS}H")
+_spread_cache = {}
+
+
+def _normalize(text, pattern=None):
+    text = (text or "").lower()
+    if pattern is not None:
+        text = pattern.sub(" ", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _spread(feature):
+    """特征 → 展开后的大整数（有缓存：公司、地点和常见标题片段反复出现）。"""
+    v = _spread_cache.get(feature)
+    if v is None:
+        h = int.from_bytes(blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        v = 0
+        for i in range(8):
+            v |= _SPREAD[h >> (8 * i) & 0xFF] << (8 * i * _LANE_BITS)
+        if len(_spread_cache) > 200_000:
+            _spread_cache.clear()
+        _spread_cache[feature] = v
+    return v
+
+
+def _title_words(title):
+    words = []
+    for w in _normalize(title, _NOISE).split():
+        w = _ABBREVIATIONS.get(w, w)
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        words.append(w)
+    return words
+
+
+def features(title, company, location):
+    """[(特征, 权重), ...]"""
+    out = []
+    words = _title_words(title)
+    if words:
+        out.extend((f"w:{w}", WORD_WEIGHT) for w in words)
+        padded = f" {' '.join(words)} "
+        out.extend((f"t:{padded[i:i + 3]}", 1) for i in range(len(padded) - 2))
+    c = _normalize(company, _COMPANY_SUFFIX)
+    if c:
+        out.append((f"c:{c}", COMPANY_WEIGHT))
+    loc = _normalize(location)
+    if loc:
+        out.append((f"l:{loc}", LOCATION_WEIGHT))
+    return out
+
+
+def simhash(title, company, location):
+    """64 位 SimHash（无符号）；没有任何特征时返回 None。"""
+    feats = features(title, company, location)
+    if not feats:
+        return None
+    total = 0
+    weight = 0
+    for feature, w in feats:
+        total += w * _spread(feature)
+        weight += w
+    half = weight / 2
+    lanes = _LANES.unpack(total.to_bytes(_LANES.size, "little"))
+    return int("".join("1" if lanes[i] > half else "0" for i in range(BITS - 1, -1, -1)), 2)
+
+
+def to_signed(h):
+    return h - (1 << BITS) if h >= 1 << (BITS - 1) else h
+
+
+def to_unsigned(h):
+    return h & MASK
+
+
+def buckets(h):
+    """4 个桶号：段号 << 16 | 段值（与 db.py 里触发器的算法一致）。"""
+    return [band << BAND_BITS | (h >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS)]
+
+
+_popcount = getattr(int, "bit_count", None) or (lambda x: bin(x).count("1"))  # int.bit_count 需要 3.10+
+
+
+def distance(a, b):
+    return _popcount((a ^ b) & MASK)
+
+
+class NearDupIndex:
+    """
+    查找 / 分簇：conn 上的 simhash_index（分片运行时加上只读的 seed.simhash_index）+ 本次运行的内存桶。
+    只在一个线程里用（管道的查找线程，或回填脚本）。
+    max_pending：内存桶每代的条数上限；要大于可能同时在途（已分簇、还没提交）的岗位数，
+    再早的岗位已经落库，从 simhash_index 查得到。
+    """
+
+    def __init__(self, conn, max_distance=3, seed=False, max_pending=None):
+        self.conn = conn
+        self.max_distance = max(0, min(int(max_distance), MAX_DISTANCE))
+        tables = ("simhash_index", "seed.simhash_index") if seed else ("simhash_index",)
+        self._sql = [f"SELECT simhash, cluster_id FROM {t} WHERE bucket IN (?, ?, ?, ?)" for t in tables]
+        self.max_pending = max_pending
+        self.pending = {}                # 桶 -> [(simhash, cluster_id), ...]，本次运行还没落库的
+        self.older = {}                  # 上一代
+        self.n_pending = 0
+        self.lookups = 0
+
+    def _candidates(self, keys):
+        """同桶的 (simhash, cluster_id)；库里的 simhash 是有符号的，比较时按位与 MASK 即可。"""
+        for key in keys:
+            yield from self.pending.get(key, ())
+            yield from self.older.get(key, ())
+        self.lookups += 1
+        for sql in self._sql:
+            yield from self.conn.execute(sql, keys)
+
+    def match(self, h):
+        """(cluster_id, 距离)：找距离最近且不超过阈值的已有岗位；没有则 (None, None)。"""
+        best, best_d = None, self.max_distance + 1
+        popcount = _popcount
+        for other, cluster in self._candidates(buckets(h)):
+            d = popcount((h ^ other) & MASK)
+            if d < best_d:
+                best, best_d = cluster, d
+                if d == 0:
+                    break
+        return (best, best_d) if best is not None else (None, None)
+
+    def assign(self, h):
+        """返回 (cluster_id, 是否为近似重复)，并把 h 记进内存桶。"""
+        cluster, d = self.match(h)
+        duplicate = cluster is not None
+        if not duplicate:
+            cluster = to_signed(h)
+        self.add(h, cluster)
+        return cluster, duplicate
+
+    def add(self, h, cluster):
+        if self.max_pending and self.n_pending >= self.max_pending:
+            self.older, self.pending, self.n_pending = self.pending, {}, 0
+        for key in buckets(h):
+            self.pending.setdefault(key, []).append((h, cluster))
+        self.n_pending += 1
+
+    def clear_pending(self):
+        self.pending.clear()
+        self.older.clear()
+        self.n_pending = 0
+
+
+def backfill(conn, max_distance=3, chunk=10_000, seed=False):
+    """给旧库里还没有指纹的岗位补 simhash / cluster_id（按 rowid 顺序分簇）；返回补了多少行。"""
+    index = NearDupIndex(conn, max_distance, seed=seed)
+    done = 0
+    last = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, title, company, location FROM jobs WHERE simhash IS NULL AND rowid > ? "
+            "ORDER BY rowid LIMIT ?", (last, chunk)
+        ).fetchall()
+        if not rows:
+            break
+        updates, entries = [], []
+        for rowid, title, company, location in rows:
+            last = rowid
+            h = simhash(title, company, location)
+            if h is None:
+                continue
+            cluster, _ = index.assign(h)
+            updates.append((to_signed(h), cluster, rowid))
+            entries.extend((key, to_signed(h), cluster) for key in buckets(h))
+        conn.executemany("UPDATE jobs SET simhash = ?, cluster_id = ? WHERE rowid = ?", updates)
+        conn.executemany("INSERT OR IGNORE INTO simhash_index (bucket, simhash, cluster_id) VALUES (?, ?, ?)",
+                         entries)
+        conn.commit()
+        index.clear_pending()
+        done += len(updates)
+    return done
+
+
+def needs_backfill(conn):
+    return conn.execute("SELECT 1 FROM jobs WHERE simhash IS NULL LIMIT 1").fetchone() is not None
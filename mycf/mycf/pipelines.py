@@ -1,76 +1,354 @@
 # mycf/pipelines.py
+import logging
 import os
 import re
-import sqlite3
+import time
+from collections import OrderedDict
 from datetime import datetime
-from scrapy.exceptions import DropItem
+from twisted.internet import task
+from scrapy.exceptions import DropItem, NotConfigured
 from scrapy.exporters import CsvItemExporter
 
+from mycf import columnar, db, neardup
+from mycf.items import JobDetailItem
+from mycf.salary import parse_salary
+from mycf.writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _drop(reason, message):
+    """带原因的 DropItem，CrawlMetrics 按 reason 分开计数（见 mycf/metrics.py）。"""
+    exc = DropItem(message)
+    exc.reason = reason
+    return exc
+
+
+def find_dedupe(crawler):
+    """本次抓取启用的 DedupePipeline 实例（不含 DetailPipeline）；没启用或引擎还没建好时返回 None。"""
+    engine = getattr(crawler, "engine", None)
+    pipelines = engine.scraper.itemproc.middlewares if engine else ()
+    return next((p for p in pipelines if isinstance(p, DedupePipeline) and not isinstance(p, DetailPipeline)), None)
+
+
+# ---------- 近似重复（SimHash） ----------
+class NearDuplicatePipeline:
+    """
+    在 DedupePipeline 之前给新岗位算 title/company/location 的 SimHash，按分段查找表（simhash_index）
+    找汉明距离 ≤ MYCF_NEARDUP_DISTANCE 的已有岗位，把簇号写进 item（随 jobs 落库，见 mycf/neardup.py）：
+      - job_url 已知的不算（交给 DedupePipeline 按 job_url 去重）：先查 DedupePipeline 的内存哈希集合
+        （库里、已归档和本次已收下的），reactor 线程里不碰 SQLite
+      - MYCF_NEARDUP_DROP=True 时直接丢弃近似重复（reason "near_duplicate"），否则只标记 cluster_id
+      - 旧库里还没有指纹的岗位在 open_spider 时一次性回填
+    查 4 个桶放在单独的查找线程里（BackgroundWriter，自己的连接；WAL 下不会被写线程挡住），process_item
+    返回 Deferred；分簇也在这个线程里按顺序做。本次运行刚处理过的 job_url 和还没落库的指纹在内存里
+    分两代、每代 max_pending 条（大于写线程队列能压住的岗位数），更早的已经进了判重集合 / simhash_index。
+    """
+    PENDING_MIN = 50_000
+
+    def __init__(self, db_path="mycf_jobs.sqlite", max_distance=3, drop=False, stats=None, seed_path=None,
+                 max_pending=PENDING_MIN, threaded=True):
+        self.db_path = db_path
+        self.seed_path = seed_path
+        self.max_distance = int(max_distance)
+        self.drop = drop
+        self.stats = stats
+        self.max_pending = max(1, int(max_pending))
+        self.conn = None
+        self.index = None
+        self.seed = False
+        self.lookup = BackgroundWriter(name="mycf-neardup-lookup", threaded=threaded)
+        self.seen = set()                # 没启用 DedupePipeline 时自己的判重集合
+        self._dedupe = None
+        self._recent = set()             # 查找线程：本次运行处理过的 job_url 哈希（两代）
+        self._older = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("MYCF_NEARDUP_ENABLED", True):
+            raise NotConfigured("MYCF_NEARDUP_ENABLED is off")
+        max_distance = settings.getint("MYCF_NEARDUP_DISTANCE", 3)
+        if not 0 <= max_distance <= neardup.MAX_DISTANCE:
+            logger.warning(f"MYCF_NEARDUP_DISTANCE={max_distance} is outside 0..{neardup.MAX_DISTANCE}; clamped")
+        # 在途（已分簇、还没提交）的岗位最多是写线程队列里的几批加上缓冲区
+        batch_size = settings.getint("MYCF_DEDUPE_BATCH_SIZE", 500)
+        in_flight = (settings.getint("MYCF_WRITER_QUEUE_SIZE", 16) + 2) * batch_size
+        return cls(
+            db_path=settings.get("MYCF_SQLITE_PATH", "mycf_jobs.sqlite"),
+            max_distance=max_distance,
+            drop=settings.getbool("MYCF_NEARDUP_DROP", False),
+            stats=crawler.stats,
+            seed_path=settings.get("MYCF_SEED_SQLITE_PATH"),
+            max_pending=max(cls.PENDING_MIN, in_flight),
+            threaded=settings.getbool("MYCF_BACKGROUND_WRITES", True),
+        )
+
+    def open_spider(self, spider):
+        # 连接在 reactor 线程打开（回填也在这里做完），之后只在查找线程里用
+        self.conn = db.connect(self.db_path, check_same_thread=False, seed_path=self.seed_path)
+        self.seed = db.has_seed(self.conn)
+        if neardup.needs_backfill(self.conn):
+            t0 = time.perf_counter()
+            n = neardup.backfill(self.conn, self.max_distance, seed=self.seed)
+            logger.info(f"Backfilled SimHash for {n} stored jobs in {time.perf_counter() - t0:.1f}s")
+        self.index = neardup.NearDupIndex(self.conn, self.max_distance, seed=self.seed, max_pending=self.max_pending)
+
+        self._dedupe = find_dedupe(getattr(spider, "crawler", None))
+        if self._dedupe is None:
+            self.seen = db.url_hashes(self.conn, seed=self.seed)
+        self.lookup.start()
+
+    def close_spider(self, spider):
+        if self.conn:
+            self.lookup.submit(self.conn.close)
+            self.lookup.close()
+            self.conn = None
+        if self.stats and self.index:
+            self.stats.set_value("mycf/neardup/lookups", self.index.lookups)
+
+    def _known(self):
+        """已知 job_url 的哈希集合：DedupePipeline 的那份（它在 open_spider 里才加载，所以每次现取）。"""
+        return self._dedupe.seen if self._dedupe is not None else self.seen
+
+    def process_item(self, item, spider):
+        if isinstance(item, JobDetailItem):
+            return item
+        job_url = item.get("job_url")
+        if not job_url:
+            return item
+        key = db.url_hash(job_url)
+        if key in self._known():
+            return item
+        d = self.lookup.call(self._classify, key, item.get("title"), item.get("company"), item.get("location"))
+        return d.addCallback(self._apply, item, key)
+
+    def _classify(self, key, title, company, location):
+        """查找线程：返回 (simhash, cluster_id, 是否近似重复)；同一 job_url 本次已处理过时返回 None。"""
+        if key in self._recent or key in self._older:
+            return None
+        if len(self._recent) >= self.max_pending:
+            self._older, self._recent = self._recent, set()
+        self._recent.add(key)
+        h = neardup.simhash(title, company, location)
+        if h is None:
+            return None, None, False
+        cluster, duplicate = self.index.assign(h)
+        return h, cluster, duplicate
+
+    def _apply(self, result, item, key):
+        """reactor 线程：把查找结果写回 item。"""
+        if result is None:
+            return item                  # 前一条已处理（或已丢弃、进了判重集合），DedupePipeline 按 job_url 丢弃
+        h, cluster, duplicate = result
+        if self._dedupe is None:
+            self.seen.add(key)
+        if h is None:
+            return item
+        item["simhash"] = neardup.to_signed(h)
+        item["cluster_id"] = cluster
+        if duplicate:
+            if self.stats:
+                self.stats.inc_value("mycf/neardup/matched")
+            if self.drop:
+                self._known().add(key)   # 同一 job_url 再出现时按普通重复丢弃
+                raise _drop("near_duplicate", f"Near-duplicate of cluster {cluster}: {item.get('job_url')}")
+        return item
+
+
 # ---------- 持久化去重（SQLite） ----------
 class DedupePipeline:
-    """以 job_url 为主键去重；首次插入 DB 并放行，重复就丢弃。"""
-    def __init__(self, db_path="mycf_jobs.sqlite"):
+    """
+    以 job_url 为主键去重：
+      - open_spider 时把 url_hashes 表（库里和已归档的所有岗位 job_url 的 64 位哈希）读进内存集合，
+        重复项直接丢弃，不碰 SQLite；新岗位的哈希随同一批写入
+      - 新记录带上 salary 解析出的 salary_min / salary_max；汇总表（rollup_*）由插入触发器顺带维护
+      - 新记录先攒在缓冲区，达到 MYCF_DEDUPE_BATCH_SIZE 条或每隔 MYCF_DEDUPE_FLUSH_INTERVAL 秒
+        整批交给后台写线程用 executemany 写入（WAL 模式），close_spider 时再刷一次并等写完
+      - 判重只查内存集合，留在 reactor 线程；写线程队列满时 process_item 返回 Deferred，放慢抓取
+      - 爬虫记下的抓取进度（spider.drain_progress()）跟同一批岗位在一个事务里提交；某页还有 item
+        没走完管道（比如排在近似重复查找后面）时，它的进度留到之后的批次：
+        进程被杀时，标记为完成的页，其岗位一定已落库
+      - 写库遇到 SQLite 忙 / 被锁时整批重试；重试用完仍失败则停掉这次抓取（reason "write_failed"），
+        之后的批次不再记进度，爬虫也不清进度、不存高水位，下次运行照常补抓
+    """
+    STATS_PREFIX = "mycf/dedupe"
+
+    def __init__(self, db_path="mycf_jobs.sqlite", batch_size=500, flush_interval=5.0,
+                 queue_size=16, threaded=True, stats=None, seed_path=None):
         self.db_path = db_path
+        self.seed_path = seed_path       # 分片运行时的主库（只读，判重时一并查）
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
         self.conn = None
+        self.seen = set()
+        self.buffer = []
+        self.writer = BackgroundWriter(name="mycf-dedupe-writer", maxsize=queue_size, threaded=threaded)
+        self.stats = stats
+        self._flush_loop = None
+        self._progress = None            # 爬虫的 drain_progress，见 open_spider
+        self._spider = None
 
     @classmethod
     def from_crawler(cls, crawler):
-        db_path = crawler.settings.get("MYCF_SQLITE_PATH", "mycf_jobs.sqlite")
-        return cls(db_path=db_path)
+        settings = crawler.settings
+        return cls(
+            db_path=settings.get("MYCF_SQLITE_PATH", "mycf_jobs.sqlite"),
+            batch_size=settings.getint("MYCF_DEDUPE_BATCH_SIZE", 500),
+            flush_interval=settings.getfloat("MYCF_DEDUPE_FLUSH_INTERVAL", 5.0),
+            queue_size=settings.getint("MYCF_WRITER_QUEUE_SIZE", 16),
+            threaded=settings.getbool("MYCF_BACKGROUND_WRITES", True),
+            stats=crawler.stats,
+            seed_path=settings.get("MYCF_SEED_SQLITE_PATH"),
+        )
 
     def open_spider(self, spider):
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir:
-            os.makedirs(db_dir, exist_ok=True)
-
-        self.conn = sqlite3.connect(self.db_path)
-        cur = self.conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                job_url TEXT PRIMARY KEY,
-                search_query TEXT,
-                title TEXT,
-                company TEXT,
-                location TEXT,
-                posted TEXT,
-                employment_type TEXT,
-                seniority TEXT,
-                category TEXT
-            )
-        """)
-        self.conn.commit()
+        # 连接在 reactor 线程打开、在写线程使用
+        self.conn = db.connect(self.db_path, check_same_thread=False, seed_path=self.seed_path)
+        self.seen = db.url_hashes(self.conn, seed=db.has_seed(self.conn))
+        self._progress = getattr(spider, "drain_progress", None)
+        self._spider = spider
+        self.writer.on_error = self._write_failed
+        self.writer.start()
+
+        if self.flush_interval > 0:
+            self._flush_loop = task.LoopingCall(self.flush)
+            self._flush_loop.start(self.flush_interval, now=False)
 
     def close_spider(self, spider):
+        if self._flush_loop and self._flush_loop.running:
+            self._flush_loop.stop()
         if self.conn:
-            self.conn.close()
+            self.flush()
+            self.writer.submit(self.conn.close)
+            self.writer.close()
+            if self.stats and self.writer.waits:
+                self.stats.set_value("mycf/dedupe/writer_waits", self.writer.waits)
+            if self.stats and self.writer.errors:
+                self.stats.set_value(f"{self.STATS_PREFIX}/write_failures", self.writer.errors)
+
+    def _write_failed(self):
+        """reactor 线程：写线程放弃了一批（已记日志），这批岗位和进度都没提交，停掉这次抓取。"""
+        if self.stats:
+            self.stats.set_value(f"{self.STATS_PREFIX}/write_failures", self.writer.errors)
+        engine = getattr(getattr(self._spider, "crawler", None), "engine", None)
+        if engine is not None and engine.running:
+            engine.close_spider(self._spider, "write_failed")
+
+    def flush(self):
+        """把缓冲区里的新记录（和爬虫攒下的进度）整批交给写线程；返回 submit 的 Deferred。"""
+        units = self._progress() if self._progress else []
+        if not self.buffer and not units:
+            return None
+        rows, self.buffer = self.buffer, []
+        return self.writer.submit(self._insert, rows, units)
+
+    def _insert(self, rows, units=()):
+        """写线程：一次性写入并提交；失败时回滚，由 BackgroundWriter 决定重试还是放弃。"""
+        try:
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO jobs
+                   (job_url, search_query, title, company, location, posted, posted_ts,
+                    employment_type, seniority, category, simhash, cluster_id, salary, salary_min, salary_max)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+            db.add_url_hashes(self.conn, (row[0] for row in rows))
+            if units and not self.writer.errors:
+                # 前面有批次没写进去时不再记进度：那些页的岗位不在库里，续抓时要重抓
+                db.save_progress(self.conn, units)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
 
     def process_item(self, item, spider):
+        if isinstance(item, JobDetailItem):
+            return item
         job_url = item.get("job_url")
         if not job_url:
-            raise DropItem("Missing job_url")
+            raise _drop("missing_url", "Missing job_url")
+        h = db.url_hash(job_url)
+        if h in self.seen:
+            raise _drop("duplicate", f"Duplicate job_url: {job_url}")
+
+        self.seen.add(h)
+        salary = item.get("salary")
+        salary_min, salary_max, _ = parse_salary(salary)
+        self.buffer.append((
+            job_url,
+            item.get("search_query"),
+            item.get("title"),
+            item.get("company"),
+            item.get("location"),
+            item.get("posted"),
+            item.get("posted_ts"),
+            item.get("employment_type"),
+            item.get("seniority"),
+            item.get("category"),
+            item.get("simhash"),
+            item.get("cluster_id"),
+            salary,
+            salary_min,
+            salary_max,
+        ))
+        if len(self.buffer) >= self.batch_size:
+            d = self.flush()
+            if not d.called:
+                return d.addCallback(lambda _: item)
+        return item
+
+# ---------- 详情补全侧表（SQLite） ----------
+class DetailPipeline(DedupePipeline):
+    """
+    JobDetailItem → job_details（按 job_url INSERT OR REPLACE，同时记下摘要哈希供下次比对）。
+    批量大小、刷盘间隔和写线程沿用去重管道的设置；其他 item 原样放过。
+    """
+    COLUMNS = (
+        "job_url", "content_hash", "description", "skills", "vacancies",
+        "min_experience", "address", "job_post_id", "updated_at",
+    )
+    STATS_PREFIX = "mycf/details"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer.name = "mycf-detail-writer"
+
+    def open_spider(self, spider):
+        self.conn = db.connect(self.db_path, check_same_thread=False)
+        self._spider = spider
+        self.writer.on_error = self._write_failed
+        self.writer.start()
+        if self.flush_interval > 0:
+            self._flush_loop = task.LoopingCall(self.flush)
+            self._flush_loop.start(self.flush_interval, now=False)
 
-        cur = self.conn.cursor()
+    def _insert(self, rows, units=()):
+        """写线程：覆盖写入并提交（失败时回滚）。"""
         try:
-            cur.execute(
-                """INSERT INTO jobs
-                   (job_url, search_query, title, company, location, posted, employment_type, seniority, category)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    job_url,
-                    item.get("search_query"),
-                    item.get("title"),
-                    item.get("company"),
-                    item.get("location"),
-                    item.get("posted"),
-                    item.get("employment_type"),
-                    item.get("seniority"),
-                    item.get("category"),
-                )
+            self.conn.executemany(
+                f"""INSERT OR REPLACE INTO job_details ({", ".join(self.COLUMNS)}, fetched_at)
+                    VALUES ({", ".join("?" * len(self.COLUMNS))}, ?)""",
+                rows,
             )
             self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if self.stats:
+            self.stats.inc_value("mycf/details/stored", len(rows))
+
+    def process_item(self, item, spider):
+        if not isinstance(item, JobDetailItem):
             return item
-        except sqlite3.IntegrityError:
-            raise DropItem(f"Duplicate job_url: {job_url}")
+        fetched_at = datetime.now().isoformat(timespec="seconds")
+        self.buffer.append(tuple(item.get(c) for c in self.COLUMNS) + (fetched_at,))
+        if len(self.buffer) >= self.batch_size:
+            d = self.flush()
+            if not d.called:
+                return d.addCallback(lambda _: item)
+        return item
+
 
 # ---------- 按“关键词/分类”分文件导出 ----------
 class SplitExportPipeline:
@@ -79,18 +357,48 @@ class SplitExportPipeline:
       - 'keyword'：output/by_keyword/<关键词>/<YYYY-MM-DD>.csv
       - 'category'：output/by_category/<分类>/<YYYY-MM-DD>.csv
     默认 settings.py 已设置为 'keyword'
+
+    写入方式：
+      - 行先按分组键攒在内存，满 MYCF_EXPORT_BATCH_SIZE 条或每隔 MYCF_EXPORT_FLUSH_INTERVAL 秒
+        整批交给后台写线程
+      - 同时打开的文件不超过 MYCF_EXPORT_MAX_OPEN_FILES，超出时关掉最久没写的；
+        再写到它时以追加模式重开，不重复写表头
     """
-    def __init__(self, base_dir="output", split_mode="keyword"):
+    stats_prefix = "mycf/export"
+    FIELDS = [
+        "search_query", "page_index",
+        "title", "company", "location", "salary", "posted",
+        "employment_type", "seniority", "category",
+        "job_url", "source_url",
+    ]
+
+    def __init__(self, base_dir="output", split_mode="keyword", max_open_files=64,
+                 batch_size=200, flush_interval=2.0, stats=None, queue_size=16, threaded=True):
         self.base_dir = base_dir
         self.split_mode = split_mode
-        self.exporters = {}
+        self.max_open_files = max(1, int(max_open_files))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.stats = stats
+        self.exporters = OrderedDict()   # key -> CsvItemExporter，按最近使用排序；只在写线程里访问
+        self.buffers = {}                # key -> [row, ...]；只在 reactor 线程里访问
+        self.writer = BackgroundWriter(name="mycf-export-writer", maxsize=queue_size, threaded=threaded)
         self.today = datetime.now().strftime("%Y-%m-%d")
+        self._flush_loop = None
 
     @classmethod
     def from_crawler(cls, crawler):
-        base_dir = crawler.settings.get("MYCF_OUTPUT_DIR", "output")
-        split_mode = crawler.settings.get("MYCF_SPLIT_MODE", "keyword")
-        return cls(base_dir=base_dir, split_mode=split_mode)
+        settings = crawler.settings
+        return cls(
+            base_dir=settings.get("MYCF_OUTPUT_DIR", "output"),
+            split_mode=settings.get("MYCF_SPLIT_MODE", "keyword"),
+            max_open_files=settings.getint("MYCF_EXPORT_MAX_OPEN_FILES", 64),
+            batch_size=settings.getint("MYCF_EXPORT_BATCH_SIZE", 200),
+            flush_interval=settings.getfloat("MYCF_EXPORT_FLUSH_INTERVAL", 2.0),
+            stats=crawler.stats,
+            queue_size=settings.getint("MYCF_WRITER_QUEUE_SIZE", 16),
+            threaded=settings.getbool("MYCF_BACKGROUND_WRITES", True),
+        )
 
     def _sanitize(self, name: str) -> str:
         name = (name or "Unknown").strip()
@@ -101,44 +409,207 @@ class SplitExportPipeline:
             return self._sanitize(item.get("search_query"))
         return self._sanitize(item.get("category"))
 
+    def _row(self, item):
+        return {f: item.get(f) for f in self.FIELDS}
+
+    # ---------- 文件句柄池（写线程） ----------
     def _get_or_create_exporter(self, key: str) -> CsvItemExporter:
-        if key in self.exporters:
-            return self.exporters[key]
+        exporter = self.exporters.get(key)
+        if exporter is not None:
+            self.exporters.move_to_end(key)
+            return exporter
+
+        while len(self.exporters) >= self.max_open_files:
+            _, oldest = self.exporters.popitem(last=False)
+            self._close_exporter(oldest)
+            if self.stats:
+                self.stats.inc_value("mycf/export/evicted")
 
         subdir = "by_keyword" if self.split_mode == "keyword" else "by_category"
         dir_path = os.path.join(self.base_dir, subdir, key)
         os.makedirs(dir_path, exist_ok=True)
         file_path = os.path.join(dir_path, f"{self.today}.csv")
 
-        file_exists = os.path.exists(file_path)
+        has_header = os.path.exists(file_path) and os.path.getsize(file_path) > 0
         f = open(file_path, "ab")
-        exporter = CsvItemExporter(f, include_headers_line=not file_exists)
-        exporter.fields_to_export = [
-            "search_query", "page_index",
-            "title", "company", "location", "salary", "posted",
-            "employment_type", "seniority", "category",
-            "job_url", "source_url",
-        ]
+        exporter = CsvItemExporter(f, include_headers_line=not has_header)
+        exporter.fields_to_export = self.FIELDS
         exporter.start_exporting()
         exporter._file = f
         self.exporters[key] = exporter
+        if self.stats:
+            self.stats.inc_value("mycf/export/opened")
+            self.stats.set_value("mycf/export/open_files", len(self.exporters))
+            self.stats.max_value("mycf/export/open_files_max", len(self.exporters))
         return exporter
 
+    def _close_exporter(self, exporter):
+        try:
+            exporter.finish_exporting()
+        except Exception:
+            pass
+        f = getattr(exporter, "_file", None)
+        if f:
+            try:
+                f.close()
+            except Exception:
+                pass
+
+    def _write_batch(self, key, rows):
+        t0 = time.perf_counter()
+        exporter = self._get_or_create_exporter(key)
+        for row in rows:
+            exporter.export_item(row)
+        exporter._file.flush()
+        if self.stats:
+            ms = (time.perf_counter() - t0) * 1000
+            self.stats.inc_value("mycf/export/flushes")
+            self.stats.inc_value("mycf/export/flush_ms_total", ms)
+            self.stats.max_value("mycf/export/flush_ms_max", ms)
+
+    def _close_all(self):
+        for exporter in self.exporters.values():
+            self._close_exporter(exporter)
+        self.exporters.clear()
+        if self.stats:
+            self.stats.set_value("mycf/export/open_files", 0)
+
+    # ---------- 管道接口（reactor 线程） ----------
+    def open_spider(self, spider):
+        self.writer.start()
+        if self.flush_interval > 0:
+            self._flush_loop = task.LoopingCall(self.flush)
+            self._flush_loop.start(self.flush_interval, now=False)
+
     def process_item(self, item, spider):
+        if isinstance(item, JobDetailItem):
+            return item
         key = self._key_from_item(item)
-        exporter = self._get_or_create_exporter(key)
-        exporter.export_item(item)
+        buf = self.buffers.get(key)
+        if buf is None:
+            buf = self.buffers[key] = []
+        buf.append(self._row(item))
+        if len(buf) >= self.batch_size:
+            d = self.writer.submit(self._write_batch, key, self.buffers.pop(key))
+            if not d.called:
+                return d.addCallback(lambda _: item)
         return item
 
+    def flush(self):
+        """把所有分组里攒着的行交给写线程。"""
+        buffers, self.buffers = self.buffers, {}
+        for key, rows in buffers.items():
+            self.writer.submit(self._write_batch, key, rows)
+
     def close_spider(self, spider):
-        for exporter in self.exporters.values():
-            try:
-                exporter.finish_exporting()
-            except Exception:
-                pass
-            f = getattr(exporter, "_file", None)
-            if f:
-                try:
-                    f.close()
-                except Exception:
-                    pass
+        if self._flush_loop and self._flush_loop.running:
+            self._flush_loop.stop()
+        self.flush()
+        self.writer.submit(self._close_all)
+        self.writer.close()
+        if self.stats and self.writer.waits:
+            self.stats.set_value(f"{self.stats_prefix}/writer_waits", self.writer.waits)
+
+
+# ---------- 列式分区导出（Parquet，可选） ----------
+class ColumnarExportPipeline(SplitExportPipeline):
+    """
+    MYCF_COLUMNAR_EXPORT=True 时启用，与 CSV 分文件导出并存：
+      output/parquet/date=<YYYY-MM-DD>/keyword=<关键词>/part-<运行ID>-<序号>.parquet
+    每个分组攒够 MYCF_COLUMNAR_BATCH_SIZE 行写一个 row group；posted_ts、salary_min/salary_max 为数值列。
+    没装 pyarrow 时写同样结构的 CSV 分片。小文件用 python mycf/compact.py --date <日期> 合并。
+    """
+    stats_prefix = "mycf/columnar"
+
+    def __init__(self, base_dir="output/parquet", split_mode="keyword", fmt="auto", max_open_files=64,
+                 batch_size=5000, flush_interval=30.0, compression="zstd", stats=None,
+                 queue_size=16, threaded=True):
+        super().__init__(base_dir, split_mode, max_open_files, batch_size, flush_interval, stats,
+                         queue_size, threaded)
+        self.part_class = columnar.part_class(fmt)
+        self.compression = compression
+        self.run_id = f"{datetime.now():%H%M%S}-{os.getpid()}"
+        self.parts_written = 0
+        self.writer.name = "mycf-columnar-writer"
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("MYCF_COLUMNAR_EXPORT", False):
+            raise NotConfigured("MYCF_COLUMNAR_EXPORT is off")
+        fmt = settings.get("MYCF_COLUMNAR_FORMAT", "auto")
+        if fmt == "parquet" and not columnar.has_parquet():
+            logger.warning("pyarrow is not installed; columnar export falls back to CSV parts")
+        return cls(
+            base_dir=os.path.join(settings.get("MYCF_OUTPUT_DIR", "output"), "parquet"),
+            split_mode=settings.get("MYCF_SPLIT_MODE", "keyword"),
+            fmt=fmt,
+            max_open_files=settings.getint("MYCF_EXPORT_MAX_OPEN_FILES", 64),
+            batch_size=settings.getint("MYCF_COLUMNAR_BATCH_SIZE", 5000),
+            flush_interval=settings.getfloat("MYCF_COLUMNAR_FLUSH_INTERVAL", 30.0),
+            compression=settings.get("MYCF_COLUMNAR_COMPRESSION", "zstd"),
+            stats=crawler.stats,
+            queue_size=settings.getint("MYCF_WRITER_QUEUE_SIZE", 16),
+            threaded=settings.getbool("MYCF_BACKGROUND_WRITES", True),
+        )
+
+    def _row(self, item):
+        salary = item.get("salary")
+        salary_min, salary_max, currency = parse_salary(salary)
+        page_index = item.get("page_index")
+        return {
+            "search_query": item.get("search_query"),
+            "page_index": int(page_index) if page_index is not None else None,
+            "title": item.get("title"),
+            "company": item.get("company"),
+            "location": item.get("location"),
+            "salary": salary,
+            "salary_min": salary_min,
+            "salary_max": salary_max,
+            "salary_currency": currency,
+            "posted": item.get("posted"),
+            "posted_ts": item.get("posted_ts"),
+            "employment_type": item.get("employment_type"),
+            "seniority": item.get("seniority"),
+            "category": item.get("category"),
+            "job_url": item.get("job_url"),
+            "source_url": item.get("source_url"),
+        }
+
+    # ---------- 分片池（写线程） ----------
+    def _get_or_create_exporter(self, key):
+        part = self.exporters.get(key)
+        if part is not None:
+            self.exporters.move_to_end(key)
+            return part
+
+        while len(self.exporters) >= self.max_open_files:
+            _, oldest = self.exporters.popitem(last=False)
+            oldest.close()
+            if self.stats:
+                self.stats.inc_value("mycf/columnar/evicted")
+
+        dir_path = columnar.partition_dir(self.base_dir, self.today, self.split_mode, key)
+        os.makedirs(dir_path, exist_ok=True)
+        self.parts_written += 1
+        name = f"part-{self.run_id}-{self.parts_written:04d}{self.part_class.suffix}"
+        part = self.part_class(os.path.join(dir_path, name), compression=self.compression)
+        self.exporters[key] = part
+        if self.stats:
+            self.stats.inc_value("mycf/columnar/parts")
+        return part
+
+    def _write_batch(self, key, rows):
+        t0 = time.perf_counter()
+        self._get_or_create_exporter(key).write(rows)
+        if self.stats:
+            ms = (time.perf_counter() - t0) * 1000
+            self.stats.inc_value("mycf/columnar/row_groups")
+            self.stats.inc_value("mycf/columnar/rows", len(rows))
+            self.stats.inc_value("mycf/columnar/flush_ms_total", ms)
+            self.stats.max_value("mycf/columnar/flush_ms_max", ms)
+
+    def _close_all(self):
+        for part in self.exporters.values():
+            part.close()
+        self.exporters.clear()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按历史产出给关键词排序、分配页数预算（-a plan=1 / MYCF_PLAN）：
+
+  - 每个关键词的岗位集合 = 高水位里最近见过的 job_url + jobs 表里由它首次发现的岗位（近 lookback 天）
+  - 发布速率：集合里岗位的 posted_ts 跨度内平均每天几条；乘上距上次抓取的天数 = 这次预计的结果数
+  - 重叠：按“懒惰贪心”排序，每一步选“预计结果数 × 不与前面关键词重叠的比例”最大的关键词
+    （该量只减不增，堆里的旧值是上界，出堆时重算即可）；另记与其他关键词的最大 Jaccard 供报告参考
+  - 页数：覆盖预计结果数所需页数（至少 1 页，用来刷新高水位和估计），每页预计新增不足 min_yield 的只给 1 页；
+    给了总预算时，从每页预计新增最少的关键词开始砍页
+  - 没有历史的关键词排最前、给满 max_pages
+计划和实际结果（实际页数、实际新增岗位数）记在 keyword_plan 表里：
+
+  python mycf/planner.py --keywords_file keywords.txt --max_pages 5      # 预览计划
+  python mycf/planner.py --report                                         # 最近一次运行：预计 vs 实际
+"""
+
+import argparse
+import heapq
+import math
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+# 允许直接以脚本运行（python mycf/planner.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mycf import db  # noqa: E402
+
+DAY = 86400
+
+
+@dataclass
+class KeywordHistory:
+    query: str
+    urls: set
+    rate: float              # 每天新发布（在该关键词下出现）的岗位数
+    last_run: float = None   # 上次抓取时间（epoch 秒）
+
+
+@dataclass
+class PlanEntry:
+    query: str
+    rank: int
+    pages: int
+    expected_results: float = None   # 预计结果数（None = 没有历史）
+    unique_share: float = None       # 不与排在前面的关键词重叠的比例
+    overlap_with: str = None         # Jaccard 最大的其他关键词
+    jaccard: float = None
+
+    @property
+    def expected_new(self):
+        if self.expected_results is None:
+            return None
+        return self.expected_results * self.unique_share
+
+
+# ---------- 历史 ----------
+def load_history(conn, queries, lookback_days=30, seed=False, now=None):
+    """{query: KeywordHistory}；没有任何记录的关键词不在结果里。"""
+    now = now or time.time()
+    cutoff = now - lookback_days * DAY
+    posted = {}
+    sets = {q: set() for q in queries}
+    tables = ("seed.jobs", "jobs") if seed else ("jobs",)
+    for table in tables:
+        for url, query, ts in conn.execute(
+            f"SELECT job_url, search_query, posted_ts FROM {table} WHERE posted_ts >= ?", (cutoff,)
+        ):
+            posted[url] = ts
+            if query in sets:
+                sets[query].add(url)
+    for query, (_, recent) in db.load_watermarks(conn, seed=seed).items():
+        if query in sets:
+            sets[query] |= recent
+
+    last_run = {}
+    tables = ("seed.keyword_watermarks", "keyword_watermarks") if seed else ("keyword_watermarks",)
+    for table in tables:
+        for query, updated_at in conn.execute(f"SELECT search_query, updated_at FROM {table}"):
+            try:
+                ts = datetime.fromisoformat(updated_at).timestamp()
+            except (TypeError, ValueError):
+                continue
+            last_run[query] = max(ts, last_run.get(query, 0))
+
+    history = {}
+    for query, urls in sets.items():
+        if not urls:
+            continue
+        stamps = [posted[u] for u in urls if u in posted]
+        span_days = max(1.0, (now - min(stamps)) / DAY) if stamps else lookback_days
+        history[query] = KeywordHistory(query, urls, len(stamps) / span_days, last_run.get(query))
+    return history
+
+
+# ---------- 计划 ----------
+def _jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def make_plan(queries, history, max_pages, per_page=20, within_days=7, budget=None, min_yield=1.0, now=None):
+    """返回按优先级排好的 [PlanEntry]；分不到页的关键词不在结果里。"""
+    now = now or time.time()
+    entries = [PlanEntry(q, 0, max_pages) for q in queries if q not in history]
+
+    expected = {}
+    for q, h in history.items():
+        interval = within_days if h.last_run is None else min(within_days, max(1 / 24, (now - h.last_run) / DAY))
+        expected[q] = h.rate * interval
+
+    # 懒惰贪心：堆里是 (-上界, query)；出堆时按当前已覆盖集合重算，仍不小于下一个上界就选中
+    covered = set()
+    heap = [(-expected[q], q) for q in history]
+    heapq.heapify(heap)
+    while heap:
+        _, q = heapq.heappop(heap)
+        urls = history[q].urls
+        share = len(urls - covered) / len(urls)
+        gain = expected[q] * share
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, q))
+            continue
+        covered |= urls
+        pages = max(1, min(max_pages, math.ceil(expected[q] / per_page)))
+        if per_page * share < min_yield:
+            pages = 1
+        entries.append(PlanEntry(q, 0, pages, expected[q], share))
+
+    for entry in entries:
+        h = history.get(entry.query)
+        if h is None:
+            continue
+        best = max(((_jaccard(h.urls, o.urls), o.query) for o in history.values() if o is not h), default=None)
+        if best:
+            entry.jaccard, entry.overlap_with = best
+
+    if budget is not None:
+        _fit_budget(entries, budget, per_page)
+    entries = [e for e in entries if e.pages > 0]
+    for rank, entry in enumerate(entries):
+        entry.rank = rank
+    return entries
+
+
+def _fit_budget(entries, budget, per_page):
+    """总页数超出预算时，先砍每页预计新增最少的关键词的多余页，还不够再从排在最后的关键词整个砍掉。"""
+    def per_page_yield(e):
+        return float("inf") if e.expected_results is None else per_page * e.unique_share
+
+    total = sum(e.pages for e in entries)
+    for entry in sorted(entries, key=per_page_yield):
+        if total <= budget:
+            return
+        cut = min(entry.pages - 1, total - budget)
+        entry.pages -= cut
+        total -= cut
+    for entry in reversed(entries):
+        if total <= budget:
+            return
+        total -= entry.pages
+        entry.pages = 0
+
+
+# ---------- 记录与报告 ----------
+def save_plan(conn, run_id, entries):
+    conn.executemany(
+        """INSERT OR REPLACE INTO keyword_plan
+           (run_id, search_query, rank, pages, expected_results, expected_new, unique_share, overlap_with, jaccard)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(run_id, e.query, e.rank, e.pages, e.expected_results, e.expected_new, e.unique_share,
+          e.overlap_with, e.jaccard) for e in entries],
+    )
+    conn.commit()
+
+
+def max_rowid(conn):
+    return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM jobs").fetchone()[0]
+
+
+def record_actuals(conn, run_id, pages_by_query, since_rowid):
+    """运行结束：实际抓的页数，以及 rowid > since_rowid 的新岗位按首次发现它的关键词计数。"""
+    new = dict(conn.execute(
+        "SELECT search_query, COUNT(*) FROM jobs WHERE rowid > ? GROUP BY search_query", (since_rowid,)
+    ).fetchall())
+    conn.executemany(
+        "UPDATE keyword_plan SET actual_pages = ?, actual_new = ? WHERE run_id = ? AND search_query = ?",
+        [(pages_by_query.get(q, 0), new.get(q, 0), run_id, q)
+         for (q,) in conn.execute("SELECT search_query FROM keyword_plan WHERE run_id = ?", (run_id,)).fetchall()],
+    )
+    conn.commit()
+
+
+def _fmt(value, spec):
+    width = int(spec.split(".")[0] or 0)
+    return f"{'-':>{width}}" if value is None else format(value, spec)
+
+
+def print_plan(entries, actuals=None):
+    print(f"{'#':>3} {'keyword':30s} {'pages':>7} {'exp.res':>8} {'uniq':>5} {'exp.new':>8}"
+          + (f" {'new':>5} {'req/new':>8}" if actuals is not None else "") + "  most overlap (jaccard)")
+    for e in entries:
+        line = (f"{e.rank:3d} {e.query[:30]:30s} "
+                f"{(f'{actuals[e.query][0]}/' if actuals is not None else '') + str(e.pages):>7} "
+                f"{_fmt(e.expected_results, '8.1f')} {_fmt(e.unique_share, '5.2f')} {_fmt(e.expected_new, '8.1f')}")
+        if actuals is not None:
+            pages, new = actuals[e.query]
+            line += f" {new:5d} {_fmt(pages / new if new else None, '8.2f')}"
+        if e.overlap_with and e.jaccard:
+            line += f"  {e.overlap_with[:24]} ({e.jaccard:.2f})"
+        print(line)
+
+
+def report(conn, run_id=None):
+    run_id = run_id or (conn.execute("SELECT MAX(run_id) FROM keyword_plan").fetchone() or [None])[0]
+    if run_id is None:
+        print("（keyword_plan 里还没有记录：用 -a plan=1 运行一次）")
+        return
+    rows = conn.execute(
+        """SELECT search_query, rank, pages, expected_results, unique_share, overlap_with, jaccard,
+                  COALESCE(actual_pages, 0), COALESCE(actual_new, 0)
+           FROM keyword_plan WHERE run_id = ? ORDER BY rank""", (run_id,)
+    ).fetchall()
+    entries = [PlanEntry(q, rank, pages, res, share, other, jac) for q, rank, pages, res, share, other, jac, _, _ in rows]
+    actuals = {r[0]: (r[7], r[8]) for r in rows}
+    print(f"run {run_id}：")
+    print_plan(entries, actuals)
+    pages = sum(a[0] for a in actuals.values())
+    new = sum(a[1] for a in actuals.values())
+    expected = sum(e.expected_new or 0 for e in entries)
+    print(f"合计：{pages} 页，新增 {new} 个岗位（有历史的关键词预计 {expected:.0f}），"
+          f"每个新岗位 {_fmt(pages / new if new else None, '.2f').strip()} 个请求")
+
+
+# ---------- 命令行 ----------
+def parse_args():
+    p = argparse.ArgumentParser(description="Plan keyword order and page budgets from crawl history.")
+    p.add_argument("--db", default="mycf_jobs.sqlite", help="SQLite 文件路径（默认 mycf_jobs.sqlite）")
+    p.add_argument("--keywords_file", default="keywords.txt", help="关键词文件（默认 keywords.txt）")
+    p.add_argument("--max_pages", type=int, default=3)
+    p.add_argument("--per_page", type=int, default=20)
+    p.add_argument("--within_days", type=int, default=7)
+    p.add_argument("--budget", type=int, default=None, help="总页数预算（默认 不限）")
+    p.add_argument("--min_yield", type=float, default=1.0, help="每页预计新增低于此值的关键词只给 1 页（默认 1）")
+    p.add_argument("--lookback_days", type=int, default=30, help="估计发布速率用最近多少天的历史（默认 30）")
+    p.add_argument("--report", action="store_true", help="显示最近一次 -a plan=1 运行的预计 vs 实际")
+    p.add_argument("--run_id", default=None, help="配合 --report 指定某次运行")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        raise SystemExit(f"找不到数据库文件：{args.db}")
+    conn = sqlite3.connect(args.db)
+    db.ensure_schema(conn)
+    if args.report:
+        report(conn, args.run_id)
+        return
+    with open(args.keywords_file, "r", encoding="utf-8") as f:
+        queries = sorted({s.strip() for s in f if s.strip() and not s.strip().startswith("#")})
+    history = load_history(conn, queries, args.lookback_days)
+    entries = make_plan(queries, history, args.max_pages, args.per_page, args.within_days, args.budget, args.min_yield)
+    print_plan(entries)
+    skipped = len(queries) - len(entries)
+    print(f"合计 {sum(e.pages for e in entries)} 页（不做计划：{len(queries) * args.max_pages} 页）"
+          + (f"，{skipped} 个关键词超出预算" if skipped else ""))
+
+
+if __name__ == "__main__":
+    main()
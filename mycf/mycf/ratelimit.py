@@ -0,0 +1,43 @@
+# mycf/ratelimit.py
+"""
+跨进程共享的请求速率预算（分片启动器用，见 mycf/launcher.py）：
+  - SharedRateBudget：放在共享内存里的令牌桶，所有分片进程一起消耗
+  - 启动器在 fork 出的每个分片进程里 install()，SharedRateLimitMiddleware 通过 current() 取用；
+    单进程运行时没有预算，中间件自动停用
+"""
+import multiprocessing as mp
+import time
+
+_budget = None
+
+
+class SharedRateBudget:
+    """令牌桶：每秒补充 rate 个，最多攒 burst 个。时间用 CLOCK_MONOTONIC，各进程一致。"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self._tokens = mp.Value("d", self.burst, lock=False)
+        self._stamp = mp.Value("d", time.monotonic(), lock=False)
+        self._lock = mp.Lock()
+
+    def take(self) -> float:
+        """取一个令牌；拿到返回 0，否则返回还要等的秒数。"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.burst, self._tokens.value + (now - self._stamp.value) * self.rate)
+            self._stamp.value = now
+            if tokens >= 1:
+                self._tokens.value = tokens - 1
+                return 0.0
+            self._tokens.value = tokens
+            return (1 - tokens) / self.rate
+
+
+def install(budget):
+    global _budget
+    _budget = budget
+
+
+def current():
+    return _budget
@@ -2,16 +2,36 @@
 # -*- coding: utf-8 -*-
 """
 读取 mycf_jobs.sqlite 中的职位记录，并可筛选/导出。
-表结构参考 pipelines.DedupePipeline 创建的 jobs 表：
-(job_url PRIMARY KEY, search_query, title, company, location, posted, employment_type, seniority, category)
+表结构见 mycf/db.py 的 jobs 表：
+(job_url PRIMARY KEY, search_query, title, company, location, posted, posted_ts, employment_type, seniority, category,
+ salary, salary_min, salary_max, ...)
+
+  python mycf/read_jobs.py summary --since_days 30    # 只读汇总表：各分类每天岗位数、各关键词薪资、招聘最多的公司
+  python mycf/read_jobs.py --include_archive --keyword "data scientist"   # 连同 archive/ 里的月分区一起查（见 archive.py）
+  python mycf/read_jobs.py --migrate --keyword quant    # 旧库：先按当前版本补齐表结构（平时由爬虫做）
+
+数据库默认以只读方式打开（不建表、不补列，不和正在写库的爬虫抢锁）；只有 --migrate 和 summary --rebuild 会写库。
 """
 
 import argparse
 import csv
+import gzip
+import io
+import json
 import os
 import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
 from textwrap import shorten
 
+# 允许直接以脚本运行（python mycf/read_jobs.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mycf import archive  # noqa: E402
+from mycf import db as mycf_db  # noqa: E402
+from mycf.dates import SGT, date_prefix_range  # noqa: E402
+
 DEFAULT_DB = os.path.join(os.getcwd(), "mycf_jobs.sqlite")
 
 def parse_args():
@@ -20,32 +40,113 @@ def parse_args():
     p.add_argument("--limit", type=int, default=50, help="最多显示条数（默认 50）")
     p.add_argument("--category", default="%", help="按分类 LIKE 匹配（支持通配符%%，默认 全部）")
     p.add_argument("--keyword", default="%", help="按 search_query LIKE 匹配（默认 全部）")
-    p.add_argument("--posted_prefix", default="%", help="按 posted 前缀 LIKE（如 2025-10，或 2025-；默认 全部）")
-    p.add_argument("--export_csv", default=None, help="导出到 CSV 文件路径（可选）")
+    p.add_argument("--posted_prefix", default="%", help="按发布日期前缀筛选（如 2025-10，或 2025-；默认 全部）")
+    p.add_argument("--since_days", type=int, default=None, help="只看最近 N 天发布的（按 posted_ts）")
+    p.add_argument("--search", default=None, help="全文检索 title/company/category（FTS5 语法，如 'quant AND python'）")
+    p.add_argument("--after", type=int, default=None, help="翻页：只显示 rowid 小于该值的记录（上一页末尾会提示）")
+    p.add_argument("--export", default=None,
+                   help="流式导出全部匹配记录：.csv / .jsonl，可加 .gz / .zst 压缩（如 jobs.jsonl.gz）")
+    p.add_argument("--format", choices=["csv", "jsonl"], default=None, help="导出格式（默认按扩展名推断）")
+    p.add_argument("--export_limit", type=int, default=None, help="导出最多多少行（默认 不限）")
+    p.add_argument("--chunk_size", type=int, default=5000, help="导出时每批读取的行数（默认 5000）")
+    p.add_argument("--export_csv", default=None, help="同 --export，固定 CSV 格式（旧参数）")
+    p.add_argument("--include_archive", action="store_true",
+                   help="连同归档分区一起查：先主库、再按月份从新到旧，凑够 --limit 为止；导出时包含全部分区")
+    p.add_argument("--archive_dir", default=None, help="归档目录（默认 数据库同目录下的 archive/）")
+    p.add_argument("--migrate", action="store_true",
+                   help="表结构不是当前版本时先升级（会写库；平时由爬虫在打开库时完成）")
+
+    sub = p.add_subparsers(dest="command", metavar="summary")
+    s = sub.add_parser("summary", help="从汇总表读：各分类每天岗位数、各关键词薪资范围、招聘最多的公司")
+    # 与主命令同名的参数不设默认值，免得覆盖写在子命令前面的取值
+    s.add_argument("--db", default=argparse.SUPPRESS, help="SQLite 文件路径（默认：当前目录下 mycf_jobs.sqlite）")
+    s.add_argument("--since_days", type=int, default=argparse.SUPPRESS, help="最近 N 天（默认 30）")
+    s.add_argument("--category", default=argparse.SUPPRESS, help="按分类 LIKE 匹配（默认 全部）")
+    s.add_argument("--keyword", default=argparse.SUPPRESS, help="按 search_query LIKE 匹配（默认 全部）")
+    s.add_argument("--top", type=int, default=10, help="每部分最多显示几行（默认 10）")
+    s.add_argument("--days", type=int, default=7, help="分类表按天展开的列数（默认最近 7 天）")
+    s.add_argument("--rebuild", action="store_true", help="先按 jobs 现有内容重算汇总表")
+    s.add_argument("--migrate", action="store_true", default=argparse.SUPPRESS,
+                   help="表结构不是当前版本时先升级（会写库）")
     return p.parse_args()
 
-def open_db(path: str) -> sqlite3.Connection:
+def open_db(path: str, migrate: bool = False, writable: bool = False) -> sqlite3.Connection:
+    """
+    默认只读打开（file:...?mode=ro），不改库；migrate=True 时按当前版本补齐表结构，writable=True 时可写
+    （summary --rebuild）。表结构落后又没给 migrate 时照样只读打开，只提示一句。
+    """
     if not os.path.exists(path):
         raise FileNotFoundError(f"找不到数据库文件：{path}")
-    conn = sqlite3.connect(path)
+    if migrate or writable:
+        conn = sqlite3.connect(path)
+        if migrate and mycf_db.schema_version(conn) < mycf_db.SCHEMA_VERSION:
+            mycf_db.ensure_schema(conn)
+    else:
+        conn = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+    version = mycf_db.schema_version(conn)
+    if version < mycf_db.SCHEMA_VERSION:
+        print(f"⚠️ {path} 的表结构是旧版本（{version} < {mycf_db.SCHEMA_VERSION}），缺列 / 缺索引时查询可能出错；"
+              "先跑一次爬虫，或加 --migrate 升级", file=sys.stderr)
     conn.row_factory = sqlite3.Row
     return conn
 
-def query_jobs(conn: sqlite3.Connection, category_like: str, keyword_like: str, posted_prefix: str, limit: int):
-    # posted 里有可能是 "2025-10-12T..." 或 "3 days ago" 等相对字符串
-    # 这里用 LIKE 前缀匹配（例如 '2025-%'），无法匹配相对字符串；相对字符串就当作“其他”
-    sql = """
-    SELECT job_url, search_query, title, company, location, posted,
-           employment_type, seniority, category
+def _match_clause(column: str, pattern: str) -> str:
+    # 不含通配符时用等值（NOCASE 索引上按 rowid 有序，翻页不用再排序）；否则 LIKE
+    if "%" in pattern or "_" in pattern:
+        return f"{column} LIKE ?"
+    return f"{column} = ? COLLATE NOCASE"
+
+def build_query(conn: sqlite3.Connection, category_like: str, keyword_like: str, posted_prefix: str, limit: int = None,
+                since_days: int = None, search: str = None, after: int = None):
+    """返回 (sql, params)；limit 为 None 时不加 LIMIT。"""
+    # 日期筛选都走 posted_ts（UTC epoch 秒）的整数比较：
+    #   日期前缀（2025 / 2025-10 / 2025-10-1 …）换算成和 LIKE 前缀匹配相同的 [start, end) 区间，
+    #   换算不了的才退回 posted LIKE；相对时间在入库时已解析
+    where, params = [], []
+    if category_like != "%":
+        where.append(_match_clause("category", category_like))
+        params.append(category_like)
+    if keyword_like != "%":
+        where.append(_match_clause("search_query", keyword_like))
+        params.append(keyword_like)
+    if posted_prefix != "%":
+        rng = date_prefix_range(posted_prefix)
+        if rng:
+            where.append("posted_ts >= ? AND posted_ts < ?")
+            params.extend(rng)
+        else:
+            where.append("posted LIKE ?")
+            params.append(posted_prefix)
+    if since_days is not None:
+        where.append("posted_ts >= ?")
+        params.append(int(time.time()) - since_days * 86400)
+    if search:
+        if not mycf_db.has_fts(conn):
+            raise RuntimeError("当前 SQLite 不支持 FTS5，无法使用 --search")
+        where.append("rowid IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)")
+        params.append(search)
+    if after is not None:
+        # 键集翻页：按 rowid 倒序接着上一页往下取，不用 OFFSET 重扫
+        where.append("rowid < ?")
+        params.append(after)
+
+    sql = f"""
+    SELECT rowid, job_url, search_query, title, company, location, posted, posted_ts,
+           employment_type, seniority, category, salary, salary_min, salary_max
     FROM jobs
-    WHERE category LIKE ?
-      AND search_query LIKE ?
-      AND posted LIKE ?
+    {"WHERE " + " AND ".join(where) if where else ""}
     ORDER BY rowid DESC
-    LIMIT ?
     """
+    if limit is not None:
+        sql += "LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+def query_jobs(conn: sqlite3.Connection, category_like: str, keyword_like: str, posted_prefix: str, limit: int,
+               since_days: int = None, search: str = None, after: int = None):
+    sql, params = build_query(conn, category_like, keyword_like, posted_prefix, limit, since_days, search, after)
     cur = conn.cursor()
-    cur.execute(sql, (category_like, keyword_like, posted_prefix, limit))
+    cur.execute(sql, params)
     return cur.fetchall()
 
 def print_table(rows):
@@ -68,27 +169,191 @@ def print_table(rows):
         ]
         print(" | ".join(line))
 
-def export_csv(rows, path: str):
-    os.makedirs(os.path.dirname(path), exist_ok=True) if os.path.dirname(path) else None
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["search_query","title","company","location","category","employment_type","seniority","posted","job_url"])
-        for r in rows:
-            w.writerow([
-                r["search_query"], r["title"], r["company"], r["location"], r["category"],
-                r["employment_type"], r["seniority"], r["posted"], r["job_url"]
-            ])
-    print(f"✅ 已导出 CSV -> {path}")
+EXPORT_COLUMNS = ["search_query", "title", "company", "location", "category",
+                  "employment_type", "seniority", "posted", "posted_ts", "salary", "salary_min", "salary_max",
+                  "job_url"]
+
+def export_format(path: str, fmt: str = None):
+    """由 --format 或扩展名推断 (格式, 压缩)：如 jobs.jsonl.gz -> ("jsonl", "gz")。"""
+    name = path.lower()
+    compression = None
+    for ext in (".gz", ".zst"):
+        if name.endswith(ext):
+            compression = ext[1:]
+            name = name[: -len(ext)]
+    if not fmt:
+        fmt = "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    return fmt, compression
+
+def open_output(path: str, compression: str = None):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if compression == "gz":
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    if compression == "zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("导出 .zst 需要先 pip install zstandard")
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8", newline="")
+    return open(path, "w", newline="", encoding="utf-8")
+
+def _json_dumps():
+    try:
+        import orjson
+        return lambda obj: orjson.dumps(obj).decode("utf-8")
+    except ImportError:
+        return lambda obj: json.dumps(obj, ensure_ascii=False)
+
+def _chunks(sources, chunk_size: int, limit: int = None):
+    """依次读各个 (conn, sql, params)，按 chunk_size 分批产出元组；limit 为总行数上限。"""
+    left = limit
+    for conn, sql, params in sources:
+        cur = conn.cursor()
+        cur.row_factory = None  # 导出只要元组，省掉 sqlite3.Row 的开销
+        cur.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM ({sql})", params)
+        while left is None or left > 0:
+            rows = cur.fetchmany(chunk_size if left is None else min(chunk_size, left))
+            if not rows:
+                break
+            if left is not None:
+                left -= len(rows)
+            yield rows
+        cur.close()
+
+def export_rows(conn: sqlite3.Connection, sql: str, params, path: str, fmt: str = None, chunk_size: int = 5000,
+                extra_sources=(), limit: int = None):
+    """
+    流式导出：游标按 chunk_size 分批 fetchmany，边读边写，内存占用与表大小无关。
+    支持 csv / jsonl，按扩展名 .gz / .zst 压缩。
+    extra_sources：接在 conn 后面继续导出的 (conn, sql, params)，如归档分区；limit 为合计行数上限。
+    """
+    fmt, compression = export_format(path, fmt)
+    n = 0
+    with open_output(path, compression) as f:
+        if fmt == "jsonl":
+            dumps = _json_dumps()
+            for rows in _chunks([(conn, sql, params), *extra_sources], chunk_size, limit):
+                f.write("".join(dumps(dict(zip(EXPORT_COLUMNS, r))) + "\n" for r in rows))
+                n += len(rows)
+        else:
+            w = csv.writer(f)
+            w.writerow(EXPORT_COLUMNS)
+            for rows in _chunks([(conn, sql, params), *extra_sources], chunk_size, limit):
+                w.writerows(rows)
+                n += len(rows)
+    print(f"✅ 已导出 {n} 行 {fmt}{'.' + compression if compression else ''} -> {path}")
+    return n
+
+# ---------- 汇总（只读 rollup_* 表，不扫 jobs） ----------
+def _filter(column, pattern, where, params):
+    if pattern != "%":
+        where.append(_match_clause(column, pattern))
+        params.append(pattern)
+
+
+def _money(value):
+    return "-" if value is None else f"{value:,.0f}"
+
+
+def summary(conn: sqlite3.Connection, since_days: int = 30, category_like: str = "%", keyword_like: str = "%",
+            top: int = 10, days: int = 7):
+    """分类按天精确到日；关键词和公司按月汇总，窗口从起始日所在月的 1 号算起。"""
+    t0 = time.perf_counter()
+    today = datetime.now(SGT).date()
+    start_day = (today - timedelta(days=max(1, since_days) - 1)).isoformat()
+    start_month = start_day[:7]
+
+    # 1) 各分类每天岗位数
+    where, params = ["day >= ?"], [start_day]
+    _filter("category", category_like, where, params)
+    by_category = {}
+    for category, day, n in conn.execute(
+        f"SELECT category, day, jobs FROM rollup_category_day WHERE {' AND '.join(where)}", params
+    ):
+        by_category.setdefault(category or "（无分类）", {})[day] = n
+    columns = [(today - timedelta(days=i)).isoformat() for i in range(min(days, since_days) - 1, -1, -1)]
+    ranked = sorted(by_category.items(), key=lambda kv: -sum(kv[1].values()))[:top]
+
+    # 2) 各关键词薪资范围
+    where, params = ["month >= ?"], [start_month]
+    _filter("search_query", keyword_like, where, params)
+    keywords = conn.execute(
+        f"""SELECT search_query, SUM(jobs), SUM(salary_jobs), MIN(salary_min),
+                   SUM(salary_min_sum) / NULLIF(SUM(salary_min_jobs), 0),
+                   SUM(salary_max_sum) / NULLIF(SUM(salary_max_jobs), 0), MAX(salary_max)
+            FROM rollup_keyword_month WHERE {' AND '.join(where)}
+            GROUP BY search_query ORDER BY 2 DESC LIMIT ?""",
+        params + [top],
+    ).fetchall()
+
+    # 3) 招聘最多的公司
+    companies = conn.execute(
+        """SELECT company, SUM(jobs) FROM rollup_company_month WHERE month >= ? AND company != ''
+           GROUP BY company ORDER BY 2 DESC LIMIT ?""",
+        (start_month, top),
+    ).fetchall()
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    print(f"== 各分类岗位数（最近 {since_days} 天，按发布日期）==")
+    print(f"{'category':32s} {'total':>7s} " + " ".join(f"{d[5:]:>6s}" for d in columns))
+    for category, per_day in ranked:
+        print(f"{shorten(category, width=32, placeholder='…'):32s} {sum(per_day.values()):7d} "
+              + " ".join(f"{per_day.get(d, 0):6d}" for d in columns))
+    print(f"\n== 各关键词薪资（{start_month} 起；下限 / 上限的均值，最低下限 / 最高上限）==")
+    print(f"{'keyword':28s} {'jobs':>6s} {'w/ pay':>6s} {'min':>8s} {'avg low':>8s} {'avg high':>8s} {'max':>8s}")
+    for query, n, n_salary, low, avg_low, avg_high, high in keywords:
+        print(f"{shorten(query or '（无）', width=28, placeholder='…'):28s} {n:6d} {n_salary:6d} "
+              f"{_money(low):>8s} {_money(avg_low):>8s} {_money(avg_high):>8s} {_money(high):>8s}")
+    print(f"\n== 招聘最多的公司（{start_month} 起）==")
+    for company, n in companies:
+        print(f"{n:6d}  {company}")
+    print(f"\n（汇总表查询 {elapsed:.1f} ms）")
+
+
+def open_archive(db_path: str, archive_dir: str = None, migrate: bool = False):
+    """[(month, conn)]：解压（或复用缓存的）归档分区，月份新的在前；和主库一样默认只读打开。"""
+    parts = archive.extract(archive_dir or archive.default_dir(db_path))
+    return [(month, open_db(path, migrate=migrate)) for month, path in parts]
 
 def main():
     args = parse_args()
-    conn = open_db(args.db)
+    conn = open_db(args.db, migrate=args.migrate, writable=args.command == "summary" and args.rebuild)
+    if args.command == "summary":
+        try:
+            if args.rebuild:
+                mycf_db.rebuild_rollups(conn)
+            summary(conn, args.since_days if args.since_days is not None else 30, args.category, args.keyword,
+                    args.top, args.days)
+        finally:
+            conn.close()
+        return
+    parts = []
     try:
-        rows = query_jobs(conn, args.category, args.keyword, args.posted_prefix, args.limit)
+        if args.include_archive:
+            if args.after is not None:
+                raise SystemExit("--after 只能翻主库，不能和 --include_archive 一起用")
+            parts = open_archive(args.db, args.archive_dir, migrate=args.migrate)
+        filters = (args.category, args.keyword, args.posted_prefix)
+        rows = query_jobs(conn, *filters, args.limit, args.since_days, args.search, args.after)
+        # 归档分区按月份从新到旧补足；分区里都是主库保留期之前的岗位，不用再合并排序
+        for _, part in parts:
+            if len(rows) >= args.limit:
+                break
+            rows += query_jobs(part, *filters, args.limit - len(rows), args.since_days, args.search)
         print_table(rows)
-        if args.export_csv:
-            export_csv(rows, args.export_csv)
+        if len(rows) == args.limit and not parts:
+            print(f"（下一页：--after {rows[-1]['rowid']}）")
+        export_path = args.export or args.export_csv
+        if export_path:
+            sql, params = build_query(conn, *filters, None, args.since_days, args.search, args.after)
+            extra = [(part, *build_query(part, *filters, None, args.since_days, args.search)) for _, part in parts]
+            export_rows(conn, sql, params, export_path, "csv" if args.export_csv else args.format,
+                        chunk_size=args.chunk_size, extra_sources=extra, limit=args.export_limit)
     finally:
+        for _, part in parts:
+            part.close()
         conn.close()
 
 if __name__ == "__main__":
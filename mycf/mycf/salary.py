@@ -0,0 +1,41 @@
+# mycf/salary.py
+"""
+salary 文本 → (下限, 上限, 币种)。
+API 路径拼出来的是 "5000-8000 SGD" / "5000 SGD" / "-8000 SGD"；
+DOM 路径可能是 "$5,000 - $8,000"、"5k-8k"、"SGD 5,000 to 8,000 Monthly"。
+"""
+import re
+
+_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kK])?")
+_CURRENCY = re.compile(r"\b([A-Z]{3})\b")
+_RANGE_SEP = re.compile(r"\s*(?:-|–|—|\bto\b)\s*")
+
+
+def _to_number(digits, k):
+    value = float(digits.replace(",", ""))
+    return value * 1000 if k else value
+
+
+def parse_salary(text):
+    """解析不了的部分为 None；只有一个数时上下限相同（"-8000" 这种只有上限）。"""
+    if not text:
+        return None, None, None
+    s = str(text).strip()
+    m = _CURRENCY.search(s)
+    currency = m.group(1) if m else ("SGD" if "$" in s else None)
+
+    parts = _RANGE_SEP.split(s, maxsplit=1)
+    if len(parts) == 2:
+        low = _NUMBER.search(parts[0])
+        high = _NUMBER.search(parts[1])
+        low = _to_number(*low.groups()) if low else None
+        high = _to_number(*high.groups()) if high else None
+        if low is not None and high is not None and low > high:
+            low, high = high, low
+        return low, high, currency
+
+    m = _NUMBER.search(s)
+    if not m:
+        return None, None, currency
+    value = _to_number(*m.groups())
+    return value, value, currency
@@ -17,23 +17,98 @@ DEFAULT_REQUEST_HEADERS = {
     "Referer": "https://www.mycareersfuture.gov.sg/",
 }
 
-# 礼貌抓取
-CONCURRENT_REQUESTS = 4
-DOWNLOAD_DELAY = 0.8
-AUTOTHROTTLE_ENABLED = True
-AUTOTHROTTLE_START_DELAY = 1.5
-AUTOTHROTTLE_MAX_DELAY = 10.0
-AUTOTHROTTLE_TARGET_CONCURRENCY = 1.2
+# 礼貌抓取：以下是起点，运行中由 AdaptiveConcurrencyMiddleware 按响应反馈调整（见下方 MYCF_THROTTLE_*）
+CONCURRENT_REQUESTS = 16                # 全局上限
+CONCURRENT_REQUESTS_PER_DOMAIN = 2      # 每个下载槽的起始并发
+DOWNLOAD_DELAY = 0.8                    # 每个下载槽的起始间隔（秒）
+AUTOTHROTTLE_ENABLED = False            # 与自适应控制器二选一；开启时控制器自动停用
+RETRY_TIMES = 4                         # 429 / 5xx 重试次数（重试会等到 Retry-After 之后）
+
+# —— 自适应并发：正常时逐步提速，429/503/5xx/超时时快速退避，遵守 Retry-After ——
+MYCF_THROTTLE_ENABLED = True
+MYCF_THROTTLE_MAX_CONCURRENCY = 8       # 每个下载槽的并发上限（DOWNLOAD_SLOTS 里配置过的槽以其配置为上限）
+MYCF_THROTTLE_MIN_DELAY = 0.1           # 间隔下限（秒）
+MYCF_THROTTLE_MAX_DELAY = 60.0          # 间隔 / Retry-After 上限（秒）
+MYCF_THROTTLE_TARGET_LATENCY = 2.0      # 响应延迟 EWMA 目标（秒）；超过 2 倍时减并发
+MYCF_THROTTLE_WINDOW = 10               # 连续多少个正常响应后提速一档
 
 FEED_EXPORT_ENCODING = "utf-8"
 
+MYCF_API_BASE = None             # 覆盖搜索 API 地址（本地桩服务 / 基准测试用），None = 官方地址
+MYCF_SEARCH_BASE = None          # 覆盖 DOM 兜底的搜索页地址（本地静态页 / 基准测试用），None = 官方地址
+
+# —— API 路线协商：POST/GET × 页码起点 0/1 只探测一次，结果缓存到文件 ——
+MYCF_ROUTE_CACHE = "mycf_route.json"
+MYCF_ROUTE_TTL = 6 * 3600        # 秒；过期后下次运行重新探测
+MYCF_ROUTE_MAX_FAILURES = 3      # 选定路线连续几次空/非 JSON 响应后重新探测
+MYCF_PAGE_LOOKAHEAD = 2          # 响应带 total 时，一次最多预排几页
+
+# —— 增量抓取：每个关键词在库里记高水位，翻到连续若干个已见过的岗位就停 ——
+MYCF_INCREMENTAL = True          # 也可用 -a incremental=0 临时关闭
+MYCF_KNOWN_RUN = 10              # 连续多少个已知岗位后停止翻页
+MYCF_WATERMARK_URLS = 200        # 每个关键词保留最近多少个 job_url
+
+# —— 断点续抓：完成的（关键词, 页）记在 crawl_progress 表，随去重库的批次一起提交 ——
+MYCF_RESUME = False              # 也可用 -a resume=1 临时开启；正常跑完会清空进度
+
+# —— 关键词计划：按历史产出与关键词间重叠排序、分配页数（mycf/planner.py；预览 / 报告也用它）——
+MYCF_PLAN = False                # 也可用 -a plan=1 临时开启；计划与实际结果记在 keyword_plan 表
+MYCF_PLAN_BUDGET = None          # 总页数预算，None = 不限（每个关键词最多 max_pages）
+MYCF_PLAN_MIN_YIELD = 1.0        # 每页预计新增岗位低于此值的关键词只抓 1 页
+MYCF_PLAN_LOOKBACK_DAYS = 30     # 估计发布速率用最近多少天的历史
+
+# —— 详情补全：只对新增 / 摘要有变化的岗位抓详情，写入 job_details 侧表 ——
+MYCF_DETAILS = False             # 也可用 -a details=1 临时开启
+MYCF_DETAIL_API_BASE = None      # 覆盖详情 API 地址（本地桩服务 / 基准测试用），None = 官方地址
+DOWNLOAD_SLOTS = {
+    "mycf-details": {"concurrency": 2, "delay": 1.0, "randomize_delay": True},  # 详情请求单独限流
+}
+
+# —— 录制 / 回放：record 把响应存成压缩段文件，replay 离线回放（开发调试、基准测试）——
+DOWNLOADER_MIDDLEWARES = {
+    "mycf.middlewares.AdaptiveConcurrencyMiddleware": 560,   # 在 RetryMiddleware(550) 之前看到响应
+    "mycf.middlewares.SharedRateLimitMiddleware": 565,       # 仅分片启动器下生效（共享速率预算）
+    "mycf.middlewares.MycfDownloaderMiddleware": 950,
+}
+MYCF_REPLAY_MODE = os.getenv("MYCF_REPLAY_MODE", "off")   # off / record / replay
+MYCF_REPLAY_DIR = "replay"
+MYCF_REPLAY_PASSTHROUGH = False  # 回放未命中时：False = 丢弃请求，True = 照常联网
+
+# —— 运行指标：按关键词 / 路线计数、延迟与响应大小直方图、丢弃原因、管道耗时，结束时写出 ——
+EXTENSIONS = {
+    "mycf.metrics.CrawlMetrics": 500,
+}
+MYCF_METRICS_ENABLED = True
+MYCF_METRICS_JSON = "metrics/mycf_metrics.json"
+MYCF_METRICS_PROM = "metrics/mycf_metrics.prom"   # 给 node_exporter textfile collector；None = 不写
+
 # —— 去重 + 分文件导出（默认按关键词）——
 ITEM_PIPELINES = {
+    "mycf.pipelines.NearDuplicatePipeline": 290,   # 换 URL 重发的岗位：标记簇号（MYCF_NEARDUP_DROP=True 时丢弃）
     "mycf.pipelines.DedupePipeline": 300,
+    "mycf.pipelines.DetailPipeline": 310,          # 只处理 JobDetailItem（-a details=1 时才会有）
     "mycf.pipelines.SplitExportPipeline": 500,
+    "mycf.pipelines.ColumnarExportPipeline": 510,   # MYCF_COLUMNAR_EXPORT=False 时不加载
 }
 MYCF_OUTPUT_DIR = "output"
 MYCF_SPLIT_MODE = "keyword"   # ★ 关键：按关键词分文件
+MYCF_EXPORT_MAX_OPEN_FILES = 64       # 分文件导出时最多同时打开的文件数（超出按最久未写关闭）
+MYCF_EXPORT_BATCH_SIZE = 200          # 每个分组攒够多少行交给后台写线程
+MYCF_EXPORT_FLUSH_INTERVAL = 2.0      # 秒；不足一批时也定时写出（0 = 只按条数和结束时写）
+MYCF_COLUMNAR_EXPORT = False          # True = 另写 output/parquet/date=…/keyword=…/part-*.parquet
+MYCF_COLUMNAR_FORMAT = "auto"         # auto / parquet / csv（没装 pyarrow 时总是 csv）
+MYCF_COLUMNAR_BATCH_SIZE = 5000       # 每个 row group 的行数
+MYCF_COLUMNAR_FLUSH_INTERVAL = 30.0   # 秒；不足一批时也定时写出一个 row group
+MYCF_COLUMNAR_COMPRESSION = "zstd"
+MYCF_SQLITE_PATH = "mycf_jobs.sqlite"
+MYCF_SEED_SQLITE_PATH = None         # 分片运行时由启动器设为主库：只读，判重/增量时一并查
+MYCF_DEDUPE_BATCH_SIZE = 500         # 攒够多少条新记录批量写入一次
+MYCF_DEDUPE_FLUSH_INTERVAL = 5.0     # 秒；不足一批时也定时刷盘（0 = 只按条数和结束时刷）
+MYCF_BACKGROUND_WRITES = True        # 去重库 / 导出文件的写入放到后台线程（False = 在 reactor 线程同步写）
+MYCF_WRITER_QUEUE_SIZE = 16          # 每个写线程最多排队多少批；满了就暂停往管道送 item
+MYCF_NEARDUP_ENABLED = True          # 近似重复：title/company/location 的 SimHash 分簇，簇号记在 jobs.cluster_id
+MYCF_NEARDUP_DISTANCE = 3            # 汉明距离不超过几位算同一岗位（0–3；0 = 归一化后完全相同）
+MYCF_NEARDUP_DROP = False            # True = 丢弃近似重复，不入库也不导出
 
 # 只有你要用 DOM 兜底时才开启（设置环境变量 USE_PLAYWRIGHT=1，并安装 playwright）
 USE_PLAYWRIGHT = os.getenv("USE_PLAYWRIGHT", "0").lower() in ("1", "true", "yes")
@@ -45,3 +120,42 @@ if USE_PLAYWRIGHT:
     TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
     PLAYWRIGHT_BROWSER_TYPE = "chromium"
     PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT = 60_000
+
+    # 固定的上下文池：启动时建好，爬虫轮流分配（见 mycf/browser.py），不再按请求新建
+    from mycf import browser
+
+    MYCF_BROWSER_CONTEXTS = 2
+    PLAYWRIGHT_CONTEXTS = browser.contexts(MYCF_BROWSER_CONTEXTS)
+    PLAYWRIGHT_MAX_CONTEXTS = MYCF_BROWSER_CONTEXTS
+    PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = 2   # 每个上下文同时打开的页数上限
+    PLAYWRIGHT_ABORT_REQUEST = "mycf.browser.should_abort_request"  # 不加载图片 / 字体 / 统计脚本
+
+# —— 纯 API 的精简启动配置（MYCF_PROFILE=api）：定时的短任务用，少加载用不到的扩展和中间件 ——
+# 不影响输出：去重 / 导出管道照常；-o 导出（FeedExporter）、Cookies、Telnet 控制台在此配置下不可用
+MYCF_PROFILE = os.getenv("MYCF_PROFILE", "full").lower()   # full / api
+if MYCF_PROFILE == "api":
+    TELNETCONSOLE_ENABLED = False
+    COOKIES_ENABLED = False
+    EXTENSIONS.update({
+        "scrapy.extensions.telnet.TelnetConsole": None,
+        "scrapy.extensions.memusage.MemoryUsage": None,
+        "scrapy.extensions.memdebug.MemoryDebugger": None,
+        "scrapy.extensions.feedexport.FeedExporter": None,
+        "scrapy.extensions.spiderstate.SpiderState": None,
+        "scrapy.extensions.throttle.AutoThrottle": None,
+    })
+    DOWNLOADER_MIDDLEWARES.update({
+        "scrapy.downloadermiddlewares.robotstxt.RobotsTxtMiddleware": None,
+        "scrapy.downloadermiddlewares.httpauth.HttpAuthMiddleware": None,
+        "scrapy.downloadermiddlewares.ajaxcrawl.AjaxCrawlMiddleware": None,
+        "scrapy.downloadermiddlewares.redirect.MetaRefreshMiddleware": None,
+        "scrapy.downloadermiddlewares.cookies.CookiesMiddleware": None,
+        "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    })
+    if MYCF_REPLAY_MODE == "off":
+        DOWNLOADER_MIDDLEWARES.pop("mycf.middlewares.MycfDownloaderMiddleware", None)
+    SPIDER_MIDDLEWARES = {
+        "scrapy.spidermiddlewares.referer.RefererMiddleware": None,   # referer 由爬虫显式设置
+        "scrapy.spidermiddlewares.urllength.UrlLengthMiddleware": None,
+        "scrapy.spidermiddlewares.depth.DepthMiddleware": None,
+    }
@@ -1,15 +1,24 @@
 # mycf/spiders/mycf_jobs.py
 # -*- coding: utf-8 -*-
+import itertools
+import json
+import math
 import os
-import re
+import time
 import urllib.parse as ul
-from datetime import datetime, timedelta, timezone
+from collections import Counter
+from datetime import datetime
 
 import scrapy
+from scrapy import signals
 from scrapy.http import JsonRequest
-from scrapy_playwright.page import PageMethod  # 仅在 DOM 兜底时用
 
-from mycf.items import JobSummaryItem
+from mycf import browser, db, metrics, planner
+from mycf.dates import SGT, PostedNormalizer
+from mycf.decoding import DecodeError, ResponseDecoder
+from mycf.details import DETAIL_SLOT, job_uuid, parse_detail, summary_hash
+from mycf.items import JobDetailItem, JobSummaryItem
+from mycf.pipelines import find_dedupe
 
 
 class MyCareersFutureSpider(scrapy.Spider):
@@ -20,22 +29,26 @@ class MyCareersFutureSpider(scrapy.Spider):
 
       # 也可单关键词调试
       # python -m scrapy crawl mycf_jobs -a q=quant -a within_days=7 -a max_pages=2
+
+      # 顺带补全新增/变更岗位的详情（写入 job_details 侧表）
+      # python -m scrapy crawl mycf_jobs -a keywords_file=keywords.txt -a details=1
+
+      # 上次运行被中断：只补抓没完成的（关键词, 页）
+      # python -m scrapy crawl mycf_jobs -a keywords_file=keywords.txt -a resume=1
+
+      # 按历史产出给关键词排序、分配页数（预计 vs 实际：python mycf/planner.py --report）
+      # python -m scrapy crawl mycf_jobs -a keywords_file=keywords.txt -a max_pages=5 -a plan=1
     """
     name = "mycf_jobs"
     allowed_domains = ["mycareersfuture.gov.sg", "api.mycareersfuture.gov.sg"]
 
-    custom_settings = {
-        "PLAYWRIGHT_INCLUDE_PAGE": True,  # 仅 DOM 兜底调试用
-        "CONCURRENT_REQUESTS": 4,
-        "DOWNLOAD_DELAY": 0.8,
-        "AUTOTHROTTLE_ENABLED": True,
-        "AUTOTHROTTLE_START_DELAY": 1.5,
-        "AUTOTHROTTLE_MAX_DELAY": 10.0,
-        "AUTOTHROTTLE_TARGET_CONCURRENCY": 1.2,
-        "FEED_EXPORT_ENCODING": "utf-8",
-    }
+    # 并发与限速统一在 settings.py（AdaptiveConcurrencyMiddleware），这里不再重复
 
     API_BASE = "https://api.mycareersfuture.gov.sg/v2/search"
+    # 路线 = (HTTP 方法, 页码起点)；探测时按此顺序尝试
+    API_ROUTES = (("POST", 0), ("GET", 0), ("POST", 1), ("GET", 1))
+    DETAIL_API = "https://api.mycareersfuture.gov.sg/v2/jobs"
+    SEARCH_BASE = "https://www.mycareersfuture.gov.sg/search"
 
     def __init__(
         self,
@@ -45,6 +58,10 @@ class MyCareersFutureSpider(scrapy.Spider):
         max_pages=3,
         use_api_only="True",
         per_page=20,
+        incremental=None,
+        details=None,
+        resume=None,
+        plan=None,
         *args,
         **kwargs,
     ):
@@ -69,16 +86,87 @@ class MyCareersFutureSpider(scrapy.Spider):
         self.max_pages = int(max_pages or 3)
         self.use_api_only = str(use_api_only).lower() in ("1", "true", "yes", "y")
         self.per_page = int(per_page or 20)
+        self.incremental_arg = incremental  # None = 用 MYCF_INCREMENTAL 设置
+        self.details_arg = details          # None = 用 MYCF_DETAILS 设置
+        self.resume_arg = resume            # None = 用 MYCF_RESUME 设置
+        self.plan_arg = plan                # None = 用 MYCF_PLAN 设置
 
+        self.api_base = self.API_BASE    # 可用 MYCF_API_BASE 覆盖（本地桩服务 / 基准测试）
+        self.search_base = self.SEARCH_BASE  # 可用 MYCF_SEARCH_BASE 覆盖
         self.sortBy = "new_posting_date"
-        self.tz = timezone(timedelta(hours=8))  # 新加坡/UTC+8
+        self.tz = SGT  # 新加坡/UTC+8
         self.now = datetime.now(self.tz)
+        self.dates = PostedNormalizer(now=self.now, tz=self.tz)
+        self.cutoff_ts = self.dates.now_ts - self.within_days * 86400
+
+        # --- API 路线协商状态 ---
+        self.route = None                # 选定的 (method, page_base)
+        self._probe_pending = []         # 等路线确定后再调度的关键词
+        self._probe_outstanding = set()  # 本轮探测中尚未返回的路线
+        self._probe_held = None          # 先返回结果的 1 起点探测页，等 0 起点路线有结论再用
+        self._route_retry = []           # [(关键词, 页偏移)]：失败的页，路线可用时按选定路线重抓
+        self._page_failures = Counter()  # (关键词, 页偏移) -> 失败次数，超过 MYCF_ROUTE_MAX_FAILURES 就放弃
+        self._route_failures = 0
+
+        self.decoder = ResponseDecoder()  # 按路线记住响应结构
+
+        # --- 自适应翻页状态（页码均为相对页码起点的偏移）---
+        self._next_page = {}             # query -> 下一个尚未调度的页
+        self._exhausted = set()          # 已确定不用再翻页的关键词
+
+        # --- 增量抓取：关键词高水位 ---
+        self.incremental = False
+        self.db = None
+        self._seeded = False
+        self._dedupe = None              # 启用的 DedupePipeline（判重哈希集合在它那里）
+        self._known_hashes = set()       # 没启用 DedupePipeline 时自己读一份
+        self._watermarks = {}            # query -> (newest_posted, set(recent_urls))，来自上次运行
+        self._seen_marks = {}            # query -> [newest_posted, [job_url, ...], newest_ts]，本次运行
+        self.watermark_urls = 200        # 每个关键词记录多少个 job_url（from_crawler 里按设置覆盖）
+
+        # --- 详情补全：只抓新增或摘要有变化的岗位 ---
+        self.details = False
+        self.detail_api = self.DETAIL_API
+        self._details_requested = set()  # 本次已判断过的 job_url（同一岗位可能出现在多个关键词下）
+        self._detail_hashes = {}         # job_url 哈希 -> 上次抓详情时的摘要哈希，open 时一次性读入
+
+        # --- 断点续抓：单元 = (关键词, 页偏移)，进度随 DedupePipeline 的批次落库 ---
+        self.resume = False
+        self._done_pages = {}            # query -> {页偏移}，上次中断时已完成的页
+        self._finished = set()           # 上次已全部抓完的关键词
+        self._in_flight = {}             # query -> 已调度、尚未处理完的页数（不含探测请求）
+        self._progress = []              # 待写入的 (query, 页偏移, 路线, item 数)
+        self._outstanding = Counter()    # (query, 页偏移) -> 已产出、还没走完管道的 item 数
+        self._item_units = {}            # id(item) -> (query, 页偏移)
+
+        # --- 关键词计划：按历史产出排序、分配页数（见 mycf/planner.py）---
+        self.plan = False
+        self.run_id = self.now.isoformat(timespec="seconds")
+        self._page_budget = {}           # query -> 页数上限；不在其中的用 max_pages
+        self._priority = {}              # query -> 搜索请求优先级（排得越前越高）
+        self._pages_parsed = Counter()   # query -> 本次解析的页数
+        self._plan_rowid = 0             # 计划时 jobs 的最大 rowid；之后插入的算本次新增
+
+        # --- DOM 兜底：浏览器上下文轮流分配（池在 settings.PLAYWRIGHT_CONTEXTS 里定义）---
+        self._browser_contexts = []
+        self._next_context = itertools.count()
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.api_base = crawler.settings.get("MYCF_API_BASE") or cls.API_BASE
+        spider.search_base = crawler.settings.get("MYCF_SEARCH_BASE") or cls.SEARCH_BASE
+        spider._browser_contexts = sorted(crawler.settings.getdict("PLAYWRIGHT_CONTEXTS"))
+        spider.watermark_urls = crawler.settings.getint("MYCF_WATERMARK_URLS", 200)
+        spider.detail_api = (crawler.settings.get("MYCF_DETAIL_API_BASE") or cls.DETAIL_API).rstrip("/")
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(spider._item_settled, signal=signal)
+        return spider
 
     # ----------------- 工具 -----------------
     def _build_search_url(self, query: str, page: int) -> str:
-        base = "https://www.mycareersfuture.gov.sg/search"
         params = {"search": query, "sortBy": self.sortBy, "page": page}
-        return f"{base}?{ul.urlencode(params)}"
+        return f"{self.search_base}?{ul.urlencode(params)}"
 
     def _build_api_payload(self, query: str, page_index: int):
         return {
@@ -89,8 +177,9 @@ class MyCareersFutureSpider(scrapy.Spider):
             "limit": self.per_page,
         }
 
-    def _api_request(self, query: str, page_index: int, source_url: str, method: str = "POST"):
-        """支持 POST/GET，两种页码起点（0/1），配合 dont_filter=True 允许重复尝试。"""
+    def _api_request(self, query: str, page_index: int, source_url: str, method: str = "POST",
+                     page_base: int = 0, probe: bool = False):
+        """支持 POST/GET，两种页码起点（0/1）；路线记在 meta 里，供解析时判断成败。"""
         params = {
             "limit": self.per_page,
             "page": page_index,
@@ -108,97 +197,590 @@ class MyCareersFutureSpider(scrapy.Spider):
             "x-requested-with": "XMLHttpRequest",
         }
 
+        meta = {"mycf_route": (method.upper(), page_base), "mycf_probe": probe}
+        if not probe:
+            self._in_flight[query] = self._in_flight.get(query, 0) + 1
+
         if method.upper() == "GET":
             return scrapy.Request(
-                url=f"{self.API_BASE}?{ul.urlencode(params)}",
+                url=f"{self.api_base}?{ul.urlencode(params)}",
                 method="GET",
                 headers=headers,
+                meta=meta,
                 cb_kwargs={"query": query, "page_index": page_index, "source_url": source_url},
                 callback=self.parse_api_json,
+                errback=self._api_failed,
+                priority=self._priority.get(query, 0),
                 dont_filter=True,
             )
         else:
             return JsonRequest(
-                url=self.API_BASE,
+                url=self.api_base,
                 method="POST",
                 data=payload,
                 headers=headers,
+                meta=meta,
                 cb_kwargs={"query": query, "page_index": page_index, "source_url": source_url},
                 callback=self.parse_api_json,
+                errback=self._api_failed,
+                priority=self._priority.get(query, 0),
                 dont_filter=True,
             )
 
+    def _api_failed(self, failure):
+        """
+        API 请求没拿到响应（HTTP 错误、超时、被中间件丢弃）：和非 JSON 响应走同一条路——
+        探测中则淘汰该路线，已选定路线则计一次失败；普通页还要释放在途计数（不记完成），
+        否则这个关键词永远等不到 QUERY_DONE。
+        """
+        request = failure.request
+        query = request.cb_kwargs["query"]
+        page_index = request.cb_kwargs["page_index"]
+        route = request.meta.get("mycf_route")
+        probe = request.meta.get("mycf_probe", False)
+        self.logger.warning(f"API request failed: {request.method} {request.url} ({failure.value!r})")
+        self._page_metrics(query, route, outcome="error")
+        yield from self._route_failed(query, page_index, route, probe, empty=False)
+        if not probe:
+            self._checkpoint(query, route, page_index - route[1], done=False)
+
     def _posted_within_days(self, iso_or_text: str) -> bool:
-        """过滤最近 N 天（ISO + 相对时间）。解析失败默认保留。"""
-        if not iso_or_text:
-            return True
-        s = iso_or_text.strip().lower()
-        # ISO
-        m = re.match(r"(\d{4}-\d{2}-\d{2})", s)
-        if m:
-            from datetime import datetime as dt
-            try:
-                d = dt.fromisoformat(s.replace("Z", "+00:00"))
-            except Exception:
-                d = dt.strptime(m.group(1), "%Y-%m-%d").replace(tzinfo=self.tz)
-            return (self.now - d) <= timedelta(days=self.within_days)
-        # 相对时间
-        if "day" in s:
-            m2 = re.search(r"(\d+)\s*day", s)
-            if m2:
-                return int(m2.group(1)) <= self.within_days
-            if "yesterday" in s:
-                return self.within_days >= 1
-        if "hour" in s or "minute" in s:
-            return True
-        return True
+        """过滤最近 N 天（ISO + 相对时间，见 mycf.dates）。解析失败默认保留。"""
+        ts = self.dates.to_epoch(iso_or_text)
+        return ts is None or ts >= self.cutoff_ts
 
     def _to_abs_url(self, response, path_or_url):
         if not path_or_url:
             return None
         return response.urljoin(path_or_url)
 
-    # ----------------- 入口 -----------------
-    def start_requests(self):
-        for query in self.queries:
-            if self.use_api_only:
+    # ----------------- API 路线协商 -----------------
+    def _load_route(self):
+        """读取缓存的路线；不存在、损坏或过期时返回 None。"""
+        path = self.settings.get("MYCF_ROUTE_CACHE")
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            route = (cached["method"], int(cached["page_base"]))
+            expires_at = float(cached["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_at < time.time() or route not in self.API_ROUTES:
+            return None
+        return route
+
+    def _save_route(self, route):
+        path = self.settings.get("MYCF_ROUTE_CACHE")
+        if not path:
+            return
+        ttl = self.settings.getfloat("MYCF_ROUTE_TTL", 6 * 3600)
+        method, page_base = route
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"method": method, "page_base": page_base, "expires_at": time.time() + ttl}, f)
+        except OSError as e:
+            self.logger.warning(f"Cannot save API route cache {path}: {e}")
+
+    def _forget_route(self):
+        self.route = None
+        path = self.settings.get("MYCF_ROUTE_CACHE")
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _probe_routes(self, queries):
+        """
+        用同一关键词的首页把 API_ROUTES 各试一次；第一个返回结果的路线胜出，但 0 起点优先：
+        0 起点的 API 对 page=1 也有结果（第二页），1 起点的路线要等 0 起点的探测都失败后才算数。
+        """
+        for q in queries:
+            if q not in self._probe_pending:
+                self._probe_pending.append(q)
+        if self._probe_outstanding or not self._probe_pending:
+            return  # 已有一轮探测在进行，结束后会一并调度
+
+        query = self._probe_pending.pop(0)
+        referer = self._build_search_url(query, page=0)
+        self._probe_outstanding = set(self.API_ROUTES)
+        self.logger.info(f"Probing API routes with query={query!r}")
+        for method, page_base in self.API_ROUTES:
+            yield self._api_request(query, page_base, referer, method=method, page_base=page_base, probe=True)
+
+    def _probing_base0(self):
+        return any(page_base == 0 for _, page_base in self._probe_outstanding)
+
+    def _settle_route(self, route, query):
+        """探测成功：记住路线，调度所有排队的关键词；探测关键词的翻页交给 parse_api_json。"""
+        self.route = route
+        self._probe_outstanding = set()
+        self._probe_held = None
+        self._route_failures = 0
+        self._save_route(route)
+        self.logger.info(f"API route settled: method={route[0]} page_base={route[1]}")
+
+        pending, self._probe_pending = self._probe_pending, []
+        self._next_page[query] = 1
+        self._exhausted.discard(query)
+        if self.resume:
+            # 探测用的首页已在解析中，其余没完成的页照常补上
+            yield from self._resume_requests(query, self._resume_pages(query), skip_first=True)
+        for q in pending:
+            yield from self._schedule_query(q)
+        yield from self._retry_pages()
+
+    def _queue_retry(self, query, page):
+        """记下失败的页（page 为相对页码起点的偏移），同一页最多重抓 MYCF_ROUTE_MAX_FAILURES 次。"""
+        unit = (query, page)
+        if unit in self._route_retry:
+            return
+        self._page_failures[unit] += 1
+        if self._page_failures[unit] > self.settings.getint("MYCF_ROUTE_MAX_FAILURES", 3):
+            self.logger.error(f"Giving up page {page} of {query!r} after {self._page_failures[unit] - 1} retries")
+            self.crawler.stats.inc_value("mycf/route/pages_given_up")
+            return
+        self._route_retry.append(unit)
+
+    def _retry_pages(self):
+        """按选定路线重抓失败过的页：首页失败的关键词从头调度，翻页中途失败的页单独补上（成功后照常往后翻）。"""
+        retry, self._route_retry = self._route_retry, []
+        method, page_base = self.route
+        for query, page in retry:
+            if page == 0:
+                yield from self._schedule_query(query)
+            else:
                 referer = self._build_search_url(query, page=0)
-                for page_index in range(0, self.max_pages):
-                    # 多路线兜底：POST/GET × 页码 0/1
-                    yield self._api_request(query, page_index, referer, method="POST")
-                    yield self._api_request(query, page_index, referer, method="GET")
-                    yield self._api_request(query, page_index + 1, referer, method="POST")
-                    yield self._api_request(query, page_index + 1, referer, method="GET")
+                yield self._api_request(query, page_base + page, referer, method=method, page_base=page_base)
+        if retry:
+            self.crawler.stats.inc_value("mycf/route/pages_retried", len(retry))
+
+    def _route_failed(self, query, page_index, route, probe, empty):
+        """
+        空结果 / 非 JSON / 请求失败：探测中则淘汰该路线；普通页记下来，等路线可用时重抓；
+        已选定路线连续失败则重新探测。
+        """
+        if probe:
+            self._probe_outstanding.discard(route)
+            if self.route is not None:
+                return
+            if self._probe_held and not self._probing_base0():
+                held, self._probe_held = self._probe_held, None
+                yield from self.parse_api_json(*held)  # 0 起点都不行：先返回结果的 1 起点路线胜出
+                return
+            if self._probe_outstanding:
+                return
+            # 这个关键词在所有路线上都没结果：换排队中的下一个关键词继续探测，路线定下来后再补抓它
+            self.logger.warning(f"No API route returned results for query={query!r}")
+            self._queue_retry(query, 0)
+            yield from self._probe_routes([])
+            return
+
+        page = page_index - route[1]
+        if empty and page != 0:
+            self._exhausted.add(query)
+            return  # 非首页为空只是翻到底了
+        self._queue_retry(query, page)
+        if self.route is None or route != self.route:
+            return  # 旧路线的迟到响应：新路线定下来后重抓
+
+        self._route_failures += 1
+        max_failures = self.settings.getint("MYCF_ROUTE_MAX_FAILURES", 3)
+        if self._route_failures < max_failures:
+            return
+
+        self.logger.warning(f"API route {route} failed {self._route_failures} times in a row, re-probing")
+        # 首页失败的关键词拿去探测（定下来后从头调度），其余失败页留着等新路线补抓
+        firsts = [q for q, m in self._route_retry if m == 0] or [query]
+        self._route_retry = [(q, m) for q, m in self._route_retry if not (m == 0 and q in firsts)]
+        self._forget_route()
+        yield from self._probe_routes(firsts)
+
+    def _schedule_query(self, query):
+        """按已选定路线调度关键词首页；后续页由 _schedule_more 按需追加。"""
+        if self.resume and query in self._done_pages:
+            yield from self._resume_requests(query, self._resume_pages(query))
+            return
+        method, page_base = self.route
+        referer = self._build_search_url(query, page=0)
+        self._next_page[query] = 1
+        self._exhausted.discard(query)
+        yield self._api_request(query, page_base, referer, method=method, page_base=page_base)
+
+    def _schedule_more(self, query, page_index, source_url, route, total, n_results, n_stale, known_run=0):
+        """
+        决定是否继续翻页：
+          - 整页都早于 within_days（结果按发布时间倒序）→ 停止
+          - 增量模式下连续遇到 MYCF_KNOWN_RUN 个上次已见过的岗位 → 停止
+          - 有 total：算出最后一页，一次最多预排 MYCF_PAGE_LOOKAHEAD 页
+          - 没有 total：只有本页满页才排下一页
+        """
+        if query in self._exhausted:
+            return
+        if n_results and n_stale == n_results:
+            self.logger.debug(f"Page {page_index} of {query!r} is older than {self.within_days} days, stop paging")
+            self._exhausted.add(query)
+            return
+        if self.incremental and known_run >= min(self.settings.getint("MYCF_KNOWN_RUN", 10), self.per_page):
+            self.logger.debug(f"Reached {known_run} known jobs on page {page_index} of {query!r}, stop paging")
+            self._exhausted.add(query)
+            return
+
+        method, page_base = route
+        n = page_index - page_base
+        last = self._max_pages(query) - 1
+        if total is not None:
+            last = min(last, math.ceil(total / self.per_page) - 1)
+            lookahead = max(1, self.settings.getint("MYCF_PAGE_LOOKAHEAD", 2))
+        else:
+            if n_results < self.per_page:
+                last = n
+            lookahead = 1
+        if n >= last:
+            self._exhausted.add(query)
+            return
+
+        start = max(self._next_page.get(query, n + 1), n + 1)
+        stop = min(last, n + lookahead)
+        for m in range(start, stop + 1):
+            yield self._api_request(query, page_base + m, source_url, method=method, page_base=page_base)
+        self._next_page[query] = max(start, stop + 1)
+
+    # ----------------- 断点续抓 -----------------
+    def _resume_pages(self, query):
+        """
+        续抓要调度的页偏移：已完成页之间的空洞 + 最远已完成页的下一页（翻页前沿）。
+        空洞页的响应不再往后翻（_next_page 已越过它们），由前沿页按原规则继续。
+        """
+        done = self._done_pages.get(query)
+        if not done:
+            return [0]
+        frontier = max(done) + 1
+        max_pages = self._max_pages(query)
+        pages = [m for m in range(min(frontier, max_pages)) if m not in done]
+        if frontier < max_pages:
+            pages.append(frontier)
+        return pages
+
+    def _resume_requests(self, query, pages, skip_first=False):
+        method, page_base = self.route
+        referer = self._build_search_url(query, page=0)
+        done = self._done_pages.get(query, ())
+        self._next_page[query] = max([*pages, *done, 0]) + 1
+        self._exhausted.discard(query)
+        self.crawler.stats.inc_value("mycf/progress/pages_skipped", len(done))
+        for m in pages:
+            if not (skip_first and m == 0):
+                yield self._api_request(query, page_base + m, referer, method=method, page_base=page_base)
+        if not pages:
+            self._exhausted.add(query)
+            self._checkpoint(query, None, None)
+
+    def _checkpoint(self, query, route, page, n_items=0, done=True):
+        """
+        一页处理完（page 为相对页码起点的偏移，None 表示没有页要记）：done=False 表示失败，不记完成。
+        关键词已停止翻页且没有在途页时，再记一条 QUERY_DONE。
+        """
+        if page is not None:
+            self._in_flight[query] = max(0, self._in_flight.get(query, 0) - 1)
+            if done:
+                self._progress.append((query, page, metrics.route_name(route), n_items))
+        if query in self._exhausted and not self._in_flight.get(query) \
+                and not any(q == query for q, _ in self._route_retry):
+            self._progress.append((query, db.QUERY_DONE, None, None))
+
+    def _page_metrics(self, query, route, results=0, stale=0, outcome="ok"):
+        """每解析完一页通知 CrawlMetrics（按关键词 / 路线计数）。"""
+        self._pages_parsed[query] += 1
+        self.crawler.signals.send_catch_log(
+            metrics.page_parsed, query=query, route=metrics.route_name(route), results=results, stale=stale, outcome=outcome
+        )
+
+    def _track(self, item, query, page):
+        """记下 item 属于哪一页：这一页的进度要等它走完管道（进了去重缓冲区或被丢弃）才能提交。"""
+        self._outstanding[(query, page)] += 1
+        self._item_units[id(item)] = (query, page)
+        return item
+
+    def _item_settled(self, item, **kwargs):
+        unit = self._item_units.pop(id(item), None)
+        if unit is not None:
+            self._outstanding[unit] -= 1
+            if not self._outstanding[unit]:
+                del self._outstanding[unit]
+
+    def drain_progress(self):
+        """
+        取走可以提交的进度单元（DedupePipeline 刷盘时调用，与同批岗位同一事务提交）。
+        还有 item 在管道里（如在近似重复查找线程排队）的页先留着，关键词的 QUERY_DONE 也排在它后面：
+        进程被杀时，标记为完成的页，其岗位一定已落库。
+        """
+        ready, held, blocked = [], [], set()
+        for unit in self._progress:
+            query, page = unit[0], unit[1]
+            if self._outstanding.get((query, page)) or (page == db.QUERY_DONE and query in blocked):
+                held.append(unit)
+                blocked.add(query)
             else:
-                # 只有在 USE_PLAYWRIGHT=1 时可用（DOM 兜底）
-                url = self._build_search_url(query, page=0)
-                yield scrapy.Request(
-                    url,
-                    meta={
-                        "playwright": True,
-                        "page_index": 0,
-                        "query": query,
-                        "playwright_page_methods": [
-                            PageMethod("wait_for_load_state", "domcontentloaded"),
-                            PageMethod("wait_for_selector", "main, #__next, body", timeout=60000),
-                        ],
-                    },
-                    callback=self.parse_list,
-                )
+                ready.append(unit)
+        self._progress = held
+        return ready
+
+    # ----------------- 关键词计划 -----------------
+    def _max_pages(self, query):
+        return self._page_budget.get(query, self.max_pages)
+
+    def _plan_queries(self, queries):
+        """按历史产出排序、分配页数并记到 keyword_plan；返回按计划顺序的关键词（分不到页的去掉）。"""
+        settings = self.settings
+        history = planner.load_history(
+            self.db, queries, settings.getint("MYCF_PLAN_LOOKBACK_DAYS", 30), seed=self._seeded
+        )
+        budget = settings.get("MYCF_PLAN_BUDGET")
+        entries = planner.make_plan(
+            queries, history, self.max_pages, self.per_page, self.within_days,
+            budget=int(budget) if budget not in (None, "") else None,
+            min_yield=settings.getfloat("MYCF_PLAN_MIN_YIELD", 1.0),
+        )
+        planner.save_plan(self.db, self.run_id, entries)
+        self._plan_rowid = planner.max_rowid(self.db)
+        for entry in entries:
+            self._page_budget[entry.query] = entry.pages
+            self._priority[entry.query] = len(entries) - entry.rank
+        pages = sum(e.pages for e in entries)
+        self.crawler.stats.set_value("mycf/plan/pages", pages)
+        self.crawler.stats.set_value("mycf/plan/keywords_skipped", len(queries) - len(entries))
+        self.logger.info(
+            f"Keyword plan {self.run_id}: {len(entries)} of {len(queries)} keywords, {pages} pages "
+            f"(unplanned {len(queries) * self.max_pages}); report: python mycf/planner.py --report"
+        )
+        return [e.query for e in entries]
+
+    # ----------------- 增量抓取 -----------------
+    def _open_state(self):
+        """打开去重库读取关键词高水位；关闭时把本次看到的写回。"""
+        if self.incremental_arg is None:
+            self.incremental = self.settings.getbool("MYCF_INCREMENTAL", True)
+        else:
+            self.incremental = str(self.incremental_arg).lower() in ("1", "true", "yes", "y")
+        if self.details_arg is None:
+            self.details = self.settings.getbool("MYCF_DETAILS", False)
+        else:
+            self.details = str(self.details_arg).lower() in ("1", "true", "yes", "y")
+        if self.resume_arg is None:
+            self.resume = self.settings.getbool("MYCF_RESUME", False)
+        else:
+            self.resume = str(self.resume_arg).lower() in ("1", "true", "yes", "y")
+        if self.plan_arg is None:
+            self.plan = self.settings.getbool("MYCF_PLAN", False)
+        else:
+            self.plan = str(self.plan_arg).lower() in ("1", "true", "yes", "y")
+        self.db = db.connect(
+            self.settings.get("MYCF_SQLITE_PATH", "mycf_jobs.sqlite"),
+            seed_path=self.settings.get("MYCF_SEED_SQLITE_PATH"),  # 分片运行：主库只读
+        )
+        self._seeded = db.has_seed(self.db)
+        self._watermarks = db.load_watermarks(self.db, seed=self._seeded)
+        # 判重 / 详情比对都查内存，不在 reactor 线程里逐条查库：已知岗位用 DedupePipeline 的哈希集合
+        self._dedupe = find_dedupe(self.crawler)
+        if self.incremental and self._dedupe is None:
+            self._known_hashes = db.url_hashes(self.db, seed=self._seeded)
+        if self.details:
+            self._detail_hashes = db.detail_hashes(self.db, seed=self._seeded)
+        if self.resume:
+            self._done_pages, self._finished = db.load_progress(self.db)
+        else:
+            db.clear_progress(self.db)
+
+    def _is_known(self, query, job_url, posted_ts):
+        """上次运行已见过该岗位？只对有高水位的关键词判断。"""
+        mark = self._watermarks.get(query)
+        if not mark or not job_url:
+            return False
+        newest, recent = mark
+        if job_url in recent:
+            return True
+        newest_ts = self.dates.to_epoch(newest)
+        if posted_ts is not None and newest_ts is not None and posted_ts > newest_ts:
+            return False  # 比高水位还新，不可能见过
+        known = self._dedupe.seen if self._dedupe is not None else self._known_hashes
+        return db.url_hash(job_url) in known
+
+    def _remember(self, query, job_url, posted, posted_ts):
+        mark = self._seen_marks.setdefault(query, [None, [], None])
+        if posted_ts is not None and (mark[2] is None or posted_ts > mark[2]):
+            mark[0], mark[2] = posted, posted_ts
+        if job_url and len(mark[1]) < self.watermark_urls:
+            mark[1].append(job_url)
+
+    # ----------------- 详情补全 -----------------
+    def _detail_request(self, item):
+        """新岗位或摘要哈希与上次抓详情时不同 → 返回详情请求；否则返回 None。"""
+        job_url = item.get("job_url")
+        if not self.details or not job_url or job_url in self._details_requested:
+            return None
+        self._details_requested.add(job_url)
+        uuid = job_uuid(job_url)
+        if not uuid:
+            return None
+        content_hash = summary_hash(item)
+        if self._detail_hashes.get(db.url_hash(job_url)) == int(content_hash, 16):
+            self.crawler.stats.inc_value("mycf/details/unchanged")
+            return None
+        self.crawler.stats.inc_value("mycf/details/requested")
+        return scrapy.Request(
+            f"{self.detail_api}/{uuid}",
+            headers={"accept": "application/json", "referer": job_url},
+            meta={"download_slot": DETAIL_SLOT},
+            priority=-10,  # 先翻完搜索页
+            callback=self.parse_detail,
+            cb_kwargs={"job_url": job_url, "content_hash": content_hash},
+            dont_filter=True,  # 已用 _details_requested 去重；与搜索 API 一样可被 MYCF_DETAIL_API_BASE 指向别的主机
+        )
+
+    def parse_detail(self, response, job_url, content_hash):
+        try:
+            data = json.loads(response.body)
+        except ValueError:
+            self.logger.warning(f"Non-JSON detail response on {response.url}: {response.text[:200]}")
+            return
+        if not isinstance(data, dict):
+            return
+        yield JobDetailItem(job_url=job_url, content_hash=content_hash, **parse_detail(data))
 
-    # ----------------- DOM 兜底 -----------------
-    def parse_list(self, response):
-        page_index = response.meta.get("page_index", 0)
-        query = response.meta.get("query")
-        source_url = response.url
+    def closed(self, reason):
+        if self.db is None:
+            return
+        try:
+            if self.plan:
+                planner.record_actuals(self.db, self.run_id, self._pages_parsed, self._plan_rowid)
+            if self.crawler.stats.get_value("mycf/dedupe/write_failures"):
+                # 有批次没写进库：已提交的进度留着供续抓，其余不记，高水位也不动（否则增量模式会在那些岗位前停下）
+                self.logger.error("Some job batches were not stored; keeping progress and watermarks unchanged")
+                return
+            if self._progress:
+                # 没启用 DedupePipeline 时由爬虫自己补写
+                db.save_progress(self.db, self.drain_progress())
+                self.db.commit()
+            if reason == "finished":
+                db.clear_progress(self.db)  # 正常跑完就没有可续的了；下次 resume=1 等同全新运行
+            db.save_watermarks(
+                self.db,
+                {q: (newest, urls) for q, (newest, urls, _) in self._seen_marks.items()},
+                keep_urls=self.watermark_urls,
+            )
+        finally:
+            self.db.close()
+            self.db = None
 
-        cards = response.css("[data-testid='job-card'], a[data-testid='job-card-link']")
-        if not cards:
-            self.logger.warning(f"No cards on page {page_index}. Fallback to API: {response.url}")
-            yield self._api_request(query=query, page_index=page_index, source_url=source_url, method="POST")
-            yield self._api_request(query=query, page_index=page_index, source_url=source_url, method="GET")
+    # ----------------- 入口 -----------------
+    def start_requests(self):
+        self._open_state()
+        queries = self.queries
+        if self.resume:
+            queries = [q for q in self.queries if q not in self._finished]
+            self.crawler.stats.set_value("mycf/progress/queries_skipped", len(self.queries) - len(queries))
+            self.logger.info(f"Resuming: {len(self.queries) - len(queries)} of {len(self.queries)} keywords already done")
+        if self.plan:
+            queries = self._plan_queries(queries)
+        if self.use_api_only:
+            self.route = self._load_route()
+            if self.route:
+                self.logger.info(f"Using cached API route: method={self.route[0]} page_base={self.route[1]}")
+                for query in queries:
+                    yield from self._schedule_query(query)
+            elif queries:
+                yield from self._probe_routes(queries)
             return
 
+        for query in queries:
+            # 只有在 USE_PLAYWRIGHT=1 时可用（DOM 兜底）；续抓时从第一个没完成的页打开
+            pages = self._resume_pages(query) if self.resume else [0]
+            if pages:
+                yield self._list_request(query, min(pages))
+
+    def _list_request(self, query, page_index):
+        """DOM 兜底的搜索页请求：保留 page 对象供页内翻页，parse_list / errback 负责关闭。"""
+        from scrapy_playwright.page import PageMethod  # 可选依赖：只在 DOM 兜底时导入，纯 API 运行不加载
+
+        meta = {
+            "playwright": True,
+            "playwright_include_page": True,
+            "page_index": page_index,
+            "query": query,
+            "playwright_page_methods": [
+                PageMethod("wait_for_load_state", "domcontentloaded"),
+                PageMethod("wait_for_selector", "main, #__next, body", timeout=60000),
+            ],
+        }
+        if self._browser_contexts:
+            meta["playwright_context"] = self._browser_contexts[next(self._next_context) % len(self._browser_contexts)]
+        return scrapy.Request(
+            self._build_search_url(query, page=page_index),
+            meta=meta,
+            callback=self.parse_list,
+            errback=self._close_page,
+            priority=self._priority.get(query, 0),
+            dont_filter=True,
+        )
+
+    async def _close_page(self, failure):
+        page = failure.request.meta.get("playwright_page")
+        if page is not None and not page.is_closed():
+            await page.close()
+        self.logger.warning(f"Search page failed: {failure.request.url} ({failure.value!r})")
+
+    # ----------------- DOM 兜底 -----------------
+    async def parse_list(self, response):
+        """
+        Playwright 渲染的搜索页：解析当前页卡片，然后在同一个页面里点“下一页”继续，最多到 max_pages；
+        整页都早于 within_days 或没有下一页时停止。page 对象无论成败都在这里关闭。
+        """
+        page = response.meta.get("playwright_page")
+        query = response.meta.get("query")
+        page_index = response.meta.get("page_index", 0)
+        try:
+            while True:
+                outputs, n_cards, n_stale = self._parse_cards(response, query, page_index)
+                self._page_metrics(query, None, n_cards, n_stale, "ok" if n_cards else "empty")
+                if not n_cards:
+                    self.logger.warning(f"No cards on page {page_index}. Fallback to API: {response.url}")
+                    for request in self._api_fallback(query, page_index, response.url):
+                        yield request
+                    return
+                for output in outputs:
+                    if isinstance(output, JobSummaryItem):
+                        self._track(output, query, page_index)
+                    yield output
+                self._checkpoint(query, None, page_index, n_cards - n_stale)
+
+                page_index += 1
+                if page is None or n_stale == n_cards or page_index >= self._max_pages(query):
+                    break
+                if not await browser.goto_next(page):
+                    break
+                html = await page.content()
+                response = response.replace(url=page.url, body=html.encode("utf-8"), encoding="utf-8")
+        finally:
+            if page is not None and not page.is_closed():
+                await page.close()
+        self._exhausted.add(query)
+        self._checkpoint(query, None, None)
+
+    def _api_fallback(self, query, page_index, source_url):
+        if self.route:
+            method, page_base = self.route
+            yield self._api_request(query, page_base + page_index, source_url, method=method, page_base=page_base)
+        else:
+            yield from self._probe_routes([query])
+
+    def _parse_cards(self, response, query, page_index):
+        """返回 ([item / 详情请求, ...], 卡片数, 早于 within_days 的卡片数)。"""
+        cards = response.css(browser.CARD_SELECTOR)
+        outputs = []
+        n_stale = 0
         for card in cards:
             title = (card.css("[data-testid='job-card__job-title']::text, [data-testid='job-card-title']::text, h2::text, h3::text").get(default="").strip()) or None
             company = (card.css("[data-testid='job-card__company-hire-info']::text, [data-testid='company-hire-info']::text").get(default="").strip()) or None
@@ -207,10 +789,12 @@ class MyCareersFutureSpider(scrapy.Spider):
             href = card.attrib.get("href") or card.css("a::attr(href)").get()
             job_url = self._to_abs_url(response, href)
 
-            if posted and not self._posted_within_days(posted):
+            posted_ts = self.dates.to_epoch(posted)
+            if posted_ts is not None and posted_ts < self.cutoff_ts:
+                n_stale += 1
                 continue
 
-            yield JobSummaryItem(
+            item = JobSummaryItem(
                 search_query=query,
                 page_index=page_index,
                 title=title,
@@ -218,75 +802,103 @@ class MyCareersFutureSpider(scrapy.Spider):
                 location=location,
                 salary=None,
                 posted=posted,
+                posted_ts=posted_ts,
                 employment_type=None,
                 seniority=None,
                 category=None,
                 job_url=job_url,
-                source_url=source_url,
+                source_url=response.url,
             )
+            outputs.append(item)
+            detail = self._detail_request(item)
+            if detail is not None:
+                outputs.append(detail)
+        return outputs, len(cards), n_stale
 
     # ----------------- API 解析 -----------------
     def parse_api_json(self, response, query, page_index, source_url):
-        """兼容 results/data/payload/result.results/jobs/items 等多种结构。"""
+        """兼容 results/data/payload/result.results/jobs/items 等多种结构（见 mycf.decoding）。"""
+        route = response.meta.get("mycf_route")
+        probe = response.meta.get("mycf_probe", False)
         try:
-            data = response.json()
-        except Exception:
+            results, total = self.decoder.decode(route, response.body)
+        except DecodeError:
             self.logger.warning(f"Non-JSON or parse error on {response.url}: {response.text[:200]}")
+            self._page_metrics(query, route, outcome="decode_error")
+            yield from self._route_failed(query, page_index, route, probe, empty=False)
+            if not probe:
+                self._checkpoint(query, route, page_index - route[1], done=False)
             return
 
-        results = []
-        if isinstance(data, dict):
-            if isinstance(data.get("results"), list):
-                results = data["results"]
-            elif isinstance(data.get("data"), list):
-                results = data["data"]
-            elif isinstance(data.get("payload"), list):
-                results = data["payload"]
-            elif isinstance(data.get("result"), dict) and isinstance(data["result"].get("results"), list):
-                results = data["result"]["results"]
-            elif any(k in data for k in ("jobs", "items")):
-                results = data.get("jobs") or data.get("items") or []
-
         if not results:
-            self.logger.info(f"No results on {response.url}. keys={list(data)[:8]}")
+            self.logger.info(f"No results on {response.url}. keys={self.decoder.describe(response.body)}")
+            self._page_metrics(query, route, outcome="empty")
+            yield from self._route_failed(query, page_index, route, probe, empty=True)
+            if not probe:
+                # 非首页为空 = 翻到底了，算完成；首页为空要等重新探测后重抓
+                self._checkpoint(query, route, page_index - route[1], done=page_index != route[1])
             return
 
+        if probe:
+            if self.route is not None:
+                return  # 其他路线已胜出，丢弃重复结果
+            if route[1] != 0 and self._probing_base0():
+                self._probe_outstanding.discard(route)
+                if self._probe_held is None:
+                    self._probe_held = (response, query, page_index, source_url)
+                return
+            yield from self._settle_route(route, query)
+        elif route == self.route:
+            self._route_failures = 0
+            yield from self._retry_pages()
+
+        n_stale = 0
+        known_run = max_known_run = 0
         for j in results:
-            job_url_path = j.get("jobDetailsUrl") or j.get("seoUrl") or j.get("urlPath") or j.get("jobUrl")
-            job_url = self._to_abs_url(response, job_url_path)
-
-            company = None
-            company_raw = j.get("company")
-            if isinstance(company_raw, dict):
-                company = company_raw.get("name") or company_raw.get("companyName")
-            elif isinstance(company_raw, str):
-                company = company_raw
-
-            location = j.get("location") or j.get("postal") or j.get("jobLocation") or None
+            job_url = self._to_abs_url(response, j.url_path)
 
             salary = None
-            min_salary = j.get("minSalary")
-            max_salary = j.get("maxSalary")
-            currency = j.get("salaryCurrency")
-            if min_salary or max_salary:
-                rng = f"{min_salary or ''}-{max_salary or ''}".strip("-")
-                salary = f"{rng} {currency or ''}".strip()
-
-            posted = j.get("postingDate") or j.get("postedDate") or j.get("createDate") or j.get("lastUpdatedDate")
-            if posted and not self._posted_within_days(posted):
+            if j.min_salary or j.max_salary:
+                rng = f"{j.min_salary or ''}-{j.max_salary or ''}".strip("-")
+                salary = f"{rng} {j.currency or ''}".strip()
+
+            posted = j.posted
+            posted_ts = self.dates.to_epoch(posted)
+            if self.incremental and self._is_known(query, job_url, posted_ts):
+                known_run += 1
+                max_known_run = max(max_known_run, known_run)
+            else:
+                known_run = 0
+            self._remember(query, job_url, posted, posted_ts)
+
+            if posted_ts is not None and posted_ts < self.cutoff_ts:
+                n_stale += 1
                 continue
 
-            yield JobSummaryItem(
+            item = JobSummaryItem(
                 search_query=query,         # ★ 用关键词作为“分组键”
                 page_index=page_index,
-                title=j.get("title") or j.get("jobTitle"),
-                company=company,
-                location=location,
+                title=j.title,
+                company=j.company,
+                location=j.location,
                 salary=salary,
                 posted=posted,
-                employment_type=j.get("employmentType"),
-                seniority=j.get("seniority"),
-                category=j.get("category") or j.get("jobCategory"),
+                posted_ts=posted_ts,
+                employment_type=j.employment_type,
+                seniority=j.seniority,
+                category=j.category,
                 job_url=job_url,
                 source_url=source_url,
             )
+            yield self._track(item, query, page_index - route[1])
+            detail = self._detail_request(item)
+            if detail is not None:
+                yield detail
+
+        yield from self._schedule_more(
+            query, page_index, source_url, route, total, len(results), n_stale, max_known_run
+        )
+        self._page_metrics(query, route, len(results), n_stale)
+        if probe:
+            self._in_flight[query] = self._in_flight.get(query, 0) + 1  # 胜出的探测页按普通页记
+        self._checkpoint(query, route, page_index - route[1], len(results) - n_stale)
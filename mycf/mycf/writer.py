@@ -0,0 +1,151 @@
+# mycf/writer.py
+"""后台写线程：把阻塞的文件 / SQLite 写操作从 Twisted reactor 线程挪走。"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter:
+    """
+    单个后台线程，按提交顺序执行写任务。SQLite 忙 / 被锁（几个写连接共用一个库）时整个任务退避重试
+    最多 retries 次，所以任务要能重跑（失败时自己 rollback）；其他异常或重试用完记一次 errors，
+    再通知 on_error（在 reactor 线程里调用），不影响后续任务。
+
+    队列有上限（maxsize 个任务）：队列满时 submit() 返回的 Deferred 要等写线程腾出位置才触发，
+    管道把它作为 process_item 的返回值，Scrapy 就会暂停往管道里送新 item —— 磁盘慢时放慢抓取，
+    而不是让内存无限增长。threaded=False 时直接在调用线程里同步执行（旧行为，对照/调试用）。
+    """
+
+    _STOP = object()
+
+    def __init__(self, name="mycf-writer", maxsize=16, threaded=True, retries=5, on_error=None):
+        self.name = name
+        self.threaded = threaded
+        self.retries = max(0, int(retries))
+        self.on_error = on_error        # 无参回调：有任务最终失败时调用
+        self.errors = 0
+        self.retried = 0                # 因 SQLite 忙而重跑的次数
+        self.waits = 0                  # 因队列满而等待的提交次数
+        self._queue = queue.Queue(maxsize=max(0, int(maxsize)))
+        self._waiters = []              # [(任务, Deferred)]，只在 reactor 线程里访问
+        self._thread = None
+
+    def start(self):
+        if self.threaded and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, fn, *args) -> defer.Deferred:
+        """提交任务；返回的 Deferred 在任务进入队列（threaded=False 时为执行完）后触发。"""
+        if self._thread is None:
+            self._call(fn, args)
+            return defer.succeed(None)
+        if not self._waiters:
+            try:
+                self._queue.put_nowait((fn, args))
+                return defer.succeed(None)
+            except queue.Full:
+                pass
+        self.waits += 1
+        d = defer.Deferred()
+        self._waiters.append(((fn, args), d))
+        return d
+
+    def call(self, fn, *args) -> defer.Deferred:
+        """提交任务并取结果：返回的 Deferred 在任务执行完后于 reactor 线程里带着返回值触发（异常走 errback）。"""
+        if self._thread is None:
+            return defer.maybeDeferred(fn, *args)
+        from twisted.internet import reactor
+
+        done = defer.Deferred()
+
+        def run():
+            try:
+                result = fn(*args)
+            except Exception:
+                reactor.callFromThread(done.errback, Failure())
+            else:
+                reactor.callFromThread(done.callback, result)
+
+        return self.submit(run).addCallback(lambda _: done)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._waiters)
+
+    def _admit(self):
+        """reactor 线程：写线程取走一个任务后，把排队的提交放进队列。"""
+        while self._waiters:
+            try:
+                self._queue.put_nowait(self._waiters[0][0])
+            except queue.Full:
+                return
+            _, d = self._waiters.pop(0)
+            d.callback(None)
+
+    def close(self):
+        """把排队的提交和已入队的任务全部写完再退出（阻塞，仅在关闭时调用）。"""
+        if self._thread is None:
+            return
+        waiters, self._waiters = self._waiters, []
+        for task, d in waiters:
+            self._queue.put(task)
+            d.callback(None)
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _call(self, fn, args):
+        attempt = 0
+        while True:
+            try:
+                fn(*args)
+                return
+            except sqlite3.OperationalError as e:
+                if _is_busy(e) and attempt < self.retries:
+                    self.retried += 1
+                    logger.warning("SQLite busy in %s (%s), retrying", self.name, e)
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+                    attempt += 1
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+            break
+        self.errors += 1
+        logger.error("Background write failed in %s", self.name, exc_info=error)
+        if self.on_error is not None:
+            if self._thread is None:
+                self.on_error()
+            else:
+                from twisted.internet import reactor
+
+                reactor.callFromThread(self.on_error)
+
+    def _run(self):
+        from twisted.internet import reactor
+
+        while True:
+            task = self._queue.get()
+            if task is self._STOP:
+                return
+            # 每取走一个任务都让 reactor 线程检查一次排队的提交：这里读 _waiters 会和 submit 的
+            # “队列满 → 追加到 _waiters”竞争，漏掉一次就再也没人放行
+            reactor.callFromThread(self._admit)
+            self._call(*task)
+
+
+def _is_busy(exc):
+    """SQLITE_BUSY / SQLITE_LOCKED：别的连接正在写，稍后重试就好。"""
+    code = getattr(exc, "sqlite_errorcode", None)      # Python 3.11+
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# 测试从 scrapy.cfg 所在目录（mycf/）导入 mycf 和 benchmarks 包
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""read_jobs --posted_prefix 用的日期前缀 → epoch 区间（换算不了时 read_jobs 退回 LIKE）。"""
+from datetime import datetime
+
+import pytest
+
+from mycf.dates import SGT, date_prefix_range
+
+
+def _ts(*args):
+    return int(datetime(*args, tzinfo=SGT).timestamp())
+
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("2025", (_ts(2025, 1, 1), _ts(2026, 1, 1))),
+    ("2025-10", (_ts(2025, 10, 1), _ts(2025, 11, 1))),
+    ("2025-12%", (_ts(2025, 12, 1), _ts(2026, 1, 1))),
+    ("2025-10-12", (_ts(2025, 10, 12), _ts(2025, 10, 13))),
+    ("2024-02-29", (_ts(2024, 2, 29), _ts(2024, 3, 1))),
+    # 末尾只写一位：和 LIKE '前缀%' 一样按字符串前缀
+    ("2025-10-1", (_ts(2025, 10, 10), _ts(2025, 10, 20))),
+    ("2025-10-0%", (_ts(2025, 10, 1), _ts(2025, 10, 10))),
+    ("2024-02-2", (_ts(2024, 2, 20), _ts(2024, 3, 1))),
+    ("2025-12-3", (_ts(2025, 12, 30), _ts(2026, 1, 1))),
+    ("2025-1", (_ts(2025, 10, 1), _ts(2026, 1, 1))),
+    ("2025-0", (_ts(2025, 1, 1), _ts(2025, 10, 1))),
+    ("2025-10-", (_ts(2025, 10, 1), _ts(2025, 11, 1))),
+])
+def test_valid_prefixes(prefix, expected):
+    assert date_prefix_range(prefix) == expected
+
+
+@pytest.mark.parametrize("prefix", [
+    "2025-13", "2025-00", "2025-02-30", "2025-04-31", "2025-10-00", "0000", "9999-12",
+    "", None, "%", "Oct 2025", "2025-1x",
+    "2025-02-3", "2025-10-4", "2025-2", "2025-1-5", "2025-1-", "2025-%-12",   # LIKE 也匹配不到 / 不是前缀形状
+])
+def test_invalid_prefixes_return_none(prefix):
+    assert date_prefix_range(prefix) is None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""分片启动器：对着本地桩 API 跑一遍，-s 指定的主库 / 主输出目录只在合并时写入。"""
+import glob
+import os
+import sqlite3
+import subprocess
+import sys
+
+from benchmarks.stub_api import StubConfig, serve
+
+LAUNCHER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mycf", "launcher.py")
+
+
+def test_main_db_and_output_overrides_stay_out_of_shards(tmp_path):
+    server, api_base = serve(StubConfig(total=20))
+    try:
+        (tmp_path / "keywords.txt").write_text("alpha\nbeta\n", encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, LAUNCHER, "--keywords_file", "keywords.txt", "--workers", "2", "--keep_shards",
+             "-a", "within_days=30", "-a", "max_pages=1",
+             "-s", f"MYCF_API_BASE={api_base}", "-s", "DOWNLOAD_DELAY=0",
+             "-s", "MYCF_SQLITE_PATH=main.sqlite", "-s", "MYCF_OUTPUT_DIR=merged",
+             "-s", "MYCF_SEED_SQLITE_PATH=elsewhere.sqlite"],
+            cwd=tmp_path, capture_output=True, text=True, timeout=300,
+        )
+    finally:
+        server.shutdown()
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    shard_dbs = glob.glob(str(tmp_path / "shards" / "*" / "shard-*" / "mycf_jobs.sqlite"))
+    assert len(shard_dbs) == 2
+    for shard_db in shard_dbs:
+        with sqlite3.connect(shard_db) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 20
+
+    with sqlite3.connect(tmp_path / "main.sqlite") as conn:
+        counts = dict(conn.execute("SELECT search_query, COUNT(*) FROM jobs GROUP BY search_query"))
+    assert counts == {"alpha": 20, "beta": 20}
+    assert sorted(os.listdir(tmp_path / "merged" / "by_keyword")) == ["alpha", "beta"]
+    assert not (tmp_path / "elsewhere.sqlite").exists()
+
+
+def test_spider_args_the_launcher_sets_are_rejected(tmp_path):
+    result = subprocess.run(
+        [sys.executable, LAUNCHER, "--keywords_file", "keywords.txt", "-a", "keywords_file=other.txt"],
+        cwd=tmp_path, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 2
+    assert "-a keywords_file=... 由启动器按分片设置" in result.stderr
+    assert not (tmp_path / "shards").exists()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""read_jobs 默认只读打开：查询不改库（主库和归档分区），只有 --migrate / summary --rebuild 写库。"""
+import hashlib
+import sqlite3
+
+import pytest
+
+from mycf import db
+from mycf.read_jobs import open_db, query_jobs
+
+
+def _digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.fixture
+def jobs_db(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    conn = db.connect(str(path))
+    conn.execute("INSERT INTO jobs (job_url, search_query, title, category, posted_ts) "
+                 "VALUES ('https://example.com/job/1', 'quant', 'Quant Analyst', 'Banking', 1760000000)")
+    conn.commit()
+    conn.execute("PRAGMA journal_mode=DELETE")   # 单文件，方便比对内容
+    conn.close()
+    return path
+
+
+def test_current_schema_opens_read_only(jobs_db):
+    before = _digest(jobs_db)
+    conn = open_db(str(jobs_db))
+    rows = query_jobs(conn, "%", "quant", "%", 10)
+    assert [row["title"] for row in rows] == ["Quant Analyst"]
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM jobs")
+    conn.close()
+    assert _digest(jobs_db) == before
+
+
+def test_old_schema_is_only_upgraded_with_migrate(jobs_db, capsys):
+    conn = sqlite3.connect(jobs_db)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+    before = _digest(jobs_db)
+
+    conn = open_db(str(jobs_db))
+    assert db.schema_version(conn) == 0
+    conn.close()
+    assert _digest(jobs_db) == before
+    assert "--migrate" in capsys.readouterr().err
+
+    conn = open_db(str(jobs_db), migrate=True)
+    assert db.schema_version(conn) == db.SCHEMA_VERSION
+    conn.close()
+
+
+def test_salary_means_count_each_bound_separately(tmp_path):
+    conn = db.connect(str(tmp_path / "jobs.sqlite"))
+    rows = [("https://example.com/job/a", 4000, 6000), ("https://example.com/job/b", None, 8000),
+            ("https://example.com/job/c", 5000, None), ("https://example.com/job/d", None, None)]
+    conn.executemany("INSERT INTO jobs (job_url, search_query, posted_ts, salary_min, salary_max) "
+                     "VALUES (?, 'quant', 1760000000, ?, ?)", rows)
+    conn.commit()
+    query = """SELECT salary_jobs, salary_min_sum / salary_min_jobs, salary_max_sum / salary_max_jobs
+               FROM rollup_keyword_month"""
+    assert conn.execute(query).fetchall() == [(3, 4500, 7000)]
+    db.rebuild_rollups(conn)
+    assert conn.execute(query).fetchall() == [(3, 4500, 7000)]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""API 路线协商和抓取进度：直接把构造好的响应 / 失败喂给爬虫回调，不起 reactor、不联网。"""
+import json
+
+import pytest
+from scrapy import Request
+from scrapy.crawler import Crawler
+from scrapy.http import TextResponse
+from scrapy.settings import Settings
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.statscollectors import MemoryStatsCollector
+from twisted.python.failure import Failure
+
+from benchmarks.stub_api import make_jobs, wrap
+from mycf.spiders.mycf_jobs import MyCareersFutureSpider
+
+PER_PAGE = 20
+
+
+@pytest.fixture
+def spider():
+    crawler = Crawler(MyCareersFutureSpider, Settings({"MYCF_ROUTE_CACHE": None}))
+    crawler.stats = MemoryStatsCollector(crawler)
+    return MyCareersFutureSpider.from_crawler(crawler, q="alpha", within_days=30, max_pages=5)
+
+
+def respond(request, total=100):
+    """按 0 起点的接口回答：page=n 是第 n+1 页。"""
+    page = request.cb_kwargs["page_index"]
+    body = json.dumps(wrap("results", make_jobs(request.cb_kwargs["query"], page * PER_PAGE, PER_PAGE, total), total))
+    response = TextResponse(request.url, body=body.encode(), request=request,
+                            headers={"Content-Type": "application/json"})
+    return list(request.callback(response, **request.cb_kwargs))
+
+
+def fail(request, status=405):
+    response = TextResponse(request.url, status=status, request=request)
+    failure = Failure(HttpError(response, "Ignoring non-200 response"))
+    failure.request = request
+    return list(request.errback(failure))
+
+
+def requests_in(out):
+    return [o for o in out if isinstance(o, Request)]
+
+
+def by_route(requests):
+    return {r.meta["mycf_route"]: r for r in requests}
+
+
+def test_base0_wins_even_if_base1_answers_first(spider):
+    probes = by_route(spider._probe_routes(["alpha"]))
+    assert respond(probes[("POST", 1)]) == []        # 0 起点的探测还没回来，先不定
+    assert respond(probes[("GET", 1)]) == []
+    assert spider.route is None
+    out = respond(probes[("POST", 0)])
+    assert spider.route == ("POST", 0)
+    assert len([o for o in out if o.__class__.__name__ == "JobSummaryItem"]) == PER_PAGE
+
+
+def test_base1_settles_once_base0_probes_fail(spider):
+    probes = by_route(spider._probe_routes(["alpha"]))
+    respond(probes[("GET", 1)])
+    fail(probes[("POST", 0)])
+    assert spider.route is None
+    out = fail(probes[("GET", 0)])
+    assert spider.route == ("GET", 1)
+    assert any(o.__class__.__name__ == "JobSummaryItem" for o in out)
+
+
+def test_probe_keyword_that_failed_everywhere_is_requeued(spider):
+    probes = by_route(spider._probe_routes(["alpha", "beta"]))
+    out = []
+    for request in probes.values():
+        out += fail(request)
+    assert spider.route is None
+    second = by_route(requests_in(out))
+    assert {r.cb_kwargs["query"] for r in second.values()} == {"beta"}
+    out = respond(second[("POST", 0)])
+    retried = [r for r in requests_in(out) if r.cb_kwargs["query"] == "alpha"]
+    assert [(r.meta["mycf_route"], r.cb_kwargs["page_index"]) for r in retried] == [(("POST", 0), 0)]
+
+
+def test_failed_page_is_retried_after_next_success(spider):
+    probes = by_route(spider._probe_routes(["alpha"]))
+    out = respond(probes[("POST", 0)])
+    pages = {r.cb_kwargs["page_index"]: r for r in requests_in(out)}
+    assert fail(pages[1], status=500) == []
+    out = respond(pages[2])
+    assert 1 in [r.cb_kwargs["page_index"] for r in requests_in(out)]
+    assert spider._route_retry == []
+
+
+def test_page_progress_waits_for_its_items(spider):
+    probes = by_route(spider._probe_routes(["alpha"]))
+    out = respond(probes[("POST", 0)])
+    items = [o for o in out if o.__class__.__name__ == "JobSummaryItem"]
+    assert [u[:2] for u in spider._progress] == [("alpha", 0)]
+    for item in items[:-1]:
+        spider._item_settled(item)
+    assert spider.drain_progress() == []              # 最后一条还在管道里
+    spider._item_settled(items[-1])
+    assert [u[:2] for u in spider.drain_progress()] == [("alpha", 0)]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""自适应并发：把本地桩 API 的真实响应（429 + Retry-After）喂给中间件，不起 reactor。"""
+import json
+import time
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.core.downloader import Slot
+from scrapy.crawler import Crawler
+from scrapy.http import TextResponse
+from scrapy.settings import Settings
+from scrapy.statscollectors import MemoryStatsCollector
+from twisted.internet.defer import Deferred
+
+from benchmarks.stub_api import StubConfig, serve
+from mycf.middlewares import AdaptiveConcurrencyMiddleware
+
+SLOT = "127.0.0.1"
+
+
+@pytest.fixture
+def throttle():
+    crawler = Crawler(Spider, Settings({"MYCF_THROTTLE_MIN_DELAY": 0.0}))
+    crawler.stats = MemoryStatsCollector(crawler)
+    slots = {SLOT: Slot(concurrency=8, delay=0.0, randomize_delay=False)}
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(get_slot_key=lambda request: SLOT, slots=slots))
+    return AdaptiveConcurrencyMiddleware(crawler), slots[SLOT]
+
+
+@pytest.fixture
+def stub():
+    server, api_base = serve(StubConfig(total=20, rate_429=1.0, retry_after=2))
+    yield api_base
+    server.shutdown()
+
+
+def fetch(api_base, route=("POST", 0), latency=None):
+    """真的向桩发一次请求，把结果包成 Scrapy 的 Request / Response。"""
+    body = json.dumps({"search": "alpha", "page": 0, "limit": 20}).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(api_base, data=body)) as r:
+            status, headers, content = r.status, dict(r.headers), r.read()
+    except urllib.error.HTTPError as e:
+        status, headers, content = e.code, dict(e.headers), e.read()
+    request = Request(api_base, method="POST", meta={"mycf_route": route, "download_latency": latency})
+    return request, TextResponse(api_base, status=status, headers=headers, body=content, request=request)
+
+
+def test_429_halves_concurrency_and_honors_retry_after(throttle, stub):
+    mw, slot = throttle
+    request, response = fetch(stub)
+    assert response.status == 429
+    mw.process_response(request, response, None)
+    assert (slot.concurrency, slot.delay) == (4, 0.25)
+    assert mw.states[SLOT].cooldown_until >= time.time() + 1.5
+
+    # 同一轮的第二个 429 不再减半；冷却期内的请求要等到 Retry-After 之后
+    mw.process_response(*fetch(stub), None)
+    assert slot.concurrency == 4
+    waiting = mw.process_request(Request(stub), None)
+    assert isinstance(waiting, Deferred)
+    waiting.cancel()
+    assert mw.stats.get_value(f"mycf/throttle/{SLOT}/retry_after_waits") == 1
+    assert mw.stats.get_value(f"mycf/throttle/{SLOT}/retry_after_max") == 2
+
+
+def test_latency_is_tracked_per_route(throttle):
+    mw, _ = throttle
+    for route, latency in ((("POST", 0), 0.1), (("GET", 0), 0.5), (("POST", 0), 0.1)):
+        request = Request("http://127.0.0.1/v2/search", meta={"mycf_route": route, "download_latency": latency})
+        mw.process_response(request, TextResponse(request.url, body=b"{}", request=request), None)
+    assert mw.stats.get_value("mycf/throttle/route/POST:0/latency_ms") == 100.0
+    assert mw.stats.get_value("mycf/throttle/route/GET:0/latency_ms") == 500.0
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""关键词高水位：newest_posted 按时间合并，不按字符串。"""
+from mycf import db
+
+
+def _newest(conn):
+    return conn.execute("SELECT newest_posted FROM keyword_watermarks WHERE search_query = 'quant'").fetchone()[0]
+
+
+def test_newest_posted_is_compared_as_time():
+    conn = db.connect(":memory:")
+    db.save_watermarks(conn, {"quant": ("2025-10-12T09:00:00+08:00", ["a"])})
+    db.save_watermarks(conn, {"quant": ("2025-10-12T02:00:00Z", ["b"])})     # 字符串更小，时间更晚
+    assert _newest(conn) == "2025-10-12T02:00:00Z"
+    db.save_watermarks(conn, {"quant": ("2025-10-11", ["c"])})
+    db.save_watermarks(conn, {"quant": ("not a date", ["d"])})
+    assert _newest(conn) == "2025-10-12T02:00:00Z"
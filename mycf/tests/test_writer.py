@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""BackgroundWriter：队列满时排队的提交一定会被放行；SQLite 忙时整批重试，其他失败通知 on_error。"""
+import queue
+import sqlite3
+import threading
+import time
+
+from twisted.internet import reactor
+
+from mycf.writer import BackgroundWriter
+
+
+def _wait_until(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_waiter_is_admitted_when_writer_drains_during_submit():
+    """submit 发现队列满之后、把自己挂到 _waiters 之前，写线程恰好取走了最后一个任务。"""
+    writer = BackgroundWriter(maxsize=1)
+    writer.start()
+    release_a, in_b, release_b, c_done = (threading.Event() for _ in range(4))
+    try:
+        writer.submit(release_a.wait, 5)
+        _wait_until(lambda: writer._queue.qsize() == 0)           # 写线程在跑 A
+        writer.submit(lambda: (in_b.set(), release_b.wait(5)))    # B 占满队列
+
+        real_put = writer._queue.put_nowait
+
+        def racing_put(task):
+            writer._queue.put_nowait = real_put
+            release_a.set()
+            assert in_b.wait(5)                                   # 写线程已取走 B、开始执行
+            raise queue.Full
+
+        writer._queue.put_nowait = racing_put
+        d = writer.submit(c_done.set)
+        release_b.set()
+        reactor.runUntilCurrent()                                 # 执行写线程 callFromThread 过来的调用
+        assert d.called
+        assert c_done.wait(5)
+    finally:
+        release_a.set()
+        release_b.set()
+        writer.close()
+
+
+def test_busy_database_is_retried():
+    attempts = []
+
+    def write():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+
+    failed = []
+    writer = BackgroundWriter(threaded=False, on_error=lambda: failed.append(1))
+    writer.submit(write)
+    assert len(attempts) == 3
+    assert (writer.retried, writer.errors, failed) == (2, 0, [])
+
+
+def test_failed_write_is_reported():
+    def write():
+        raise sqlite3.OperationalError("no such table: jobs")
+
+    failed = []
+    writer = BackgroundWriter(threaded=False, on_error=lambda: failed.append(1))
+    writer.submit(write)
+    assert (writer.retried, writer.errors, failed) == (0, 1, [1])